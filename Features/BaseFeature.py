@@ -1,11 +1,47 @@
 from abc import ABC, abstractmethod
 
+from Information_Units.UnitContext import use_logger
+from Information_Units.Metrics import feature_stage_duration
+from Information_Units.Databases.DatabaseFactory import database_factory, get_database
+from Information_Units.Generators.GeneratorFactory import generator_factory, get_generator
+from Information_Units.Predictors.PredictorFactory import predictor_factory, get_predictor
+from Information_Units.UnitPool import unit_pool
+from Features.UnitExecutor import UnitTimeout
+from Features.Pipeline import UnitPipeline
+
+
+# unit type -> (factory, registry lookup, method called, label used in logs)
+INFORMATION_UNIT_TYPES = {
+    'database': (database_factory, get_database, 'retrieve', 'Database'),
+    'generator': (generator_factory, get_generator, 'generate', 'Generator'),
+    'predictor': (predictor_factory, get_predictor, 'predict', 'Predictor'),
+}
+
 
 class BaseFeature(ABC):
     """Simple base class for all Features - minimal implementation"""
     
+    # Set to False in features whose outputs must not be reused (e.g. stochastic generation)
+    cacheable = True
+    
+    # Seconds each information unit call may take (None: EMOS_UNIT_TIMEOUT); units can override
+    unit_timeout = None
+    
+    # Stop generation early once this many candidates were produced (None: no limit)
+    max_candidates = None
+    
+    # Database retrieval: 'all' waits for every database, 'first' / 'quorum:N' stop at
+    # the first (N) good answers and cancel the rest (EMOS_RETRIEVAL_POLICIES overrides).
+    # With a hedge delay, the other databases are only queried if the first is slower.
+    retrieval_policy = 'all'
+    retrieval_hedge_delay = None  # seconds
+    
+    # Merge records of the same material (formula, space group, cell) returned by several databases
+    merge_duplicate_records = True
+    
     def __init__(self, feature_name, logger=None):
         self.feature_name = feature_name
+        self.feature_id = None  # set by create_feature
         self.logger = logger
     
     @abstractmethod
@@ -28,15 +64,105 @@ class BaseFeature(ABC):
         """Format results to expected output format"""
         pass
     
-    def process(self, input_data):
-        """Main process method - template pattern"""
+    def process(self, input_data, cache=None):
+        """Main process method - template pattern
+        
+        If a response cache is given, outputs are reused for identical extracted inputs.
+        """
+        # Shared information units log to this feature's (request) logger and
+        # are not evicted from the unit pool while the feature still uses them
+        with use_logger(self.logger), unit_pool.leases():
+            return self._process(input_data, cache)
+    
+    def _process(self, input_data, cache):
         # Step 1: Extract inputs
-        inputs = self.extract_inputs(input_data)
+        with feature_stage_duration.time(feature_id=self.feature_id, stage='extract_inputs'):
+            inputs = self.extract_inputs(input_data)
+        
+        cache_key = None
+        if cache is not None and self.is_cacheable(inputs):
+            cache_key = cache.key(inputs)
+            cached_outputs = cache.get(cache_key)
+            if cached_outputs is not None:
+                if self.logger:
+                    self.logger.log(f'{self.feature_name}: served from response cache', 'info')
+                return cached_outputs
         
         # Step 2: Process feature
-        results = self.process_feature(inputs)
+        with feature_stage_duration.time(feature_id=self.feature_id, stage='process_feature'):
+            results = self.process_feature(inputs)
         
         # Step 3: Format outputs
-        outputs = self.format_outputs(results)
+        with feature_stage_duration.time(feature_id=self.feature_id, stage='format_outputs'):
+            outputs = self.format_outputs(results)
+        
+        if cache_key is not None:
+            cache.put(cache_key, outputs)
+        
+        return outputs
+    
+    def is_cacheable(self, inputs):
+        """Return True if outputs for these inputs may be served from the response cache
+        
+        Override for runs with side effects (e.g. writing a file) that must happen every time.
+        """
+        return self.cacheable
+    
+    def retrieval_is_good(self, unit_key, records):
+        """Return True if a database answer counts towards the retrieval policy"""
+        return bool(records)
+    
+    def candidate_reaches_target(self, candidate):
+        """Return True to stop generation early (e.g. a quality threshold is reached)"""
+        return False
+    
+    def _resolve_information_units(self, unit_type, active_units):
+        """Return [(unit_key, warm instance)] for the active units of one type, logging them"""
+        factory, get_unit, method_name, label = INFORMATION_UNIT_TYPES[unit_type]
+        if not active_units:
+            if self.logger:
+                self.logger.log(f'No active {label.lower()}s found.', 'warning')
+            return []
+        
+        if self.logger:
+            unit_names = ', '.join(unit["name"] for unit in active_units)
+            self.logger.log(f'Active {label.lower()}s ({len(active_units)}): {unit_names}', 'info')
+        
+        units = []
+        for unit in active_units:
+            unit_key = unit['value']
+            if unit_key not in factory:
+                continue
+            try:
+                unit_instance = get_unit(unit_key)
+            except Exception as e:
+                if self.logger:
+                    self.logger.log(f'{label} {unit_key} load() error: {str(e)}', 'warning')
+                continue
+            if self.logger:
+                self.logger.log(unit_instance.info(), 'info')
+            units.append((unit_key, unit_instance))
+        return units
+    
+    def _log_unit_error(self, unit_type, unit_key, error):
+        """Report a failed or timed-out unit call as a warning - never abort the feature"""
+        factory, get_unit, method_name, label = INFORMATION_UNIT_TYPES[unit_type]
+        if not self.logger:
+            return
+        if isinstance(error, UnitTimeout):
+            self.logger.log(f'{label} {unit_key} {method_name}() {str(error)}', 'warning')
+        else:
+            self.logger.log(f'{label} {unit_key} {method_name}() error: {str(error)}', 'warning')
+    
+    def _run_pipeline(self, inputs, retrieve_inputs, generate_inputs, predict_inputs):
+        """Run the active units as a database -> generator -> predictor dataflow.
         
-        return outputs
\ No newline at end of file
+        See Features.Pipeline.UnitPipeline. Returns {'records', 'candidates', 'predictions'}.
+        """
+        pipeline = UnitPipeline(
+            self,
+            self._resolve_information_units('database', inputs.get('active_databases', [])),
+            self._resolve_information_units('generator', inputs.get('active_generators', [])),
+            self._resolve_information_units('predictor', inputs.get('active_predictors', []))
+        )
+        return pipeline.run(retrieve_inputs, generate_inputs, predict_inputs)
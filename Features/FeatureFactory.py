@@ -1,42 +1,9 @@
-# Import all feature classes
-from Features.Materials_Exploration.MaterialSearch.MaterialSearchFeature import MaterialSearchFeature
-from Features.Materials_Exploration.MaterialGeneration.MaterialGenerationFeature import MaterialGenerationFeature
-from Features.Materials_Exploration.DatabaseExtractor.DatabaseExtractorFeature import DatabaseExtractorFeature
-from Features.Materials_Exploration.MaterialCharacterization.MaterialCharacterizationFeature import MaterialCharacterizationFeature
-from Features.Materials_Exploration.DftCalculation.DftCalculationFeature import DftCalculationFeature
-from Features.Materials_Exploration.CrystallographicAnalysis.CrystallographicAnalysisFeature import CrystallographicAnalysisFeature
-from Features.Materials_Exploration.QuantumMechanics.QuantumMechanicsFeature import QuantumMechanicsFeature
-from Features.Materials_Exploration.TensorAnalysis.TensorAnalysisFeature import TensorAnalysisFeature
+from Information_Units.LazyFactory import feature_factory_from_metadata
 
-from Features.Electronics_Application.DeviceSynthesizability.DeviceSynthesizabilityFeature import DeviceSynthesizabilityFeature
-from Features.Electronics_Application.InterfaceCalculation.InterfaceCalculationFeature import InterfaceCalculationFeature
-from Features.Electronics_Application.PropertyPrediction.PropertyPredictionFeature import PropertyPredictionFeature
-from Features.Electronics_Application.BandStructure.BandStructureFeature import BandStructureFeature
-from Features.Electronics_Application.ThermalManagement.ThermalManagementFeature import ThermalManagementFeature
-from Features.Electronics_Application.ReliabilityAssessment.ReliabilityAssessmentFeature import ReliabilityAssessmentFeature
-from Features.Electronics_Application.ProcessIntegration.ProcessIntegrationFeature import ProcessIntegrationFeature
-from Features.Electronics_Application.AdvancedCharacterization.AdvancedCharacterizationFeature import AdvancedCharacterizationFeature
 
-
-# Feature registry - simple mapping like Information Units
-feature_factory = {
-    "1": MaterialSearchFeature,
-    "2": MaterialGenerationFeature,
-    "3": DatabaseExtractorFeature,
-    "4": MaterialCharacterizationFeature,
-    "5": DftCalculationFeature,
-    "6": CrystallographicAnalysisFeature,
-    "7": QuantumMechanicsFeature,
-    "8": TensorAnalysisFeature,
-    "9": DeviceSynthesizabilityFeature,
-    "10": InterfaceCalculationFeature,
-    "11": PropertyPredictionFeature,
-    "12": BandStructureFeature,
-    "13": ThermalManagementFeature,
-    "14": ReliabilityAssessmentFeature,
-    "15": ProcessIntegrationFeature,
-    "16": AdvancedCharacterizationFeature,
-}
+# Feature registry - same mapping as Information Units, classes imported on first use
+# (see metadata/metadata.json)
+feature_factory = feature_factory_from_metadata()
 
 
 def create_feature(feature_id, logger=None):
@@ -45,7 +12,9 @@ def create_feature(feature_id, logger=None):
         raise ValueError(f"Feature {feature_id} not found in factory")
     
     feature_class = feature_factory[feature_id]
-    return feature_class(logger)
+    feature = feature_class(logger)
+    feature.feature_id = feature_id
+    return feature
 
 
 def get_available_features():
@@ -61,4 +30,4 @@ def get_feature_info(feature_id):
     feature_class = feature_factory[feature_id]
     # Create temporary instance to get info
     temp_feature = feature_class()
-    return temp_feature.info()
\ No newline at end of file
+    return temp_feature.info()
@@ -1,7 +1,19 @@
+import pathlib
+
 from Features.BaseFeature import BaseFeature
-from Information_Units.Generators.GeneratorFactory import generator_factory
-from Information_Units.Databases.DatabaseFactory import database_factory
-from Information_Units.Predictors.PredictorFactory import predictor_factory
+from Information_Units.UnitContext import use_logger
+from Information_Units.UnitPool import unit_pool
+from Information_Units.Databases.Export import (EXPORT_CHUNK_SIZE, EXPORT_DIR, export_file, export_writer, iter_export,
+                                                merge_kinds)
+
+
+def _max_entries(value):
+    # '1000' -> 1000; 'all', '0' or anything else that is not a positive number -> None (no limit)
+    try:
+        number = int(str(value).replace(',', '').strip())
+    except ValueError:
+        return None
+    return number if number > 0 else None
 
 
 class DatabaseExtractorFeature(BaseFeature):
@@ -17,15 +29,33 @@ class DatabaseExtractorFeature(BaseFeature):
             'query_parameters': input_data.get('queryParameters', 'all'),
             'data_format': input_data.get('dataFormat', 'JSON'),
             'max_entries': input_data.get('maxEntries', '1000'),
+            'output_file': input_data.get('outputFile'),
             'active_databases': input_data.get('active_databases', []),
             'active_generators': input_data.get('active_generators', []),
             'active_predictors': input_data.get('active_predictors', [])
         }
     
+    def is_cacheable(self, inputs):
+        # An extract written to outputFile must be written again on every request
+        return super().is_cacheable(inputs) and not inputs['output_file']
+    
     def process_feature(self, inputs):
         if self.logger:
             self.logger.log('Initializing database extractor...', 'info')
         
+        if inputs['output_file']:
+            # Full extract written to EMOS_EXPORT_DIR chunk by chunk, not through the pipeline
+            writer = export_writer(inputs['data_format'])
+            name = pathlib.Path(str(inputs['output_file'])).name
+            if not name.endswith('.' + writer.extension):
+                name += '.' + writer.extension
+            databases = self._resolve_information_units('database', inputs['active_databases'])
+            export = export_file(self.iter_chunks(inputs, databases), inputs['data_format'], EXPORT_DIR / name,
+                                 self._export_schema(databases))
+            if self.logger:
+                self.logger.log(f"Exported {export['records']} records to {export['path']}", 'info')
+            return {'export': export, 'data_format': inputs['data_format'], 'query_used': inputs['query_parameters']}
+        
         self._process_information_units(inputs)
         
         if self.logger:
@@ -38,6 +68,14 @@ class DatabaseExtractorFeature(BaseFeature):
         }
     
     def format_outputs(self, results):
+        if 'export' in results:
+            export = results['export']
+            return {
+                'recordsExtracted': f"{export['records']:,} records",
+                'dataSize': f"{export['bytes'] / (1024 * 1024):.1f} MB",
+                'fileFormat': export_writer(results['data_format']).extension,
+                'downloadPackage': f"{pathlib.Path(export['path']).name} (Ready)"
+            }
         return {
             'recordsExtracted': '2,847 records - python',
             'dataSize': '425.3 MB - python',
@@ -46,72 +84,67 @@ class DatabaseExtractorFeature(BaseFeature):
             'downloadPackage': 'extracted_data.zip (Ready) - python'
         }
     
-    def _process_information_units(self, inputs):
-        # Process databases
-        active_databases = inputs.get('active_databases', [])
-        if not active_databases:
-            if self.logger:
-                self.logger.log('No active databases found.', 'warning')
-        else:
-            if self.logger:
-                database_names = ', '.join(db["name"] for db in active_databases)
-                self.logger.log(f'Active databases ({len(active_databases)}): {database_names}', 'info')
-            
-            for dtbs in active_databases:
-                db_key = dtbs['value']
-                if db_key in database_factory:
-                    db_instance = database_factory[db_key](db_key, self.logger)
-                    if self.logger:
-                        self.logger.log(db_instance.info(), 'info')
-                    retrieve_inputs = {'query': inputs['query_parameters']}
-                    try:
-                        db_instance.retrieve(retrieve_inputs)
-                    except Exception as e:
-                        if self.logger:
-                            self.logger.log(f'Database {db_key} retrieve() error: {str(e)}', 'warning')
+    def _export_query(self, inputs):
+        query = str(inputs['query_parameters'] or '').strip()
+        return {} if query.lower() in ('', 'all', '*') else {'search_criteria': query, 'query': query}
+    
+    def _export_schema(self, databases):
+        # Columns of every selected database, known before the first record when all of them have mirrors
+        schema = {}
+        for _, database in databases:
+            fields = database.export_schema()
+            if fields is None:
+                return None
+            for name, kind in fields.items():
+                schema[name] = merge_kinds(schema.get(name), kind)
+        return schema or None
+    
+    def iter_chunks(self, inputs, databases):
+        """Yield record chunks from each (unit_key, database) in turn, at most max_entries records in total.
         
-        # Process generators
-        active_generators = inputs.get('active_generators', [])
-        if not active_generators:
-            if self.logger:
-                self.logger.log('No active generators found.', 'warning')
-        else:
-            if self.logger:
-                generator_names = ', '.join(gen["name"] for gen in active_generators)
-                self.logger.log(f'Active generators ({len(active_generators)}): {generator_names}', 'info')
-            
-            for gnrtr in active_generators:
-                gen_key = gnrtr['value']
-                if gen_key in generator_factory:
-                    gen_instance = generator_factory[gen_key](gen_key, self.logger)
-                    if self.logger:
-                        self.logger.log(gen_instance.info(), 'info')
-                    generate_inputs = {'source': inputs['database_source']}
-                    try:
-                        gen_instance.generate(generate_inputs)
-                    except Exception as e:
-                        if self.logger:
-                            self.logger.log(f'Generator {gen_key} generate() error: {str(e)}', 'warning')
+        Only one chunk (EMOS_EXPORT_CHUNK_SIZE records) is held at a time, however large the extract.
+        A database error is logged and raised.
+        """
+        remaining = _max_entries(inputs['max_entries'])
+        query = self._export_query(inputs)
+        for unit_key, database in databases:
+            if remaining == 0:
+                break
+            try:
+                for chunk in database.iter_records(query, remaining, EXPORT_CHUNK_SIZE):
+                    if remaining is not None:
+                        chunk = chunk[:remaining]
+                        remaining -= len(chunk)
+                    if chunk:
+                        yield chunk
+                    if remaining == 0:
+                        break
+            except Exception as e:
+                # A partial extract must not look complete: the error fails the export
+                # (export_file removes its temporary file, a streamed response is cut short)
+                self._log_unit_error('database', unit_key, e)
+                raise
+    
+    def iter_export(self, input_data):
+        """Stream the extract as bytes in dataFormat (for a chunked HTTP response)
         
-        # Process predictors
-        active_predictors = inputs.get('active_predictors', [])
-        if not active_predictors:
-            if self.logger:
-                self.logger.log('No active predictors found.', 'warning')
-        else:
-            if self.logger:
-                predictor_names = ', '.join(pred["name"] for pred in active_predictors)
-                self.logger.log(f'Active predictors ({len(active_predictors)}): {predictor_names}', 'info')
-            
-            for prdctr in active_predictors:
-                pred_key = prdctr['value']
-                if pred_key in predictor_factory:
-                    pred_instance = predictor_factory[pred_key](pred_key, self.logger)
-                    if self.logger:
-                        self.logger.log(pred_instance.info(), 'info')
-                    predict_inputs = {'data_source': inputs['database_source']}
-                    try:
-                        pred_instance.predict(predict_inputs)
-                    except Exception as e:
-                        if self.logger:
-                            self.logger.log(f'Predictor {pred_key} predict() error: {str(e)}', 'warning')
\ No newline at end of file
+        Returns (bytes iterator, writer class) - the writer class has the mimetype and extension.
+        """
+        inputs = self.extract_inputs(input_data)
+        writer = export_writer(inputs['data_format'])
+        
+        def generate():
+            # Units stay leased (never evicted) until the last chunk is sent
+            with use_logger(self.logger), unit_pool.leases():
+                databases = self._resolve_information_units('database', inputs['active_databases'])
+                yield from iter_export(self.iter_chunks(inputs, databases), inputs['data_format'],
+                                       self._export_schema(databases))
+        
+        return generate(), writer
+    
+    def _process_information_units(self, inputs):
+        # Databases -> generators -> predictors, streamed through the shared pipeline
+        retrieve_inputs = {'query': inputs['query_parameters']}
+        generate_inputs = {'source': inputs['database_source']}
+        predict_inputs = {'data_source': inputs['database_source']}
+        return self._run_pipeline(inputs, retrieve_inputs, generate_inputs, predict_inputs)
\ No newline at end of file
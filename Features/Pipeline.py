@@ -0,0 +1,308 @@
+import contextvars
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from Features.UnitExecutor import UnitCall, completed_unit_calls
+from Information_Units.UnitContext import cancelled
+from Information_Units.Databases.RecordMerge import RecordMerger
+from Information_Units.Predictors.MicroBatcher import predict_many
+
+
+# Maximum chunks waiting between two stages; a full queue blocks the upstream stage
+PIPELINE_QUEUE_SIZE = int(os.environ.get('EMOS_PIPELINE_QUEUE_SIZE', 64))
+# Maximum predictor calls one pipeline has on the shared unit executor at a time
+PIPELINE_PREDICT_CALLS = int(os.environ.get('EMOS_PIPELINE_PREDICT_CALLS', 8))
+
+_END = object()
+
+
+def _parse_retrieval_policies(value):
+    # '1=first,11=quorum:2' -> {'1': 'first', '11': 'quorum:2'}
+    policies = {}
+    for item in value.split(','):
+        feature_id, _, policy = item.strip().partition('=')
+        if feature_id and policy:
+            policies[feature_id.strip()] = policy.strip()
+    return policies
+
+
+# Per-feature retrieval policy overrides ('all', 'first' or 'quorum:N'), by feature id
+RETRIEVAL_POLICIES = _parse_retrieval_policies(os.environ.get('EMOS_RETRIEVAL_POLICIES', ''))
+
+
+def retrieval_answers_needed(policy, databases):
+    """Good database answers after which retrieval stops ('all' -> None, wait for every database)"""
+    if policy == 'first':
+        return 1
+    if policy.startswith('quorum:'):
+        return min(int(policy[len('quorum:'):]), databases)
+    if policy != 'all':
+        raise ValueError(f'Unknown retrieval policy {policy!r}')
+    return None
+
+
+def as_items(result):
+    """Normalize a unit return value to a list of items (None -> [])"""
+    if result is None:
+        return []
+    if isinstance(result, (list, tuple)):
+        return list(result)
+    return [result]
+
+
+class UnitPipeline:
+    """database -> generator -> predictor dataflow for one feature run.
+
+    Each stage runs in its own thread and hands chunks of items to the next one
+    through a bounded queue, so predictors start scoring the first candidates
+    while databases and generators are still running:
+
+    - every database's retrieve() result is a chunk of records. With the feature's
+      retrieval_policy set to 'first' or 'quorum:N', retrieval stops at the first
+      (N) good answers and the slower databases are cancelled; with a
+      retrieval_hedge_delay, the other databases are only queried if the first one
+      has not answered within that many seconds. Records of the same material from
+      several databases are merged (see RecordMerge.py) before they reach the
+      generators, so each one is scored once; the kept record lists every source
+      in its 'provenance' (complete once the database stage has finished);
+    - each record chunk is passed to every generator as inputs['seeds']; generators
+      are consumed through generate_chunks(), so candidates flow on while they are
+      still being generated (without generators, the record chunks go straight to
+      the predictors). Generation stops early once the feature's max_candidates is
+      reached or candidate_reaches_target() returns True;
+    - each candidate is passed to every predictor as inputs['candidate']; predictors
+      that implement predict_batch() get the whole chunk in one micro-batched call.
+
+    A stage that receives nothing runs its units once with the plain inputs,
+    exactly like a feature without a pipeline.
+    """
+
+    def __init__(self, feature, databases, generators, predictors, queue_size=None, predict_calls=None):
+        # databases / generators / predictors: lists of (unit_key, unit_instance)
+        self.feature = feature
+        self.databases = databases
+        self.generators = generators
+        self.predictors = predictors
+        self.queue_size = queue_size or PIPELINE_QUEUE_SIZE
+        self.predict_calls = predict_calls or PIPELINE_PREDICT_CALLS
+        self.output = {'records': [], 'candidates': [], 'predictions': []}
+        self._generation_stopped = threading.Event()
+        self._candidate_lock = threading.Lock()
+        self.merger = RecordMerger() if feature.merge_duplicate_records else None
+
+    def run(self, retrieve_inputs, generate_inputs, predict_inputs):
+        records = queue.Queue(maxsize=self.queue_size)
+        candidates = queue.Queue(maxsize=self.queue_size)
+        threads = [
+            self._start(self._database_stage, retrieve_inputs, records),
+            self._start(self._generator_stage, generate_inputs, records, candidates)
+        ]
+        self._predictor_stage(predict_inputs, candidates)
+        for thread in threads:
+            thread.join()
+        return self.output
+
+    def _start(self, stage, *args):
+        # Stage threads share the caller's context (request logger)
+        context = contextvars.copy_context()
+        thread = threading.Thread(target=context.run, args=(stage, *args), daemon=True)
+        thread.start()
+        return thread
+
+    def _timeout(self, unit):
+        return unit.timeout or self.feature.unit_timeout
+
+    def _database_stage(self, retrieve_inputs, records):
+        try:
+            policy = RETRIEVAL_POLICIES.get(str(self.feature.feature_id), self.feature.retrieval_policy)
+            needed = retrieval_answers_needed(policy, len(self.databases))
+            hedge_delay = self.feature.retrieval_hedge_delay if needed is not None else None
+            waiting = list(self.databases)
+            calls = {}
+            answers = 0
+            if hedge_delay is not None and len(waiting) > 1:
+                # Hedged query: ask the first database alone, the others only if it is slow or fails
+                key, unit = waiting.pop(0)
+                calls[key] = self._retrieve(unit, retrieve_inputs)
+                wait([calls[key].future], timeout=hedge_delay)
+                if calls[key].done():
+                    answers += self._accept_records(key, calls.pop(key), records)
+            if needed is None or answers < needed:
+                for key, unit in waiting:
+                    calls[key] = self._retrieve(unit, retrieve_inputs)
+            for key, result, error in completed_unit_calls(calls):
+                calls.pop(key)
+                if error is not None:
+                    self.feature._log_unit_error('database', key, error)
+                    continue
+                answers += self._put_records(key, result, records)
+                if needed is not None and answers >= needed:
+                    break
+            if self.merger is not None and self.merger.duplicates and self.feature.logger:
+                within = self.merger.duplicates - self.merger.cross_database
+                self.feature.logger.log(f'Merged {self.merger.duplicates} duplicate record(s): '
+                                        f'{self.merger.cross_database} across databases, {within} within a database', 'info')
+            if calls:
+                # Enough good answers - stop waiting for the slower databases
+                for call in calls.values():
+                    call.cancel()
+                if self.feature.logger:
+                    self.feature.logger.log(f'Retrieval policy {policy}: {answers} answer(s), '
+                                            f'cancelled {", ".join(calls)}', 'info')
+        except Exception as e:
+            self.feature._log_unit_error('database', 'stage', e)
+        finally:
+            records.put(_END)
+
+    def _retrieve(self, unit, retrieve_inputs):
+        return UnitCall(unit.retrieve, (dict(retrieve_inputs),), self._timeout(unit))
+
+    def _accept_records(self, key, call, records):
+        try:
+            result = call.future.result()
+        except Exception as e:
+            self.feature._log_unit_error('database', key, e)
+            return 0
+        return self._put_records(key, result, records)
+
+    def _put_records(self, key, result, records):
+        # 1 if the answer counts towards the retrieval policy, else 0
+        items = as_items(result)
+        good = self.feature.retrieval_is_good(key, items)
+        if self.merger is not None:
+            items = self.merger.add(key, items)
+        if items:
+            self.output['records'].extend(items)
+            records.put(items)
+        return 1 if good else 0
+
+    def _generator_stage(self, generate_inputs, records, candidates):
+        seeded = False
+        finished = False
+        # Generator streams block while the candidate queue is full, so they run on threads of
+        # their own: on the shared unit executor they would hold the workers predictors need
+        # to drain that queue
+        executor = ThreadPoolExecutor(max_workers=max(1, len(self.generators)), thread_name_prefix='emos-generate')
+        try:
+            while True:
+                chunk = records.get()
+                if chunk is _END:
+                    finished = True
+                    break
+                seeded = True
+                if self.generators:
+                    self._generate(generate_inputs, chunk, candidates, executor)
+                else:
+                    candidates.put(chunk)
+            if not seeded and self.generators:
+                self._generate(generate_inputs, None, candidates, executor)
+        except Exception as e:
+            self.feature._log_unit_error('generator', 'stage', e)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            # Never leave the database stage blocked on a full queue
+            while not finished:
+                finished = records.get() is _END
+            candidates.put(_END)
+
+    def _generate(self, generate_inputs, seeds, candidates, executor):
+        if self._generation_stopped.is_set():
+            return
+        unit_inputs = dict(generate_inputs)
+        if seeds is not None:
+            unit_inputs['seeds'] = seeds
+        calls = {key: UnitCall(self._stream_candidates, (unit, dict(unit_inputs), candidates), self._timeout(unit),
+                               executor)
+                 for key, unit in self.generators}
+        for key, result, error in completed_unit_calls(calls):
+            if error is not None:
+                self.feature._log_unit_error('generator', key, error)
+
+    def _stream_candidates(self, unit, unit_inputs, candidates):
+        # Runs on a generator stage thread: forward each chunk as soon as it is generated
+        for chunk in unit.generate_chunks(unit_inputs, until=self._generation_done):
+            with self._candidate_lock:
+                limit = self.feature.max_candidates
+                if limit is not None:
+                    chunk = chunk[:max(0, limit - len(self.output['candidates']))]
+                    if len(self.output['candidates']) + len(chunk) >= limit:
+                        self._generation_stopped.set()
+                self.output['candidates'].extend(chunk)
+            if chunk and not self._put(candidates, chunk):
+                return
+            if self._generation_stopped.is_set():
+                return
+
+    def _generation_done(self, candidate):
+        if self.feature.candidate_reaches_target(candidate):
+            self._generation_stopped.set()
+        return self._generation_stopped.is_set()
+
+    def _put(self, target, chunk):
+        # Blocks while the next stage is behind (backpressure), but gives up once cancelled
+        while True:
+            try:
+                target.put(chunk, timeout=0.1)
+                return True
+            except queue.Full:
+                if cancelled():
+                    return False
+
+    def _predictor_stage(self, predict_inputs, candidates):
+        scored = False
+        finished = False
+        try:
+            while True:
+                chunk = candidates.get()
+                if chunk is _END:
+                    finished = True
+                    break
+                if self.predictors:
+                    scored = True
+                    self._predict(predict_inputs, chunk)
+            if not scored and self.predictors:
+                self._predict(predict_inputs, None)
+        except Exception as e:
+            self.feature._log_unit_error('predictor', 'stage', e)
+        finally:
+            if not finished:
+                # Nothing will score further candidates: stop the generators and
+                # never leave them blocked on a full queue
+                self._generation_stopped.set()
+            while not finished:
+                finished = candidates.get() is _END
+
+    def _predict(self, predict_inputs, chunk):
+        candidates = chunk if chunk is not None else [None]
+        inputs_list = []
+        for candidate in candidates:
+            unit_inputs = dict(predict_inputs)
+            if chunk is not None:
+                unit_inputs['candidate'] = candidate
+            inputs_list.append(unit_inputs)
+
+        def calls():
+            # Submitted as earlier calls finish, at most predict_calls at a time, so one large
+            # chunk cannot take over the executor shared with other requests
+            for key, unit in self.predictors:
+                if unit.supports_batching():
+                    # One call for the whole chunk, merged with other requests by the micro-batcher
+                    yield (key, None), predict_many, (unit, [dict(i) for i in inputs_list]), self._timeout(unit)
+                else:
+                    for index, unit_inputs in enumerate(inputs_list):
+                        yield (key, index), unit.predict, (dict(unit_inputs),), self._timeout(unit)
+
+        for (key, index), result, error in completed_unit_calls({}, calls(), self.predict_calls):
+            if error is not None:
+                self.feature._log_unit_error('predictor', key, error)
+                continue
+            scored = enumerate(result) if index is None else [(index, result)]
+            for candidate_index, prediction in scored:
+                if prediction is not None:
+                    self.output['predictions'].append({
+                        'predictor': key,
+                        'candidate': candidates[candidate_index],
+                        'result': prediction
+                    })
@@ -0,0 +1,126 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError, wait
+
+from Information_Units.UnitContext import use_cancel_event
+
+
+# Shared executor for information unit calls (environment variables)
+UNIT_WORKERS = int(os.environ.get('EMOS_UNIT_WORKERS', 32))
+UNIT_TIMEOUT = float(os.environ.get('EMOS_UNIT_TIMEOUT', 300))  # seconds per unit call
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class UnitTimeout(Exception):
+    """Raised by UnitCall.result() when a unit call exceeds its timeout"""
+    pass
+
+
+def get_unit_executor():
+    # Created on first use so no threads exist in a gunicorn master before fork
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=UNIT_WORKERS, thread_name_prefix='emos-unit')
+        return _executor
+
+
+class UnitCall:
+    """One information unit call running on the shared executor.
+
+    The timeout counts from the moment the call starts running, so time spent queued
+    behind other calls on a busy executor is not charged to it.
+    """
+
+    def __init__(self, fn, args, timeout=None, executor=None):
+        # executor: run on a caller-owned executor instead of the shared one
+        self.timeout = timeout or UNIT_TIMEOUT
+        self.deadline = None  # set when the call starts
+        self.cancel_event = threading.Event()
+        # Each call runs in a copy of the caller's context so units log to the right request
+        context = contextvars.copy_context()
+        self.future = (executor or get_unit_executor()).submit(context.run, self._run, fn, args)
+
+    def _run(self, fn, args):
+        self.deadline = time.monotonic() + self.timeout
+        with use_cancel_event(self.cancel_event):
+            return fn(*args)
+
+    def expired(self, now=None):
+        return self.deadline is not None and self.deadline <= (time.monotonic() if now is None else now)
+
+    def wait_time(self, now=None):
+        """Seconds until the call could time out (a queued call has its whole timeout ahead)"""
+        if self.deadline is None:
+            return self.timeout
+        return max(0, self.deadline - (time.monotonic() if now is None else now))
+
+    def result(self):
+        """Wait until the deadline; on timeout cancel the call and raise UnitTimeout"""
+        while True:
+            try:
+                return self.future.result(timeout=self.wait_time())
+            except TimeoutError:
+                if self.expired():
+                    self.cancel()
+                    raise UnitTimeout(f'timed out after {self.timeout:g}s')
+
+    def done(self):
+        return self.future.done()
+
+    def cancel(self):
+        # Not-yet-started calls are dropped; running ones see UnitContext.cancelled()
+        self.cancel_event.set()
+        self.future.cancel()
+
+
+def completed_unit_calls(calls, more=(), window=None):
+    """Yield (key, result, error) for {key: UnitCall} in completion order.
+
+    more is an iterable of further (key, fn, args, timeout) calls, submitted as earlier calls
+    finish so that at most window calls are in flight (all of them at once if window is None).
+    Calls still running at their deadline are cancelled and yielded with a UnitTimeout error.
+    Calls still pending when the caller stops iterating are cancelled.
+    """
+    pending = dict(calls)
+    more = iter(more)
+
+    def submit_more():
+        while window is None or len(pending) < window:
+            spec = next(more, None)
+            if spec is None:
+                return
+            key, fn, args, timeout = spec
+            pending[key] = UnitCall(fn, args, timeout)
+
+    try:
+        submit_more()
+        while pending:
+            now = time.monotonic()
+            for key, call in list(pending.items()):
+                if not call.done() and call.expired(now):
+                    call.cancel()
+                    del pending[key]
+                    submit_more()
+                    yield key, None, UnitTimeout(f'timed out after {call.timeout:g}s')
+            if not pending:
+                break
+            # Queued calls wake the loop up after their full timeout at the latest, by which time
+            # they have either started (and got a deadline) or are still waiting for a worker
+            timeout = min(call.wait_time(now) for call in pending.values())
+            done, _ = wait([call.future for call in pending.values()], timeout=timeout, return_when=FIRST_COMPLETED)
+            for key, call in list(pending.items()):
+                if call.future in done:
+                    del pending[key]
+                    submit_more()
+                    try:
+                        yield key, call.future.result(), None
+                    except Exception as e:
+                        yield key, None, e
+    finally:
+        for call in pending.values():
+            call.cancel()
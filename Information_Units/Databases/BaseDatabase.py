@@ -1,11 +1,81 @@
 from pathlib import Path
 
+from Information_Units.UnitContext import current_logger
+from Information_Units.Metrics import instrument_unit_call
+from Information_Units.Databases.LocalMirror import MIRROR_MAX_RESULTS, open_mirror
+from Information_Units.Databases.HttpClient import http_client
+from Information_Units.Databases.RetrieveCache import memoize_retrieve, uncached
+
 
 # Base class for all databases
 class BaseDatabase:
+    # Seconds a single call may take before the feature gives up (None: feature default)
+    timeout = None
+
+    # Long-lived worker processes to run this unit in (0: inside the web worker);
+    # EMOS_PROCESS_UNITS overrides it, see Information_Units/ProcessPool.py
+    process_workers = 0
+
+    # Estimated memory of a loaded instance in MB, used by the unit pool's budget
+    # (None: measured as the growth of resident memory during load())
+    memory_mb = None
+
+    # Shared keep-alive HTTP client for remote backends (pages(), fetch_ids(), retries),
+    # see Information_Units/Databases/HttpClient.py
+    http = http_client
+
+    # On-disk caching of retrieve() results (see RetrieveCache.py): bump version when the
+    # data behind the database changes, list the input keys that affect the result in
+    # cache_parameters (None: all inputs), and set memoize = False for live data
+    version = None
+    cache_parameters = None
+    memoize = True
+
     def __init__(self, database_name='', logger=None):
         self.database_name = database_name
         self.logger=logger
+        self.mirror = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Count and time every retrieve() call for the /metrics endpoint; cached
+        # results are answered before reaching the (instrumented) database call
+        if 'retrieve' in cls.__dict__:
+            cls.retrieve = memoize_retrieve(
+                instrument_unit_call('database', 'retrieve', 'database_name', cls.__dict__['retrieve']))
+
+    @property
+    def logger(self):
+        # Shared (registry) instances log to the logger of the request using them
+        return current_logger.get() or self._logger
+
+    @logger.setter
+    def logger(self, logger):
+        self._logger = logger
+
+    def load(self):
+        """Load models, weights or connections - called once per process before first use
+
+        Opens the local mirror of this database if one was ingested (see LocalMirror.py);
+        subclasses overriding load() should call super().load().
+        """
+        self.mirror = open_mirror(self.database_name)
+
+    def warmup(self):
+        """Optional cheap call after load() so the first real request is fast"""
+        pass
+
+    def close(self):
+        """Release resources acquired in load()"""
+        if self.mirror is not None:
+            self.mirror.close()
+            self.mirror = None
+
+    def cache_version(self):
+        """Version part of retrieve cache keys - changes when version is bumped or the mirror is re-ingested"""
+        if self.mirror is not None:
+            return [self.version, self.mirror.manifest.get('created_at')]
+        return self.version
 
     def info(self):
         return f'Information about database{self.database_name}'
@@ -20,4 +90,57 @@ class BaseDatabase:
         """
         raise NotImplementedError("Subclasses must implement retrieve()")
 
+    def iter_records(self, inputs: dict, limit=None, chunk_size=1000):
+        """
+        Yield query results in chunks, for exports larger than one retrieve() answer.
+        Args:
+            inputs (dict): Parsed input values from frontend
+            limit (int): Maximum number of records (None: all)
+            chunk_size (int): Records per chunk
+        Returns:
+            Iterator of record lists. Reads the local mirror chunk by chunk (every entry if
+            the inputs hold no query); without a mirror, retrieve()'s answer (not cached, see
+            RetrieveCache.uncached) is split into chunks. Remote backends should override this
+            with self.http.pages().
+        """
+        if self.mirror is not None:
+            yield from self.mirror.iter_records(inputs, limit, chunk_size)
+            return
+        with uncached():
+            result = self.retrieve(dict(inputs, limit=limit) if limit else inputs)
+        records = result if isinstance(result, list) else ([] if result is None else [result])
+        records = records if limit is None else records[:limit]
+        for start in range(0, len(records), chunk_size):
+            yield records[start:start + chunk_size]
+
+    def export_schema(self):
+        """
+        Fields of the records iter_records() can yield, for exports with fixed columns.
+        Returns:
+            dict: {field: 'number' | 'bool' | 'string'} from the local mirror, or None if unknown
+            (the columns are then taken from the first chunk). Remote backends with a
+            fixed answer schema can override this.
+        """
+        if self.mirror is not None and self.mirror.fields:
+            return dict(self.mirror.fields)
+        return None
 
+    def retrieve_from_mirror(self, inputs: dict):
+        """
+        Answer a query from the local mirror.
+        Args:
+            inputs (dict): Parsed input values from frontend
+        Returns:
+            list: Matching records (at most limit / max_results / EMOS_MIRROR_MAX_RESULTS),
+            or None if there is no mirror or the inputs hold no query it understands
+        """
+        if self.mirror is None:
+            return None
+        limit = int(inputs.get('limit') or inputs.get('max_results') or MIRROR_MAX_RESULTS)
+        indices = self.mirror.query(inputs, limit)
+        if indices is None:
+            return None
+        records = self.mirror.records(indices)
+        if self.logger:
+            self.logger.log(f'{self.database_name}: {len(records)} records from local mirror', 'info')
+        return records
@@ -0,0 +1,69 @@
+import math
+import re
+from functools import reduce
+
+
+# Element symbols by atomic number (ELEMENTS[0] is a placeholder so ELEMENTS[Z] is element Z)
+ELEMENTS = (
+    '', 'H', 'He', 'Li', 'Be', 'B', 'C', 'N', 'O', 'F', 'Ne', 'Na', 'Mg', 'Al', 'Si', 'P', 'S', 'Cl', 'Ar',
+    'K', 'Ca', 'Sc', 'Ti', 'V', 'Cr', 'Mn', 'Fe', 'Co', 'Ni', 'Cu', 'Zn', 'Ga', 'Ge', 'As', 'Se', 'Br', 'Kr',
+    'Rb', 'Sr', 'Y', 'Zr', 'Nb', 'Mo', 'Tc', 'Ru', 'Rh', 'Pd', 'Ag', 'Cd', 'In', 'Sn', 'Sb', 'Te', 'I', 'Xe',
+    'Cs', 'Ba', 'La', 'Ce', 'Pr', 'Nd', 'Pm', 'Sm', 'Eu', 'Gd', 'Tb', 'Dy', 'Ho', 'Er', 'Tm', 'Yb', 'Lu',
+    'Hf', 'Ta', 'W', 'Re', 'Os', 'Ir', 'Pt', 'Au', 'Hg', 'Tl', 'Pb', 'Bi', 'Po', 'At', 'Rn',
+    'Fr', 'Ra', 'Ac', 'Th', 'Pa', 'U', 'Np', 'Pu', 'Am', 'Cm', 'Bk', 'Cf', 'Es', 'Fm', 'Md', 'No', 'Lr',
+    'Rf', 'Db', 'Sg', 'Bh', 'Hs', 'Mt', 'Ds', 'Rg', 'Cn', 'Nh', 'Fl', 'Mc', 'Lv', 'Ts', 'Og',
+)
+ATOMIC_NUMBERS = {symbol: z for z, symbol in enumerate(ELEMENTS) if symbol}
+
+_TOKEN = re.compile(r'([A-Z][a-z]?)(\d*\.?\d*)|(\()|(\))(\d*\.?\d*)')
+
+
+def parse_formula(formula):
+    """{'Si': 1.0, 'O': 2.0} for 'SiO2', 'Si O2' (CIF) or 'Ca(OH)2'; None if it is not a formula"""
+    compact = str(formula).replace(' ', '')
+    if not compact:
+        return None
+    stack = [{}]
+    position = 0
+    for match in _TOKEN.finditer(compact):
+        if match.start() != position:
+            return None
+        position = match.end()
+        element, amount, opening, closing, multiplier = match.groups()
+        if element:
+            if element not in ATOMIC_NUMBERS:
+                return None
+            stack[-1][element] = stack[-1].get(element, 0) + (float(amount) if amount else 1.0)
+        elif opening:
+            stack.append({})
+        else:
+            if len(stack) == 1:
+                return None
+            group = stack.pop()
+            factor = float(multiplier) if multiplier else 1.0
+            for element, amount in group.items():
+                stack[-1][element] = stack[-1].get(element, 0) + amount * factor
+    if position != len(compact) or len(stack) != 1 or not stack[0]:
+        return None
+    return stack[0]
+
+
+def reduced_amounts(amounts):
+    """Divide integer amounts by their greatest common divisor: {'Si': 2, 'O': 4} -> {'Si': 1, 'O': 2}"""
+    amounts = {element: a for element, a in amounts.items() if a}
+    if amounts and all(float(a).is_integer() for a in amounts.values()):
+        divisor = reduce(math.gcd, (int(a) for a in amounts.values()))
+        return {element: int(a) // divisor for element, a in amounts.items()}
+    return amounts
+
+
+def reduced_formula(amounts):
+    """Canonical reduced formula with alphabetically sorted elements: 'Si2O4' -> 'O2Si'"""
+    amounts = reduced_amounts(amounts)
+    return ''.join(f'{element}{amounts[element]:g}' if amounts[element] != 1 else element
+                   for element in sorted(amounts))
+
+
+def chemical_system(elements):
+    """'O-Si' for {'Si', 'O'} - alphabetically sorted, dash-separated"""
+    return '-'.join(sorted(elements))
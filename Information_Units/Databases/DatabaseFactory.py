@@ -1,21 +1,29 @@
-from Information_Units.Databases.Icsd.IcsdDatabase import IcsdDatabase
-from Information_Units.Databases.Cod.CodDatabase import CodDatabase
-from Information_Units.Databases.Oqmd.OqmdDatabase import OqmdDatabase
-from Information_Units.Databases.Aflowlib.AflowlibDatabase import AflowlibDatabase
-from Information_Units.Databases.Materialsproject.MaterialsprojectDatabase import MaterialsprojectDatabase
-from Information_Units.Databases.Alexandria.AlexandriaDatabase import AlexandriaDatabase
-from Information_Units.Databases.Nomad.NomadDatabase import NomadDatabase
-from Information_Units.Databases.Jarvis.JarvisDatabase import JarvisDatabase
-
-database_factory = {
-    "icsd": IcsdDatabase,
-    "cod": CodDatabase,
-    "oqmd": OqmdDatabase,
-    "aflowlib": AflowlibDatabase,
-    "materialsproject": MaterialsprojectDatabase,
-    "alexandria": AlexandriaDatabase,
-    "nomad": NomadDatabase,
-    "jarvis": JarvisDatabase
-}
-
-database_registry = {}
\ No newline at end of file
+from Information_Units.LazyFactory import unit_factory_from_metadata
+from Information_Units.ProcessPool import create_unit
+from Information_Units.UnitPool import unit_pool
+
+# Database classes are imported on first use (see metadata/metadata.json)
+database_factory = unit_factory_from_metadata("databases")
+
+# Loaded instances, shared by all requests; the unit pool evicts and reloads them
+# to stay within EMOS_UNIT_MEMORY_BUDGET_MB
+database_registry = unit_pool.registry('database')
+
+
+def _load_database(database_key):
+    instance = create_unit('database', database_factory, database_key)
+    instance.load()
+    return instance
+
+
+def get_database(database_key):
+    """Return the warm database_registry instance for database_key, creating and loading it on first use.
+
+    Registry instances are shared by all requests and log through UnitContext.use_logger.
+    """
+    return unit_pool.get('database', database_key, _load_database, database_factory[database_key].memory_mb)
+
+
+def release_database(database_key):
+    """Deactivate database_key: remove it from database_registry and close it"""
+    unit_pool.release('database', database_key)
@@ -0,0 +1,166 @@
+import itertools
+
+from Information_Units.Databases.Composition import ATOMIC_NUMBERS, ELEMENTS, parse_formula
+
+try:
+    import numpy as np
+except ImportError:  # built and used with local mirrors, which need numpy
+    np = None
+
+
+# Chemical systems with up to this many elements are answered by exact lookups of every
+# subsystem (2^k - 1 binary searches); larger ones fall back to a bitset scan
+MAX_ENUMERATED_ELEMENTS = 12
+
+# Element bitsets: two 64-bit words, bit Z of the pair is set if the entry contains element Z
+_WORDS = 2
+_KEY = None  # structured dtype (hi, lo), created with numpy
+
+
+def _key_dtype():
+    global _KEY
+    if _KEY is None:
+        _KEY = np.dtype([('hi', '<u8'), ('lo', '<u8')])
+    return _KEY
+
+
+def element_mask(elements):
+    """(lo, hi) bitset words for a set of element symbols"""
+    words = [0] * _WORDS
+    for element in elements:
+        z = ATOMIC_NUMBERS[element]
+        words[z // 64] |= 1 << (z % 64)
+    return tuple(words)
+
+
+def parse_elements(value):
+    """Element symbols from ['Si', 'O'], 'Si, O', 'Si-O' or a formula like 'SiO2'; unknown words are ignored"""
+    if isinstance(value, (list, tuple, set)):
+        words = [str(v).strip() for v in value]
+    else:
+        text = str(value or '')
+        amounts = parse_formula(text)
+        if amounts and not any(sep in text for sep in ',- '):
+            return sorted(amounts)
+        words = [word.strip() for word in text.replace('-', ',').replace(' ', ',').split(',')]
+    return sorted({word for word in words if word in ATOMIC_NUMBERS})
+
+
+class ElementIndex:
+    """Inverted index of a mirror's compositions, shared by every database using LocalMirror.
+
+    - bits:      per-entry element bitsets (n x 2 uint64) for vectorized scans;
+    - postings:  entry ids per element (CSR by atomic number), for "contains all of" queries;
+    - systems:   entries sorted by their exact element set, for "within chemical system" queries.
+    Reduced-formula lookups use the mirror's sorted formula column.
+    """
+
+    FILES = ('element_bits.npy', 'element_postings_ptr.npy', 'element_postings.npy',
+             'system_keys.npy', 'system_order.npy')
+
+    def __init__(self, bits, postings_ptr, postings, system_keys, system_order):
+        self.bits = bits
+        self.postings_ptr = postings_ptr
+        self.postings = postings
+        self.system_keys = system_keys
+        self.system_order = system_order
+
+    def __len__(self):
+        return len(self.bits)
+
+    @classmethod
+    def build(cls, composition_ptr, composition_z):
+        """Build the index from a mirror's CSR compositions (ptr, atomic numbers)"""
+        composition_ptr = np.asarray(composition_ptr, dtype=np.int64)
+        composition_z = np.asarray(composition_z, dtype=np.int64)
+        count = len(composition_ptr) - 1
+        rows = np.repeat(np.arange(count, dtype=np.int64), np.diff(composition_ptr))
+        bits = np.zeros((count, _WORDS), dtype=np.uint64)
+        present = np.diff(composition_ptr) > 0
+        if present.any():
+            # Elements are unique within an entry, so summing each entry's bits is the same as OR-ing them.
+            # Only non-empty entries are reduced: their starts are strictly increasing and in range.
+            starts = composition_ptr[:-1][present]
+            for word in range(_WORDS):
+                values = np.where(composition_z // 64 == word,
+                                  np.left_shift(np.uint64(1), (composition_z % 64).astype(np.uint64)), np.uint64(0))
+                bits[present, word] = np.add.reduceat(values, starts)
+        # Entry ids grouped by element, ascending within each element
+        order = np.lexsort((rows, composition_z))
+        postings = rows[order]
+        postings_ptr = np.searchsorted(composition_z[order], np.arange(len(ELEMENTS) + 1)).astype(np.int64)
+        keys = np.empty(count, dtype=_key_dtype())
+        keys['hi'], keys['lo'] = bits[:, 1], bits[:, 0]
+        system_order = np.lexsort((bits[:, 0], bits[:, 1]))
+        return cls(bits, postings_ptr, postings, keys[system_order], system_order)
+
+    def save(self, directory):
+        for name, values in zip(self.FILES, (self.bits, self.postings_ptr, self.postings,
+                                             self.system_keys, self.system_order)):
+            np.save(directory / name, values)
+
+    @classmethod
+    def load(cls, directory):
+        """Memory-mapped index from a mirror directory, or None if it was not built"""
+        if not all((directory / name).exists() for name in cls.FILES):
+            return None
+        return cls(*(np.load(directory / name, mmap_mode='r') for name in cls.FILES))
+
+    # --- queries (all return sorted entry ids) ---
+
+    def with_element(self, element):
+        z = ATOMIC_NUMBERS[element]
+        return np.asarray(self.postings[self.postings_ptr[z]:self.postings_ptr[z + 1]])
+
+    def containing(self, elements):
+        """Entries containing every one of elements (superset of the set)"""
+        lists = sorted((self.with_element(element) for element in set(elements)), key=len)
+        if not lists:
+            return np.arange(len(self))
+        result = lists[0]
+        for entries in lists[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, entries, assume_unique=True)
+        return result
+
+    def in_system(self, elements):
+        """Entries whose element set is exactly elements (the chemical system itself, e.g. only binary Ga-As)"""
+        lo, hi = element_mask(elements)
+        key = np.array([(hi, lo)], dtype=_key_dtype())
+        left = np.searchsorted(self.system_keys, key[0], side='left')
+        right = np.searchsorted(self.system_keys, key[0], side='right')
+        return np.sort(np.asarray(self.system_order[left:right]))
+
+    def within(self, elements):
+        """Entries made only of elements (subset of the set): Ga, As and GaAs for Ga-As"""
+        elements = sorted(set(elements))
+        if len(elements) > MAX_ENUMERATED_ELEMENTS:
+            return np.flatnonzero(self.within_mask(elements))
+        parts = [self.in_system(subset)
+                 for size in range(1, len(elements) + 1)
+                 for subset in itertools.combinations(elements, size)]
+        return np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+    # --- boolean masks (vectorized bitset scans) ---
+
+    def containing_mask(self, elements):
+        words = element_mask(elements)
+        mask = np.ones(len(self), dtype=bool)
+        for word, value in enumerate(words):
+            if value:
+                mask &= (self.bits[:, word] & np.uint64(value)) == np.uint64(value)
+        return mask
+
+    def excluding_mask(self, elements):
+        mask = np.ones(len(self), dtype=bool)
+        for word, value in enumerate(element_mask(elements)):
+            if value:
+                mask &= (self.bits[:, word] & np.uint64(value)) == 0
+        return mask
+
+    def within_mask(self, elements):
+        mask = np.ones(len(self), dtype=bool)
+        for word, value in enumerate(element_mask(elements)):
+            mask &= (self.bits[:, word] & ~np.uint64(value)) == 0
+        return mask & self.bits.any(axis=1)
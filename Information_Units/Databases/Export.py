@@ -0,0 +1,281 @@
+import csv
+import io
+import json
+import os
+import pathlib
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.parent.resolve()
+
+# Records read from a database and written per chunk; memory use is bounded by one chunk
+EXPORT_CHUNK_SIZE = int(os.environ.get('EMOS_EXPORT_CHUNK_SIZE', 1000))
+# Directory export files are written to (file names only, never paths, come from requests)
+EXPORT_DIR = pathlib.Path(os.environ.get('EMOS_EXPORT_DIR', PROJECT_ROOT / 'data' / 'exports'))
+
+
+def _flat_value(value):
+    # Scalars as they are; lists and dicts as JSON text
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return json.dumps(value, separators=(',', ':'), default=str)
+
+
+def value_kind(value):
+    """'number', 'bool' or 'string' (anything else, nested values included); None for None"""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, (int, float)):
+        return 'number'
+    return 'string'
+
+
+def merge_kinds(kind, other):
+    # A field holding values of several kinds is exported as text
+    if kind is None or kind == other:
+        return other
+    return kind if other is None else 'string'
+
+
+def record_schema(records, schema=None):
+    """{field: kind} of records, in first-seen order, merged into schema (updated in place) if given"""
+    schema = {} if schema is None else schema
+    for record in records:
+        if isinstance(record, dict):
+            for key, value in record.items():
+                schema[key] = merge_kinds(schema.get(key), value_kind(value))
+    return schema
+
+
+class SchemaError(ValueError):
+    """Raised when a chunk does not fit the columns of a CSV or Parquet export"""
+
+
+class _ColumnarWriter:
+    # Columns come from the schema given up front (e.g. a mirror's fields) or else from the first chunk;
+    # a later record that does not fit fails the export instead of losing data
+    def __init__(self, out, schema=None):
+        self.out = out
+        self.schema = dict(schema) if schema else None
+
+    def _check(self, chunk):
+        if self.schema is None:
+            self.schema = record_schema(chunk)
+            return
+        unknown = {key for record in chunk if isinstance(record, dict) for key in record} - self.schema.keys()
+        if unknown:
+            raise SchemaError(f'Export columns are fixed by the first records; field(s) {", ".join(sorted(unknown))} '
+                              f'appeared later (export as JSON Lines, or from a local mirror)')
+
+
+class JsonLinesWriter:
+    """One JSON record per line"""
+    extension = 'jsonl'
+    mimetype = 'application/x-ndjson'
+
+    def __init__(self, out, schema=None):
+        self.out = out
+
+    def write(self, chunk):
+        self.out.write(''.join(json.dumps(record, separators=(',', ':'), default=str) + '\n'
+                               for record in chunk).encode('utf-8'))
+
+    def close(self):
+        pass
+
+
+class JsonArrayWriter(JsonLinesWriter):
+    """A single JSON array, written record by record"""
+    extension = 'json'
+    mimetype = 'application/json'
+
+    def __init__(self, out, schema=None):
+        super().__init__(out)
+        self._started = False
+
+    def write(self, chunk):
+        if not chunk:
+            return
+        body = ',\n'.join(json.dumps(record, separators=(',', ':'), default=str) for record in chunk)
+        self.out.write((',\n' if self._started else '[\n').encode('utf-8') + body.encode('utf-8'))
+        self._started = True
+
+    def close(self):
+        self.out.write(b'\n]\n' if self._started else b'[]\n')
+
+
+class CsvWriter(_ColumnarWriter):
+    """Header plus one row per record; nested values are written as JSON text.
+
+    Columns are the fields of schema ({field: kind}) or else of the first chunk;
+    a later record with other fields raises SchemaError.
+    """
+    extension = 'csv'
+    mimetype = 'text/csv'
+
+    def __init__(self, out, schema=None):
+        super().__init__(out, schema)
+        self._header = False
+
+    def write(self, chunk):
+        self._check(chunk)
+        text = io.StringIO()
+        writer = csv.writer(text)
+        if not self._header:
+            writer.writerow(list(self.schema))
+            self._header = True
+        for record in chunk:
+            writer.writerow([_flat_value(record.get(column)) for column in self.schema])
+        self.out.write(text.getvalue().encode('utf-8'))
+
+    def close(self):
+        pass
+
+
+class ParquetWriter(_ColumnarWriter):
+    """Columnar, zstd-compressed Parquet with one row group per chunk (needs pyarrow).
+
+    Columns and types come from schema ({field: kind}) or else from the first chunk:
+    'number' fields become float64, 'bool' fields bool, anything else strings (nested
+    values as JSON text). A later record with another field or a value of another
+    type raises SchemaError.
+    """
+    extension = 'parquet'
+    mimetype = 'application/vnd.apache.parquet'
+
+    def __init__(self, out, schema=None):
+        if pa is None:
+            raise ImportError('pyarrow is required for Parquet export')
+        super().__init__(out, schema)
+        self._writer = None
+
+    @staticmethod
+    def _type(kind):
+        if kind == 'number':
+            return pa.float64()
+        if kind == 'bool':
+            return pa.bool_()
+        return pa.string()
+
+    @staticmethod
+    def _convert(name, value, kind):
+        if value is None:
+            return None
+        if kind in ('number', 'bool'):
+            if value_kind(value) != kind:
+                raise SchemaError(f'Export column {name} holds {kind} values, got {value!r}')
+            return float(value) if kind == 'number' else value
+        flat = _flat_value(value)
+        return flat if isinstance(flat, str) else str(flat)
+
+    def write(self, chunk):
+        if not chunk:
+            return
+        self._check(chunk)
+        arrays = [pa.array([self._convert(name, record.get(name), kind) for record in chunk], type=self._type(kind))
+                  for name, kind in self.schema.items()]
+        writer = self._open()
+        writer.write_table(pa.Table.from_arrays(arrays, schema=writer.schema))
+
+    def _open(self):
+        if self._writer is None:
+            schema = pa.schema([(name, self._type(kind)) for name, kind in self.schema.items()])
+            self._writer = pq.ParquetWriter(self.out, schema, compression='zstd')
+        return self._writer
+
+    def close(self):
+        if self._writer is None and self.schema is not None:
+            self._open()  # no records: a file with the columns only
+        if self._writer is not None:
+            self._writer.close()
+
+
+# dataFormat values (case-insensitive) -> writer
+EXPORT_FORMATS = {
+    'json': JsonArrayWriter,
+    'jsonl': JsonLinesWriter,
+    'json lines': JsonLinesWriter,
+    'ndjson': JsonLinesWriter,
+    'csv': CsvWriter,
+    'parquet': ParquetWriter,
+    'columnar': ParquetWriter,
+}
+
+
+def export_writer(data_format):
+    writer = EXPORT_FORMATS.get(str(data_format or 'json').strip().lower())
+    if writer is None:
+        raise ValueError(f'Unknown export format {data_format!r} (use one of: {", ".join(sorted(EXPORT_FORMATS))})')
+    if writer is ParquetWriter and pa is None:
+        raise ImportError('pyarrow is required for Parquet export')
+    return writer
+
+
+class _ChunkBuffer(io.RawIOBase):
+    # Write-only sink whose contents are taken after every chunk
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def iter_export(chunks, data_format, schema=None):
+    """Yield the export file as bytes, one piece per chunk of records (for streamed responses).
+
+    schema ({field: kind}, see record_schema()) fixes the CSV / Parquet columns up front.
+    """
+    buffer = _ChunkBuffer()
+    writer = export_writer(data_format)(buffer, schema)
+    for chunk in chunks:
+        writer.write(chunk)
+        data = buffer.take()
+        if data:
+            yield data
+    writer.close()
+    data = buffer.take()
+    if data:
+        yield data
+
+
+def export_file(chunks, data_format, path, schema=None):
+    """Write the export to path chunk by chunk; returns {'path', 'records', 'bytes'}"""
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    tmp = path.with_name(path.name + '.tmp')
+    try:
+        with open(tmp, 'wb') as out:
+            writer = export_writer(data_format)(out, schema)
+            for chunk in chunks:
+                writer.write(chunk)
+                count += len(chunk)
+            writer.close()
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return {'path': str(path), 'records': count, 'bytes': path.stat().st_size}
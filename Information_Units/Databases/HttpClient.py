@@ -0,0 +1,309 @@
+import collections
+import contextvars
+import gzip
+import http.client
+import json
+import os
+import random
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from Information_Units.Metrics import Counter
+from Information_Units.UnitContext import cancelled, current_cancel_event
+
+
+# Shared HTTP client for remote database backends (environment variables)
+HTTP_POOL_SIZE = int(os.environ.get('EMOS_HTTP_POOL_SIZE', 8))  # keep-alive connections per host
+HTTP_TIMEOUT = float(os.environ.get('EMOS_HTTP_TIMEOUT', 30))  # seconds per request
+HTTP_RETRIES = int(os.environ.get('EMOS_HTTP_RETRIES', 4))
+HTTP_BACKOFF = float(os.environ.get('EMOS_HTTP_BACKOFF', 0.5))  # seconds, doubled per retry (with full jitter)
+HTTP_BACKOFF_MAX = float(os.environ.get('EMOS_HTTP_BACKOFF_MAX', 30))
+HTTP_PREFETCH = int(os.environ.get('EMOS_HTTP_PREFETCH', 4))  # pages requested ahead of the consumer
+HTTP_BULK_SIZE = int(os.environ.get('EMOS_HTTP_BULK_SIZE', 100))  # ids per bulk request
+HTTP_WORKERS = int(os.environ.get('EMOS_HTTP_WORKERS', 16))
+
+# Answers worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+http_requests = Counter('emos_http_requests_total', 'HTTP requests sent by database units', ['host', 'status'])
+http_retries = Counter('emos_http_retries_total', 'HTTP requests retried after an error or a transient status',
+                       ['host'])
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_http_executor():
+    # Created on first use so no threads exist in a gunicorn master before fork
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=HTTP_WORKERS, thread_name_prefix='emos-http')
+        return _executor
+
+
+class HttpError(Exception):
+    """Raised for failed requests (after retries) and non-2xx answers"""
+
+    def __init__(self, message, status=None, body=b''):
+        super().__init__(message)
+        self.status = status
+        self.body = body
+
+
+class HttpResponse:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body) if self.body else None
+
+
+def _item_path(data, path):
+    # 'meta.total_doc' -> data['meta']['total_doc']; None if missing
+    for key in path.split('.'):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def extract_items(data, items='data'):
+    """Records in an API answer: the answer itself if it is a list, else data[items] ('data', 'meta.results', ...)"""
+    if isinstance(data, list):
+        return data
+    if callable(items):
+        return items(data) or []
+    return _item_path(data, items) or []
+
+
+class HostPool:
+    """Keep-alive connections to one host; at most size requests run on it at a time"""
+
+    def __init__(self, scheme, netloc, size, timeout):
+        self.scheme = scheme
+        self.netloc = netloc
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = collections.deque()
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def acquire(self):
+        """Return (connection, reused)"""
+        self._slots.acquire()
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+            self.opened += 1
+        if self.scheme == 'https':
+            connection = http.client.HTTPSConnection(self.netloc, timeout=self.timeout,
+                                                     context=ssl.create_default_context())
+        else:
+            connection = http.client.HTTPConnection(self.netloc, timeout=self.timeout)
+        return connection, False
+
+    def release(self, connection, reusable=True):
+        if reusable:
+            with self._lock:
+                self._idle.append(connection)
+        else:
+            connection.close()
+        self._slots.release()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, collections.deque()
+        for connection in idle:
+            connection.close()
+
+
+class HttpClient:
+    """HTTP/1.1 client shared by database units.
+
+    - one keep-alive connection pool per host (EMOS_HTTP_POOL_SIZE connections);
+    - retries of connection errors and 429/5xx answers with exponential backoff and full
+      jitter, honouring Retry-After; waiting stops as soon as the unit call is cancelled;
+    - pages(): paginated endpoints, with the next pages requested while the current one is consumed;
+    - fetch_ids(): bulk id lookups, split into batches that are requested concurrently.
+    Answers are requested gzip-compressed.
+    """
+
+    def __init__(self, pool_size=None, timeout=None, retries=None, backoff=None, headers=None):
+        self.pool_size = pool_size or HTTP_POOL_SIZE
+        self.timeout = timeout or HTTP_TIMEOUT
+        self.retries = HTTP_RETRIES if retries is None else retries
+        self.backoff = HTTP_BACKOFF if backoff is None else backoff
+        self.headers = {'Accept': 'application/json', 'Accept-Encoding': 'gzip', 'User-Agent': 'EMOS'}
+        self.headers.update(headers or {})
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def pool(self, scheme, netloc):
+        with self._lock:
+            pool = self._pools.get((scheme, netloc))
+            if pool is None:
+                pool = self._pools[(scheme, netloc)] = HostPool(scheme, netloc, self.pool_size, self.timeout)
+            return pool
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+    # --- single requests ---
+
+    def request(self, method, url, params=None, json_body=None, headers=None):
+        """Send one request (retried as configured); raise HttpError unless the answer is 2xx"""
+        parts = urlsplit(url)
+        path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        if params:
+            path += ('&' if parts.query else '?') + urlencode(params, doseq=True)
+        body = json.dumps(json_body).encode('utf-8') if json_body is not None else None
+        request_headers = dict(self.headers, **(headers or {}))
+        if body is not None:
+            request_headers['Content-Type'] = 'application/json'
+        pool = self.pool(parts.scheme or 'http', parts.netloc)
+        attempt = 0
+        while True:
+            connection, reused = pool.acquire()
+            try:
+                response = self._send(connection, method, path, body, request_headers)
+            except (OSError, http.client.HTTPException) as e:
+                pool.release(connection, reusable=False)
+                if reused:
+                    continue  # the server closed an idle keep-alive connection - not a real failure
+                error, retry_after = HttpError(f'{method} {url} failed: {e}'), None
+            else:
+                pool.release(connection, reusable=not response.will_close)
+                http_requests.inc(host=parts.netloc, status=str(response.status))
+                if 200 <= response.status < 300:
+                    return HttpResponse(response.status, response.headers, response.body)
+                error = HttpError(f'{method} {url} returned {response.status}', response.status, response.body)
+                if response.status not in RETRY_STATUSES:
+                    raise error
+                retry_after = response.headers.get('Retry-After')
+            if attempt >= self.retries or cancelled():
+                raise error
+            attempt += 1
+            http_retries.inc(host=parts.netloc)
+            self._sleep(self._delay(attempt, retry_after))
+
+    @staticmethod
+    def _send(connection, method, path, body, headers):
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        data = response.read()
+        if response.getheader('Content-Encoding') == 'gzip':
+            data = gzip.decompress(data)
+        response.body = data
+        response.headers = dict(response.getheaders())
+        return response
+
+    def _delay(self, attempt, retry_after=None):
+        # Full jitter: clients that failed together do not retry together
+        delay = random.uniform(0, min(HTTP_BACKOFF_MAX, self.backoff * 2 ** (attempt - 1)))
+        try:
+            return max(delay, min(HTTP_BACKOFF_MAX, float(retry_after))) if retry_after else delay
+        except ValueError:  # Retry-After as an HTTP date
+            return delay
+
+    @staticmethod
+    def _sleep(seconds):
+        event = current_cancel_event.get()
+        if event is not None:
+            event.wait(seconds)
+        else:
+            time.sleep(seconds)
+
+    def get_json(self, url, params=None, headers=None):
+        return self.request('GET', url, params=params, headers=headers).json()
+
+    def post_json(self, url, json_body, params=None, headers=None):
+        return self.request('POST', url, params=params, json_body=json_body, headers=headers).json()
+
+    # --- many requests ---
+
+    def _submit(self, fn, *args):
+        # Requests run in a copy of the caller's context (logger, cancellation)
+        return get_http_executor().submit(contextvars.copy_context().run, fn, *args)
+
+    def _page(self, url, params, headers):
+        return self.get_json(url, params=params, headers=headers)
+
+    def pages(self, url, params=None, page_size=100, items='data', offset_param='offset', limit_param='limit',
+              total=None, max_items=None, prefetch=None, headers=None):
+        """Yield the records of an offset/limit paginated endpoint, in order.
+
+        Up to prefetch pages are in flight while the caller consumes the current one. Paging stops
+        at an empty page, at max_items, or at the total found under the key path total
+        (e.g. 'meta.total_doc') of the first answer. A short first page means the server caps
+        limit; page_size is lowered to its length so no records are skipped.
+        """
+        prefetch = max(1, prefetch or HTTP_PREFETCH)
+        in_flight = collections.deque()
+        next_offset = 0
+        limit = max_items
+        yielded = 0
+
+        def request_page():
+            nonlocal next_offset
+            page_params = dict(params or {}, **{offset_param: next_offset, limit_param: page_size})
+            in_flight.append(self._submit(self._page, url, page_params, headers))
+            next_offset += page_size
+
+        try:
+            request_page()
+            first = True
+            while in_flight:
+                data = in_flight.popleft().result()
+                page = extract_items(data, items)
+                if first:
+                    if total:
+                        count = _item_path(data, total)
+                        if isinstance(count, int):
+                            limit = count if limit is None else min(limit, count)
+                    if 0 < len(page) < page_size and (limit is None or len(page) < limit):
+                        # Capped by the server (or the last page): continue in pages of that size
+                        page_size = len(page)
+                        next_offset = page_size
+                    first = False
+                for item in page:
+                    if limit is not None and yielded >= limit:
+                        return
+                    yield item
+                    yielded += 1
+                if not page or (limit is not None and yielded >= limit) or cancelled():
+                    return
+                while len(in_flight) < prefetch and (limit is None or next_offset < limit):
+                    request_page()
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    def fetch_ids(self, url, ids, id_param='ids', batch_size=None, items='data', params=None, headers=None):
+        """Records for many ids, requested in concurrent batches of batch_size comma-separated ids"""
+        ids = [str(entry_id) for entry_id in ids]
+        batch_size = batch_size or HTTP_BULK_SIZE
+        futures = []
+        for start in range(0, len(ids), batch_size):
+            batch_params = dict(params or {}, **{id_param: ','.join(ids[start:start + batch_size])})
+            futures.append(self._submit(self._page, url, batch_params, headers))
+        records = []
+        try:
+            for future in futures:
+                records.extend(extract_items(future.result(), items))
+        finally:
+            for future in futures:
+                future.cancel()
+        return records
+
+
+# Shared by every database unit in this process
+http_client = HttpClient()
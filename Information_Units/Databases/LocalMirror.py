@@ -0,0 +1,489 @@
+import argparse
+import csv
+import gzip
+import io
+import json
+import math
+import mmap
+import os
+import pathlib
+import re
+import shutil
+import tarfile
+import time
+import zipfile
+import zlib
+from array import array
+
+from Information_Units.Databases.Composition import ATOMIC_NUMBERS, parse_formula, reduced_amounts, reduced_formula
+from Information_Units.Databases.ElementIndex import ElementIndex, parse_elements
+from Information_Units.Databases.Export import merge_kinds, value_kind
+from Information_Units.Databases.SearchQuery import compile_query
+
+try:
+    import numpy as np
+except ImportError:  # mirrors need numpy; without it databases fall back to their remote logic
+    np = None
+
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.parent.resolve()
+
+# One sub-directory per database, e.g. data/mirrors/materialsproject
+MIRROR_DIR = pathlib.Path(os.environ.get('EMOS_MIRROR_DIR', PROJECT_ROOT / 'data' / 'mirrors'))
+# Records returned by one retrieve() when the inputs do not set a limit
+MIRROR_MAX_RESULTS = int(os.environ.get('EMOS_MIRROR_MAX_RESULTS', 100))
+
+FORMAT_VERSION = 2
+
+# Record fields holding the entry id and the formula, in order of preference
+ID_FIELDS = ('material_id', 'id', 'entry_id', 'task_id', 'auid', 'jid', 'entry')
+FORMULA_FIELDS = ('formula_pretty', 'pretty_formula', 'formula', 'reduced_formula', 'full_formula',
+                  'chemical_formula', 'composition')
+
+
+def record_composition(record):
+    """Reduced {element: amount} of a dump record, or {} if it has no formula"""
+    for field in FORMULA_FIELDS:
+        value = record.get(field)
+        if isinstance(value, dict):  # {'Si': 1, 'O': 2}
+            amounts = {k: _number(v) for k, v in value.items()}
+            if amounts and all(k in ATOMIC_NUMBERS and v is not None for k, v in amounts.items()):
+                return reduced_amounts(amounts)
+        elif value:
+            amounts = parse_formula(value)
+            if amounts:
+                return reduced_amounts(amounts)
+    return {}
+
+
+# --- dump readers ---
+
+def _number(value):
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _csv_row(row):
+    # Numbers as floats, except ids ('123' stays '123')
+    return {key: value if key in ID_FIELDS or _number(value) is None else _number(value) for key, value in row.items()}
+
+
+def _cif_number(value):
+    # '5.431(2)' -> 5.431
+    return _number(value.split('(')[0]) if isinstance(value, str) else None
+
+
+def parse_cif(text, name=''):
+    """One record per data_ block: id, formula, space group, cell parameters and the raw CIF"""
+    records = []
+    blocks = re.split(r'(?m)^data_', text)
+    for block in blocks[1:]:
+        block_name, _, _ = block.partition('\n')
+        fields = {}
+        for line in block.splitlines():
+            line = line.strip()
+            if line.startswith('_') and ' ' in line:
+                key, value = line.split(None, 1)
+                fields[key.lower()] = value.strip().strip('\'"')
+        record = {
+            'id': fields.get('_database_code_icsd') or fields.get('_cod_database_code') or block_name.strip() or name,
+            'formula': fields.get('_chemical_formula_sum', ''),
+            'spacegroup': fields.get('_symmetry_space_group_name_h-m') or fields.get('_space_group_name_h-m_alt'),
+            'spacegroup_number': _cif_number(fields.get('_space_group_it_number') or
+                                             fields.get('_symmetry_int_tables_number')),
+            'cif': 'data_' + block,
+        }
+        for key in ('a', 'b', 'c', 'alpha', 'beta', 'gamma'):
+            record[key] = _cif_number(fields.get(f'_cell_length_{key}') or fields.get(f'_cell_angle_{key}'))
+        record['volume'] = _cif_number(fields.get('_cell_volume'))
+        records.append(record)
+    return records
+
+
+def _iter_json(text):
+    text = text.lstrip()
+    if not text:
+        return
+    if text[0] in '[{':
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            data = None  # JSON Lines starting with '{'
+        if isinstance(data, list):
+            yield from data
+            return
+        if isinstance(data, dict):
+            if isinstance(data.get('data'), list):  # API-style {"data": [...]}
+                yield from data['data']
+            elif all(isinstance(v, dict) for v in data.values()):  # {id: record}
+                for entry_id, record in data.items():
+                    yield {'id': entry_id, **record}
+            else:
+                yield data
+            return
+    for line in text.splitlines():
+        if line.strip():
+            yield json.loads(line)
+
+
+def _iter_member(name, data):
+    name = name.lower()
+    if name.endswith('.gz'):
+        data = gzip.decompress(data)
+        name = name[:-len('.gz')]
+    if name.endswith(('.json', '.jsonl', '.ndjson')):
+        yield from _iter_json(data.decode('utf-8'))
+    elif name.endswith('.csv'):
+        for row in csv.DictReader(io.StringIO(data.decode('utf-8'))):
+            yield _csv_row(row)
+    elif name.endswith('.cif'):
+        yield from parse_cif(data.decode('utf-8', errors='replace'), pathlib.Path(name).stem)
+
+
+def iter_dump(path):
+    """Yield the records of a JSON / JSON Lines / CSV / CIF dump, optionally gzipped or in a zip/tar archive"""
+    path = pathlib.Path(path)
+    lower = path.name.lower()
+    if path.is_dir():
+        for child in sorted(path.rglob('*')):
+            if child.is_file():
+                yield from iter_dump(child)
+    elif lower.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                yield from _iter_member(member, archive.read(member))
+    elif lower.endswith(('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')):
+        with tarfile.open(path) as archive:
+            for member in archive:
+                if member.isfile():
+                    yield from _iter_member(member.name, archive.extractfile(member).read())
+    elif lower.endswith('.csv'):
+        # Streamed - CSV dumps can be far larger than memory
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                yield _csv_row(row)
+    elif lower.endswith(('.jsonl', '.ndjson')):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        yield from _iter_member(path.name, path.read_bytes())
+
+
+# --- store ---
+
+_NAN = array('d', [math.nan])
+
+
+class MirrorWriter:
+    """Builds a mirror directory from records.
+
+    Layout:
+      manifest.json                  entry count, columns, fields (name -> kind), source files
+      ids.npy / formulas.npy         entry id and reduced formula per entry
+      ids_sorted.npy / ids_order.npy  sorted copies and their argsort, for binary-search lookups
+      columns/<name>.npy             one float64 column per numeric property (NaN = missing)
+      composition_*.npy              reduced composition per entry (CSR: ptr, atomic number, amount)
+      element_*.npy / system_*.npy   inverted element index (see ElementIndex.py)
+      records.bin / records_idx.npy  zlib-compressed JSON of each full record and its offsets
+    Numeric columns are written as .npy files so readers can memory-map them.
+    """
+
+    def __init__(self, directory, database_name=''):
+        self.directory = pathlib.Path(directory)
+        self.database_name = database_name
+        self.tmp = self.directory.with_name(self.directory.name + '.tmp')
+        shutil.rmtree(self.tmp, ignore_errors=True)
+        (self.tmp / 'columns').mkdir(parents=True)
+        self._blob = open(self.tmp / 'records.bin', 'wb')
+        self._offsets = [0]
+        self._ids = []
+        self._formulas = []
+        self._columns = {}  # name -> array('d'), padded with NaN up to the last entry holding a value
+        self._fields = {}   # every record key -> 'number', 'bool' or 'string' (see Export.record_schema)
+        self._composition_ptr = array('q', [0])
+        self._composition_z = array('B')
+        self._composition_amount = array('f')
+        self.count = 0
+
+    def add(self, record):
+        entry_id = next((record[f] for f in ID_FIELDS if record.get(f) not in (None, '')), None)
+        entry_id = str(entry_id) if entry_id is not None else f'{self.database_name or "entry"}-{self.count}'
+        self._ids.append(entry_id)
+        composition = record_composition(record)
+        self._formulas.append(reduced_formula(composition))
+        for element in sorted(composition):
+            self._composition_z.append(ATOMIC_NUMBERS[element])
+            self._composition_amount.append(composition[element])
+        self._composition_ptr.append(len(self._composition_z))
+        for key, value in record.items():
+            kind = value_kind(value)
+            if key not in self._fields or self._fields[key] != kind:
+                self._fields[key] = merge_kinds(self._fields.get(key), kind)
+            number = _number(value) if key not in ID_FIELDS else None
+            if number is None:
+                continue
+            column = self._columns.get(key)
+            if column is None:
+                column = self._columns[key] = array('d')
+            if len(column) < self.count:
+                # Only columns that get a value are touched: the gap since their last value is filled here
+                column.extend(_NAN * (self.count - len(column)))
+            column.append(number)
+        self.count += 1
+        data = zlib.compress(json.dumps(record, separators=(',', ':'), default=str).encode('utf-8'))
+        self._blob.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+
+    def close(self, sources=()):
+        self._blob.close()
+        ids = np.array(self._ids, dtype=str) if self._ids else np.zeros(0, dtype='<U1')
+        formulas = np.array(self._formulas, dtype=str) if self._formulas else np.zeros(0, dtype='<U1')
+        for name, values in (('ids', ids), ('formulas', formulas)):
+            order = np.argsort(values, kind='stable')
+            np.save(self.tmp / f'{name}.npy', values)
+            np.save(self.tmp / f'{name}_sorted.npy', values[order])
+            np.save(self.tmp / f'{name}_order.npy', order)
+        np.save(self.tmp / 'records_idx.npy', np.array(self._offsets, dtype=np.int64))
+        np.save(self.tmp / 'composition_ptr.npy', np.frombuffer(self._composition_ptr, dtype=np.int64))
+        np.save(self.tmp / 'composition_z.npy', np.frombuffer(self._composition_z, dtype=np.uint8))
+        np.save(self.tmp / 'composition_amount.npy', np.frombuffer(self._composition_amount, dtype=np.float32))
+        ElementIndex.build(np.frombuffer(self._composition_ptr, dtype=np.int64),
+                           np.frombuffer(self._composition_z, dtype=np.uint8)).save(self.tmp)
+        columns = {}
+        for index, (name, values) in enumerate(sorted(self._columns.items())):
+            file_name = f'{index}.npy'
+            if len(values) < self.count:
+                values.extend(_NAN * (self.count - len(values)))
+            np.save(self.tmp / 'columns' / file_name, np.frombuffer(values, dtype=np.float64))
+            columns[name] = file_name
+        manifest = {
+            'format_version': FORMAT_VERSION,
+            'database': self.database_name,
+            'count': self.count,
+            'columns': columns,
+            'fields': self._fields,
+            'sources': [str(s) for s in sources],
+            'created_at': time.time(),
+        }
+        with open(self.tmp / 'manifest.json', 'w') as f:
+            json.dump(manifest, f, indent=2)
+        # Swap in the new mirror; processes that still map the old files keep reading them
+        old = self.directory.with_name(self.directory.name + '.old')
+        shutil.rmtree(old, ignore_errors=True)
+        if self.directory.exists():
+            os.replace(self.directory, old)
+        os.replace(self.tmp, self.directory)
+        shutil.rmtree(old, ignore_errors=True)
+        return self.directory
+
+
+def ingest(sources, directory, database_name=''):
+    """Build (or rebuild) a mirror from dump files; returns the number of entries"""
+    if np is None:
+        raise ImportError('numpy is required to build a local mirror')
+    writer = MirrorWriter(directory, database_name)
+    try:
+        for source in sources:
+            for record in iter_dump(source):
+                if isinstance(record, dict):
+                    writer.add(record)
+    except BaseException:
+        writer._blob.close()
+        shutil.rmtree(writer.tmp, ignore_errors=True)
+        raise
+    writer.close(sources)
+    return writer.count
+
+
+class LocalMirror:
+    """Read-only, memory-mapped view of a mirror directory written by MirrorWriter"""
+
+    def __init__(self, directory):
+        if np is None:
+            raise ImportError('numpy is required to read a local mirror')
+        self.directory = pathlib.Path(directory)
+        with open(self.directory / 'manifest.json') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f'Unsupported mirror format {self.manifest.get("format_version")} in {directory}')
+        self.ids = self._load('ids.npy')
+        self.ids_sorted = self._load('ids_sorted.npy')
+        self.ids_order = self._load('ids_order.npy')
+        self.formulas = self._load('formulas.npy')
+        self.formulas_sorted = self._load('formulas_sorted.npy')
+        self.formulas_order = self._load('formulas_order.npy')
+        self.offsets = self._load('records_idx.npy')
+        self.composition_ptr = self._load('composition_ptr.npy')
+        self.composition_z = self._load('composition_z.npy')
+        self.composition_amount = self._load('composition_amount.npy')
+        self._columns = {}
+        self._derived = {}
+        self._blob_file = open(self.directory / 'records.bin', 'rb')
+        size = os.fstat(self._blob_file.fileno()).st_size
+        self._blob = mmap.mmap(self._blob_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def _load(self, name):
+        return np.load(self.directory / name, mmap_mode='r')
+
+    def __len__(self):
+        return self.manifest['count']
+
+    @property
+    def column_names(self):
+        return sorted(self.manifest['columns'])
+
+    @property
+    def fields(self):
+        """{field: kind} of every record key, in first-seen order (None for mirrors ingested without it)"""
+        return self.manifest.get('fields')
+
+    def column(self, name):
+        """Memory-mapped float64 column (NaN where an entry has no value); KeyError if unknown"""
+        column = self._columns.get(name)
+        if column is None:
+            column = np.load(self.directory / 'columns' / self.manifest['columns'][name], mmap_mode='r')
+            self._columns[name] = column
+        return column
+
+    def _derive(self, name, build):
+        value = self._derived.get(name)
+        if value is None:
+            value = self._derived[name] = build()
+        return value
+
+    @property
+    def composition_rows(self):
+        """Entry index of every composition_z / composition_amount element"""
+        return self._derive('rows', lambda: np.repeat(np.arange(len(self), dtype=np.int64),
+                                                     np.diff(self.composition_ptr)))
+
+    @property
+    def nelements(self):
+        return self._derive('nelements', lambda: np.diff(self.composition_ptr))
+
+    @property
+    def natoms(self):
+        """Atoms per reduced formula unit"""
+        return self._derive('natoms', lambda: np.bincount(self.composition_rows, weights=self.composition_amount,
+                                                          minlength=len(self)))
+
+    @property
+    def element_index(self):
+        """Inverted element index; built in memory for mirrors ingested before it was written to disk"""
+        return self._derive('element_index', lambda: ElementIndex.load(self.directory)
+                            or ElementIndex.build(self.composition_ptr, self.composition_z))
+
+    def element_amounts(self, element):
+        """Amount of element in each entry's reduced formula (0 where absent)"""
+        amounts = np.zeros(len(self))
+        selected = self.composition_z == ATOMIC_NUMBERS[element]
+        amounts[self.composition_rows[selected]] = self.composition_amount[selected]
+        return amounts
+
+    def element_counts(self, elements):
+        """Number of the given elements present in each entry"""
+        numbers = [ATOMIC_NUMBERS[element] for element in elements]
+        selected = np.isin(self.composition_z, numbers)
+        return np.bincount(self.composition_rows[selected], minlength=len(self))
+
+    def record(self, index):
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        return json.loads(zlib.decompress(self._blob[start:end]))
+
+    def records(self, indices, limit=None):
+        indices = list(indices if limit is None else indices[:limit])
+        return [self.record(int(index)) for index in indices]
+
+    @staticmethod
+    def _sorted_range(sorted_values, order, key):
+        # Indices of entries equal to key, by binary search over the memory-mapped sorted copy
+        left = np.searchsorted(sorted_values, key, side='left')
+        right = np.searchsorted(sorted_values, key, side='right')
+        return np.asarray(order[left:right])
+
+    def find_ids(self, entry_ids):
+        indices = [self._sorted_range(self.ids_sorted, self.ids_order, entry_id) for entry_id in map(str, entry_ids)]
+        return np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64)
+
+    def find_formula(self, formula):
+        """Indices of entries whose reduced formula equals formula's"""
+        amounts = parse_formula(formula)
+        if not amounts:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(self._sorted_range(self.formulas_sorted, self.formulas_order, reduced_formula(amounts)))
+
+    def query(self, inputs, limit=None):
+        """Indices of the entries matching retrieve() inputs, or None if the inputs hold no query.
+
+        Understood inputs: material_id / ids (entry ids), material / formula (reduced formula),
+        search_criteria (see SearchQuery.py), optionally narrowed by property_range ('1-5'),
+        elements (entries containing all of them: 'Si,O' or ['Si', 'O']) and chemsys / composition
+        (entries made only of the system's elements: 'Ga-As' or 'GaAs').
+        """
+        entry_ids = inputs.get('ids') or inputs.get('material_id')
+        if entry_ids:
+            entry_ids = entry_ids if isinstance(entry_ids, (list, tuple)) else str(entry_ids).split(',')
+            indices = self.find_ids(entry_id.strip() for entry_id in map(str, entry_ids))
+        elif inputs.get('formula') or inputs.get('material'):
+            indices = self.find_formula(inputs.get('formula') or inputs.get('material'))
+        elif inputs.get('search_criteria'):
+            query = compile_query(str(inputs['search_criteria']), str(inputs.get('property_range') or ''))
+            indices = np.flatnonzero(query(self))
+        elif parse_elements(inputs.get('elements')):
+            indices = self.element_index.containing(parse_elements(inputs['elements']))
+        elif parse_elements(inputs.get('chemsys') or inputs.get('composition')):
+            indices = self.element_index.within(parse_elements(inputs.get('chemsys') or inputs.get('composition')))
+        else:
+            return None
+        return indices if limit is None else indices[:limit]
+
+    def iter_records(self, inputs, limit=None, chunk_size=1000):
+        """Yield the records matching inputs (every record if they hold no query) in chunks of chunk_size"""
+        indices = self.query(inputs, limit)
+        if indices is None:
+            indices = range(len(self) if limit is None else min(limit, len(self)))
+        for start in range(0, len(indices), chunk_size):
+            yield self.records(indices[start:start + chunk_size])
+
+    def close(self):
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._blob_file.close()
+
+
+def mirror_path(database_name):
+    return MIRROR_DIR / database_name
+
+
+def open_mirror(database_name):
+    """LocalMirror of a database, or None if it has not been ingested"""
+    path = mirror_path(database_name)
+    if not (path / 'manifest.json').exists():
+        return None
+    return LocalMirror(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build a local database mirror from bulk dumps')
+    parser.add_argument('database', help='database key, e.g. materialsproject')
+    parser.add_argument('sources', nargs='+', help='JSON / JSON Lines / CSV / CIF files, directories or archives')
+    parser.add_argument('--directory', help=f'mirror directory (default: {MIRROR_DIR}/<database>)')
+    args = parser.parse_args(argv)
+    directory = args.directory or mirror_path(args.database)
+    start = time.perf_counter()
+    count = ingest(args.sources, directory, args.database)
+    print(f'{args.database}: {count} entries written to {directory} in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
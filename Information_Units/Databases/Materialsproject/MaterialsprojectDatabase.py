@@ -10,8 +10,7 @@ class MaterialsprojectDatabase(BaseDatabase):
         return msg
 
     def retrieve(self, inputs: dict) -> str:
-        # Implement retrieval logic here
-        # For now, just simulate a path
+        # Remote API retrieval is not implemented yet - answer from the local mirror if ingested
         if self.logger:
             self.logger.log("Retrieved from Materials Project")
-        return None
\ No newline at end of file
+        return self.retrieve_from_mirror(inputs)
\ No newline at end of file
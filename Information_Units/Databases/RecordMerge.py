@@ -0,0 +1,190 @@
+import functools
+import math
+import os
+import threading
+
+from Information_Units.Metrics import Counter
+from Information_Units.Databases.Composition import reduced_formula
+from Information_Units.Databases.LocalMirror import FORMULA_FIELDS, ID_FIELDS, record_composition
+
+
+# Decimals kept of the volume-normalized cell lengths (angles are compared in whole degrees)
+LATTICE_DECIMALS = int(os.environ.get('EMOS_DEDUP_LATTICE_DECIMALS', 2))
+
+# Record fields holding the space group / the cell, in order of preference
+SPACEGROUP_FIELDS = ('spacegroup_number', 'space_group_number', 'spg_number', 'spacegroup', 'space_group', 'symmetry')
+LATTICE_FIELDS = ('lattice', 'structure', 'atoms', 'unit_cell', 'lattice_mat')
+
+duplicate_records = Counter('emos_duplicate_records_total', 'Database records merged into an earlier record of the same material',
+                            ['database'])
+
+
+def _spacegroup(record):
+    # 227 for 227, '227', 'Fd-3m', 'F d -3 m:1' or {'number': 227, 'symbol': 'Fd-3m'}
+    for field in SPACEGROUP_FIELDS:
+        value = record.get(field)
+        if isinstance(value, dict):
+            value = value.get('number') or value.get('symbol')
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if value not in (None, ''):
+            text = str(value).replace(' ', '').split(':')[0]
+            return int(text) if text.isdigit() else text
+    return None
+
+
+def _cell_parameters(value):
+    # (a, b, c, alpha, beta, gamma) from a 3x3 matrix or a dict with a matrix / the parameters
+    if isinstance(value, dict):
+        for key in ('lattice', 'matrix', 'lattice_mat'):
+            if key in value:
+                return _cell_parameters(value[key])
+        if all(key in value for key in ('a', 'b', 'c', 'alpha', 'beta', 'gamma')):
+            return tuple(float(value[key]) for key in ('a', 'b', 'c', 'alpha', 'beta', 'gamma'))
+        return None
+    if isinstance(value, (list, tuple)) and len(value) == 3 and all(len(row) == 3 for row in value):
+        vectors = [[float(x) for x in row] for row in value]
+        lengths = [math.sqrt(sum(x * x for x in vector)) for vector in vectors]
+        if not all(lengths):
+            return None
+        angles = []
+        for i, j in ((1, 2), (0, 2), (0, 1)):
+            cosine = sum(x * y for x, y in zip(vectors[i], vectors[j])) / (lengths[i] * lengths[j])
+            angles.append(math.degrees(math.acos(max(-1.0, min(1.0, cosine)))))
+        return tuple(lengths) + tuple(angles)
+    return None
+
+
+def lattice_key(parameters):
+    """Hashable shape of a cell: lengths scaled to unit volume, independent of axis order"""
+    a, b, c, alpha, beta, gamma = parameters
+    cos_alpha, cos_beta, cos_gamma = (math.cos(math.radians(angle)) for angle in (alpha, beta, gamma))
+    volume_factor = 1 - cos_alpha ** 2 - cos_beta ** 2 - cos_gamma ** 2 + 2 * cos_alpha * cos_beta * cos_gamma
+    if volume_factor <= 0 or min(a, b, c) <= 0:
+        return None
+    scale = (a * b * c * math.sqrt(volume_factor)) ** (-1 / 3)
+    # alpha is opposite a, so (length, angle) pairs survive a relabelling of the axes;
+    # obtuse and acute settings of the same angle describe the same cell
+    return tuple(sorted([(round(a * scale, LATTICE_DECIMALS), round(min(alpha, 180 - alpha))),
+                         (round(b * scale, LATTICE_DECIMALS), round(min(beta, 180 - beta))),
+                         (round(c * scale, LATTICE_DECIMALS), round(min(gamma, 180 - gamma)))]))
+
+
+def _lattice(record):
+    for field in LATTICE_FIELDS:
+        if record.get(field) is not None:
+            try:
+                parameters = _cell_parameters(record[field])
+            except (TypeError, ValueError):
+                parameters = None
+            if parameters:
+                return parameters
+    if all(isinstance(record.get(key), (int, float)) for key in ('a', 'b', 'c', 'alpha', 'beta', 'gamma')):
+        return tuple(float(record[key]) for key in ('a', 'b', 'c', 'alpha', 'beta', 'gamma'))
+    return None
+
+
+@functools.lru_cache(maxsize=65536)
+def _reduced_formula(formula):
+    return reduced_formula(record_composition({'formula': formula}))
+
+
+def _formula(record):
+    # The same formulas come back from every database, so plain formula strings are reduced once
+    for field in FORMULA_FIELDS:
+        value = record.get(field)
+        if isinstance(value, str) and value:
+            return _reduced_formula(value)
+        if value:
+            return reduced_formula(record_composition(record))
+    return ''
+
+
+def record_fingerprint(record):
+    """(reduced formula, space group, lattice key) of a database record; either of the last two may be None.
+
+    None if the record cannot be identified well enough to be merged: it needs a formula
+    and a space group or a cell, otherwise polymorphs of one compound would collapse.
+    """
+    if not isinstance(record, dict):
+        return None
+    formula = _formula(record)
+    if not formula:
+        return None
+    spacegroup = _spacegroup(record)
+    parameters = _lattice(record)
+    cell = lattice_key(parameters) if parameters else None
+    if spacegroup is None and cell is None:
+        return None
+    return formula, spacegroup, cell
+
+
+def _entry_id(record):
+    if isinstance(record, dict):
+        return next((str(record[f]) for f in ID_FIELDS if record.get(f) not in (None, '')), None)
+    return None
+
+
+class RecordMerger:
+    """Collapses records of the same material returned by several databases.
+
+    Records arrive one database answer at a time; add() returns the records not seen before,
+    each a copy with a 'provenance' list of {'database', 'id'}. Two records are the same
+    material if they share formula and space group, and their cells when both have one, so a
+    database that reports no cell still merges with one that does. A duplicate only adds its
+    source to the provenance of the record that was kept (the first one to arrive), as a new list.
+
+    That record has usually been passed on already, so its provenance is only final once
+    every database has answered.
+    """
+
+    def __init__(self):
+        self._records = {}  # (formula, spacegroup) -> [[cell or None, kept record], ...]
+        self._lock = threading.Lock()
+        self.duplicates = 0
+        self.cross_database = 0  # duplicates of a record no earlier answer of their own database had
+
+    def _match(self, fingerprint):
+        formula, spacegroup, cell = fingerprint
+        kept = self._records.setdefault((formula, spacegroup), [])
+        if cell is None:
+            return kept[0] if kept else None
+        # The same cell first, else a record without one (which takes this cell from now on)
+        for entry in kept:
+            if entry[0] == cell:
+                return entry
+        for entry in kept:
+            if entry[0] is None:
+                entry[0] = cell
+                return entry
+        return None
+
+    def add(self, database, records):
+        unique = []
+        duplicates = 0
+        cross_database = 0
+        with self._lock:
+            for record in records:
+                source = {'database': database, 'id': _entry_id(record)}
+                if not isinstance(record, dict):
+                    unique.append(record)
+                    continue
+                fingerprint = record_fingerprint(record)
+                entry = self._match(fingerprint) if fingerprint else None
+                if entry is not None:
+                    kept = entry[1]
+                    if all(known['database'] != database for known in kept['provenance']):
+                        cross_database += 1
+                    # A new list, so a reader holding the old provenance never sees it change
+                    kept['provenance'] = kept['provenance'] + [source]
+                    duplicates += 1
+                    continue
+                record = dict(record, provenance=[source])
+                if fingerprint:
+                    self._records[fingerprint[:2]].append([fingerprint[2], record])
+                unique.append(record)
+            self.duplicates += duplicates
+            self.cross_database += cross_database
+        if duplicates:
+            duplicate_records.inc(duplicates, database=database)
+        return unique
@@ -0,0 +1,244 @@
+import contextvars
+import functools
+import hashlib
+import json
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from Information_Units.Metrics import Counter
+from Information_Units.UnitContext import current_logger
+
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.parent.resolve()
+
+# On-disk cache of retrieve() results, shared by every worker process using the same directory
+RETRIEVE_CACHE_DIR = os.environ.get('EMOS_RETRIEVE_CACHE_DIR', str(PROJECT_ROOT / 'data' / 'cache'))
+# Size cap of the compressed results in MB (0 disables the cache); least recently used results go first
+RETRIEVE_CACHE_MB = float(os.environ.get('EMOS_RETRIEVE_CACHE_MB', 512))
+# Seconds a result is fresh; after that it is served stale while it is fetched again in the background
+RETRIEVE_CACHE_TTL = float(os.environ.get('EMOS_RETRIEVE_CACHE_TTL', 3600))
+# Seconds after which a result is too old to be served at all
+RETRIEVE_CACHE_MAX_AGE = float(os.environ.get('EMOS_RETRIEVE_CACHE_MAX_AGE', 7 * 24 * 3600))
+
+# Last-access times are only rewritten when older than this, so hits rarely write
+_ACCESS_RESOLUTION = 60
+
+# Set by uncached(): retrieve() calls in this context skip the cache
+_bypass = contextvars.ContextVar('emos_retrieve_cache_bypass', default=False)
+
+retrieve_cache_hits = Counter('emos_retrieve_cache_hits_total', 'Database results served from the retrieve cache',
+                              ['database', 'state'])
+retrieve_cache_misses = Counter('emos_retrieve_cache_misses_total', 'Database results fetched from the database',
+                                ['database'])
+retrieve_cache_errors = Counter('emos_retrieve_cache_errors_total',
+                               'Retrieve cache reads and writes that failed (the database is queried instead)',
+                               ['operation'])
+retrieve_cache_evictions = Counter('emos_retrieve_cache_evictions_total',
+                                   'Results evicted to keep the retrieve cache within its size cap')
+
+
+def _canonical_value(value):
+    # JSON-ready value with sorted keys and trimmed strings
+    if isinstance(value, dict):
+        return {str(k): _canonical_value(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_canonical_value(v) for v in value]
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    raise TypeError(f'cannot cache a query with {type(value).__name__}')
+
+
+def retrieve_key(database, inputs):
+    """Cache key: database name and version, and the canonical query.
+
+    Returns None if the inputs cannot be canonicalized (the call is then not cached).
+    """
+    try:
+        if database.cache_parameters is None:
+            query = inputs
+        else:
+            query = {k: inputs.get(k) for k in database.cache_parameters}
+        payload = json.dumps([database.database_name, database.cache_version(), _canonical_value(query)],
+                             sort_keys=True, separators=(',', ':'))
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RetrieveCache:
+    """SQLite store of zlib-compressed retrieve() results with a size cap and LRU eviction.
+
+    SQLite in WAL mode lets every worker process on the node read and write the same file;
+    results survive restarts.
+    """
+
+    def __init__(self, directory=None, max_mb=None, ttl=None, max_age=None):
+        self.max_bytes = int((RETRIEVE_CACHE_MB if max_mb is None else max_mb) * 1024 * 1024)
+        self.ttl = RETRIEVE_CACHE_TTL if ttl is None else ttl
+        self.max_age = RETRIEVE_CACHE_MAX_AGE if max_age is None else max_age
+        self.directory = directory or RETRIEVE_CACHE_DIR
+        self.path = os.path.join(self.directory, 'retrieve.sqlite')
+        self._initialized = False
+        self._lock = threading.Lock()
+        self._refreshing = set()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _connect(self):
+        if not self._initialized:
+            # Created on first use, so importing this module never touches the disk
+            with self._lock:
+                if not self._initialized:
+                    os.makedirs(self.directory, exist_ok=True)
+                    connection = sqlite3.connect(self.path, timeout=30)
+                    try:
+                        connection.execute('PRAGMA journal_mode=WAL')
+                        connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, database TEXT, '
+                                           'value BLOB, size INTEGER, created REAL, accessed REAL)')
+                        connection.execute('CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)')
+                        connection.commit()
+                    finally:
+                        connection.close()
+                    self._initialized = True
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def _error(operation, error):
+        # A broken cache must not break retrieval, but it must not fail silently either
+        retrieve_cache_errors.inc(operation=operation)
+        logger = current_logger.get()
+        if logger:
+            logger.log(f'Retrieve cache {operation} failed: {error}', 'warning')
+
+    def get(self, key, database=''):
+        """Return (state, result): state is 'fresh', 'stale' or None (missing or too old)"""
+        now = time.time()
+        try:
+            connection = self._connect()
+            try:
+                with connection:
+                    row = connection.execute('SELECT value, created, accessed FROM results WHERE key = ?',
+                                             (key,)).fetchone()
+                    if row is not None and now - row[2] > _ACCESS_RESOLUTION:
+                        connection.execute('UPDATE results SET accessed = ? WHERE key = ?', (now, key))
+            finally:
+                connection.close()
+        except (OSError, sqlite3.Error) as e:
+            self._error('read', e)
+            row = None
+        age = now - row[1] if row else None
+        if row is None or age > self.max_age:
+            retrieve_cache_misses.inc(database=database)
+            return None, None
+        state = 'fresh' if age <= self.ttl else 'stale'
+        retrieve_cache_hits.inc(database=database, state=state)
+        return state, json.loads(zlib.decompress(row[0]))
+
+    def put(self, key, result, database=''):
+        try:
+            value = zlib.compress(json.dumps(result, separators=(',', ':')).encode('utf-8'))
+        except (TypeError, ValueError):
+            return  # only JSON results are cached
+        if len(value) > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)',
+                                       (key, database, value, len(value), now, now))
+                    self._evict(connection)
+            finally:
+                connection.close()
+        except (OSError, sqlite3.Error) as e:
+            self._error('write', e)
+
+    def _evict(self, connection):
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used results until 90% of the cap is left, making room for a few more
+        excess = total - int(self.max_bytes * 0.9)
+        keys = []
+        for key, size in connection.execute('SELECT key, size FROM results ORDER BY accessed'):
+            keys.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        connection.executemany('DELETE FROM results WHERE key = ?', keys)
+        retrieve_cache_evictions.inc(len(keys))
+
+    def refresh(self, key, fetch, database=''):
+        """Fetch a stale result again in a background thread (once per key and process)"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                result = fetch()
+                if result is not None:
+                    self.put(key, result, database)
+            except Exception:
+                pass  # the stale result stays until the next try
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True, name='emos-retrieve-refresh').start()
+
+    def clear(self):
+        try:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.execute('DELETE FROM results')
+            finally:
+                connection.close()
+        except (OSError, sqlite3.Error) as e:
+            self._error('clear', e)
+
+
+retrieve_cache = RetrieveCache()
+
+
+@contextmanager
+def uncached():
+    """Answer retrieve() calls made in this context from the database, without reading or
+    writing the cache - for export-sized results that would only evict everything else"""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def memoize_retrieve(method):
+    """Wrap retrieve() so repeated queries are answered from the on-disk cache"""
+    @functools.wraps(method)
+    def wrapper(self, inputs):
+        key = retrieve_key(self, inputs) if self.memoize and retrieve_cache.enabled and not _bypass.get() else None
+        if key is None:
+            return method(self, inputs)
+        state, result = retrieve_cache.get(key, self.database_name)
+        if state == 'stale':
+            retrieve_cache.refresh(key, lambda: method(self, dict(inputs)), self.database_name)
+        if state is not None:
+            return result
+        result = method(self, inputs)
+        if result is not None:
+            retrieve_cache.put(key, result, self.database_name)
+        return result
+
+    return wrapper
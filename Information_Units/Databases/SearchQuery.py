@@ -0,0 +1,330 @@
+import functools
+import re
+
+from Information_Units.Databases.Composition import ATOMIC_NUMBERS, parse_formula, reduced_formula
+
+try:
+    import numpy as np
+except ImportError:  # queries are only evaluated against local mirrors, which need numpy
+    np = None
+
+
+# Common property names and the column names the different databases use for them
+PROPERTY_ALIASES = {
+    'bandgap': ('band_gap', 'bandgap', 'gap', 'egap', 'optb88vdw_bandgap', 'band_gap_pbe'),
+    'formationenergy': ('formation_energy_per_atom', 'formation_energy', 'delta_e', 'enthalpy_formation_atom'),
+    'energyabovehull': ('energy_above_hull', 'e_above_hull', 'ehull', 'stability'),
+    'density': ('density', 'density_atomic'),
+    'volume': ('volume',),
+    'nsites': ('nsites', 'natoms_cell'),
+    'spacegroup': ('spacegroup_number', 'space_group_number', 'spacegroup'),
+}
+
+# Every known name -> all names of its property, normalized (egap -> bandgap, band_gap, gap, ...)
+_ALIAS_GROUPS = {}
+for _key, _names in PROPERTY_ALIASES.items():
+    _group = tuple(dict.fromkeys(name.lower().replace('_', '') for name in (_key,) + _names))
+    for _name in _group:
+        _ALIAS_GROUPS[_name] = _group
+
+# Compiled queries kept per process (search criteria repeat a lot in interactive use)
+QUERY_CACHE_SIZE = 256
+
+_TOKEN = re.compile(r'\s*(?:(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)'
+                    r'|(?P<op>>=|<=|==|!=|&&|\|\||[<>=!(),\-])'
+                    r'|(?P<name>[A-Za-z_][A-Za-z0-9_.]*))')
+_RANGE = re.compile(r'^\s*(-?\d*\.?\d+(?:[eE][-+]?\d+)?)\s*(?:-|to|\.\.|:)\s*(-?\d*\.?\d+(?:[eE][-+]?\d+)?)\s*$')
+_COMPARISONS = ('>', '>=', '<', '<=', '=', '==', '!=')
+_FLIPPED = {'>': '<', '>=': '<=', '<': '>', '<=': '>=', '=': '=', '==': '==', '!=': '!='}
+_ELEMENT_FUNCTIONS = {'contains': 'contains', 'has': 'contains', 'excludes': 'excludes', 'without': 'excludes',
+                      'only': 'only', 'within': 'only'}
+_AMOUNT_FUNCTIONS = ('frac', 'count')
+
+
+class QueryError(ValueError):
+    """Raised for search criteria that cannot be parsed or name unknown properties"""
+    pass
+
+
+def _normalize(name):
+    return name.lower().replace('_', '').replace(' ', '')
+
+
+class _Parser:
+    """Recursive-descent parser for search criteria.
+
+    or:   and (('or' | '||') and)*
+    and:  not (('and' | '&&' | ',') not)*
+    not:  ('not' | '!') not | atom
+    atom: '(' or ')' | property op number | number op property [op number]
+        | property 'between' number 'and' number | property 'in' number '-' number
+        | contains/excludes/only(El, ...) | frac/count(El) op number | ratio(El, El) op number
+        | formula ('=' | '!=') Formula | chemsys '=' El-El-...
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = []
+        position = 0
+        text = text.rstrip()
+        while position < len(text):
+            match = _TOKEN.match(text, position)
+            if match is None or match.end() == position:
+                raise QueryError(f'Unexpected character {text[position:].strip()[:1]!r} in {self.text!r}')
+            kind = match.lastgroup
+            self.tokens.append((kind, match.group(kind)))
+            position = match.end()
+        self.position = 0
+
+    def parse(self):
+        node = self._or()
+        if self.position != len(self.tokens):
+            raise QueryError(f'Unexpected {self.tokens[self.position][1]!r} in {self.text!r}')
+        return node
+
+    # --- token helpers ---
+
+    def _peek(self, offset=0):
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def _next(self):
+        token = self._peek()
+        if token[0] is None:
+            raise QueryError(f'Unexpected end of {self.text!r}')
+        self.position += 1
+        return token
+
+    def _accept(self, *values):
+        kind, value = self._peek()
+        if kind is not None and (value in values or (kind == 'name' and value.lower() in values)):
+            self.position += 1
+            return True
+        return False
+
+    def _expect(self, value):
+        if not self._accept(value):
+            raise QueryError(f'Expected {value!r} in {self.text!r}')
+
+    def _number(self):
+        negative = self._accept('-')
+        kind, value = self._next()
+        if kind != 'number':
+            raise QueryError(f'Expected a number, got {value!r} in {self.text!r}')
+        return -float(value) if negative else float(value)
+
+    def _comparison(self):
+        kind, value = self._next()
+        if value not in _COMPARISONS:
+            raise QueryError(f'Expected a comparison, got {value!r} in {self.text!r}')
+        return value
+
+    def _element(self):
+        kind, value = self._next()
+        if kind != 'name' or value not in ATOMIC_NUMBERS:
+            raise QueryError(f'Unknown element {value!r} in {self.text!r}')
+        return value
+
+    def _elements(self):
+        self._expect('(')
+        elements = [self._element()]
+        while self._accept(','):
+            elements.append(self._element())
+        self._expect(')')
+        return tuple(elements)
+
+    # --- grammar ---
+
+    def _or(self):
+        node = self._and()
+        while self._accept('or', '||'):
+            node = ('or', node, self._and())
+        return node
+
+    def _and(self):
+        node = self._not()
+        while self._accept('and', '&&', ','):
+            node = ('and', node, self._not())
+        return node
+
+    def _not(self):
+        if self._accept('not', '!'):
+            return ('not', self._not())
+        return self._atom()
+
+    def _atom(self):
+        kind, value = self._peek()
+        if value == '(':
+            self._next()
+            node = self._or()
+            self._expect(')')
+            return node
+        if kind == 'number' or value == '-':
+            # 1 < bandgap < 5, or 2 < bandgap
+            low = self._number()
+            op = self._comparison()
+            name = self._property()
+            node = ('compare', name, _FLIPPED[op], low)
+            if self._peek()[1] in _COMPARISONS:
+                node = ('and', node, ('compare', name, self._comparison(), self._number()))
+            return node
+        if kind != 'name':
+            raise QueryError(f'Unexpected {value!r} in {self.text!r}')
+        keyword = value.lower()
+        if keyword in _ELEMENT_FUNCTIONS and self._peek(1)[1] == '(':
+            self._next()
+            return (_ELEMENT_FUNCTIONS[keyword], self._elements())
+        if keyword in _AMOUNT_FUNCTIONS and self._peek(1)[1] == '(':
+            self._next()
+            elements = self._elements()
+            if len(elements) != 1:
+                raise QueryError(f'{keyword}() takes one element in {self.text!r}')
+            return (keyword, elements[0], self._comparison(), self._number())
+        if keyword == 'ratio' and self._peek(1)[1] == '(':
+            self._next()
+            elements = self._elements()
+            if len(elements) != 2:
+                raise QueryError(f'ratio() takes two elements in {self.text!r}')
+            return ('ratio', elements, self._comparison(), self._number())
+        if keyword == 'formula':
+            self._next()
+            op = self._comparison()
+            if op not in ('=', '==', '!='):
+                raise QueryError(f'formula only supports = and != in {self.text!r}')
+            formula = self._next()[1]
+            amounts = parse_formula(formula)
+            if not amounts:
+                raise QueryError(f'Invalid formula {formula!r} in {self.text!r}')
+            node = ('formula', reduced_formula(amounts))
+            return ('not', node) if op == '!=' else node
+        if keyword == 'chemsys':
+            self._next()
+            if self._comparison() not in ('=', '=='):
+                raise QueryError(f'chemsys only supports = in {self.text!r}')
+            elements = [self._element()]
+            while self._accept('-'):
+                elements.append(self._element())
+            return ('chemsys', tuple(elements))
+        name = self._property()
+        if self._accept('between'):
+            low = self._number()
+            self._expect('and')
+            return ('between', name, low, self._number())
+        if self._accept('in'):
+            low = self._number()
+            self._expect('-')
+            return ('between', name, low, self._number())
+        return ('compare', name, self._comparison(), self._number())
+
+    def _property(self):
+        kind, value = self._next()
+        if kind != 'name':
+            raise QueryError(f'Expected a property name, got {value!r} in {self.text!r}')
+        return value
+
+
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+def parse_query(text):
+    """Parse search criteria into a tuple tree (cached)"""
+    return _Parser(text).parse()
+
+
+def _first_property(node):
+    if node[0] in ('compare', 'between'):
+        return node[1]
+    for child in node[1:]:
+        if isinstance(child, tuple) and child and isinstance(child[0], str):
+            name = _first_property(child)
+            if name:
+                return name
+    return None
+
+
+class CompiledQuery:
+    """A parsed query, evaluated as NumPy masks over a LocalMirror's columns"""
+
+    def __init__(self, tree):
+        self.tree = tree
+
+    def __call__(self, mirror):
+        """Boolean mask with one value per mirror entry"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self._evaluate(self.tree, mirror)
+
+    def _evaluate(self, node, mirror):
+        kind = node[0]
+        if kind == 'and':
+            return self._evaluate(node[1], mirror) & self._evaluate(node[2], mirror)
+        if kind == 'or':
+            return self._evaluate(node[1], mirror) | self._evaluate(node[2], mirror)
+        if kind == 'not':
+            return ~self._evaluate(node[1], mirror)
+        if kind == 'compare':
+            return _compare(_property_values(mirror, node[1]), node[2], node[3])
+        if kind == 'between':
+            values = _property_values(mirror, node[1])
+            return (values >= node[2]) & (values <= node[3])
+        if kind == 'contains':
+            return mirror.element_index.containing_mask(node[1])
+        if kind == 'excludes':
+            return mirror.element_index.excluding_mask(node[1])
+        if kind == 'only':
+            return mirror.element_index.within_mask(node[1])
+        if kind == 'chemsys':
+            mask = np.zeros(len(mirror), dtype=bool)
+            mask[mirror.element_index.in_system(node[1])] = True
+            return mask
+        if kind == 'formula':
+            mask = np.zeros(len(mirror), dtype=bool)
+            mask[mirror.find_formula(node[1])] = True
+            return mask
+        if kind == 'frac':
+            return _compare(mirror.element_amounts(node[1]) / mirror.natoms, node[2], node[3])
+        if kind == 'count':
+            return _compare(mirror.element_amounts(node[1]), node[2], node[3])
+        if kind == 'ratio':
+            numerator, denominator = node[1]
+            amounts = mirror.element_amounts(denominator)
+            # Entries without the denominator element have no ratio (NaN), rather than an infinite one
+            ratio = np.where(amounts > 0, mirror.element_amounts(numerator) / amounts, np.nan)
+            return _compare(ratio, node[2], node[3])
+        raise QueryError(f'Unknown query node {kind!r}')
+
+
+def _compare(values, op, number):
+    if op == '>':
+        return values > number
+    if op == '>=':
+        return values >= number
+    if op == '<':
+        return values < number
+    if op == '<=':
+        return values <= number
+    if op in ('=', '=='):
+        return values == number
+    return (values != number) & ~np.isnan(values)  # missing values never match
+
+
+def _property_values(mirror, name):
+    """Column for a property name, resolving aliases (bandgap -> band_gap) and derived columns"""
+    columns = {_normalize(column): column for column in mirror.column_names}
+    normalized = _normalize(name)
+    for candidate in (normalized,) + _ALIAS_GROUPS.get(normalized, ()):
+        if candidate in columns:
+            return np.asarray(mirror.column(columns[candidate]))
+    if normalized == 'nelements':
+        return mirror.nelements.astype(np.float64)
+    if normalized == 'natoms':
+        return mirror.natoms
+    raise QueryError(f'Unknown property {name!r} (available: {", ".join(mirror.column_names)})')
+
+
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_query(criteria, property_range=''):
+    """Compile search criteria (cached); property_range ('1-5') constrains the first property named in them"""
+    tree = parse_query(criteria)
+    match = _RANGE.match(property_range) if property_range else None
+    name = _first_property(tree) if match else None
+    if name:
+        tree = ('and', tree, ('between', name, float(match.group(1)), float(match.group(2))))
+    return CompiledQuery(tree)
@@ -0,0 +1,151 @@
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from Information_Units.Databases.LocalMirror import ID_FIELDS, iter_dump, open_mirror
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real APIs
+
+    def setup(self):
+        super().setup()
+        self.server.stand_in.connection_opened()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        stand_in = self.server.stand_in
+        stand_in.request_received()
+        if stand_in.latency:
+            time.sleep(stand_in.latency)
+        if stand_in.failure_rate and random.random() < stand_in.failure_rate:
+            return self._send(503, {'error': 'injected failure'}, {'Retry-After': '0'})
+        parts = urlsplit(self.path)
+        if parts.path.rstrip('/') != '/records':
+            return self._send(404, {'error': f'unknown path {parts.path}'})
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        if 'ids' in query:
+            records = stand_in.find(query['ids'].split(','))
+        else:
+            offset = int(query.get('offset', 0))
+            limit = min(int(query.get('limit', stand_in.max_page_size)), stand_in.max_page_size)
+            records = stand_in.slice(offset, limit)
+        self._send(200, {'data': records, 'meta': {'total': len(stand_in)}})
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        gzipped = 'gzip' in (self.headers.get('Accept-Encoding') or '')
+        if gzipped:
+            body = gzip.compress(body, compresslevel=1)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StandInServer:
+    """Local stand-in for a remote database API, for testing HttpClient-based database units.
+
+    Serves GET /records?offset=&limit= and GET /records?ids=a,b as {'data': [...], 'meta': {'total': n}},
+    from a list of records or a LocalMirror. latency (seconds per request) and failure_rate
+    (share of requests answered 503) emulate a slow or flaky backend.
+
+        with StandInServer(records, latency=0.05) as server:
+            records = list(http_client.pages(server.url + '/records', page_size=100))
+    """
+
+    def __init__(self, records, host='127.0.0.1', port=0, latency=0.0, failure_rate=0.0, max_page_size=1000):
+        self.records = records
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.max_page_size = max_page_size
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._ids = None
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stand_in = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __len__(self):
+        return len(self.records)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def request_received(self):
+        with self._lock:
+            self.requests += 1
+
+    def connection_opened(self):
+        with self._lock:
+            self.connections += 1
+
+    def slice(self, offset, limit):
+        if hasattr(self.records, 'records'):  # LocalMirror
+            return self.records.records(range(offset, min(offset + limit, len(self.records))))
+        return self.records[offset:offset + limit]
+
+    def find(self, entry_ids):
+        if hasattr(self.records, 'find_ids'):
+            return self.records.records(self.records.find_ids(entry_ids))
+        with self._lock:
+            if self._ids is None:
+                self._ids = {}
+                for record in self.records:
+                    entry_id = next((record[f] for f in ID_FIELDS if record.get(f) not in (None, '')), None)
+                    self._ids.setdefault(str(entry_id), record)
+        return [self._ids[entry_id] for entry_id in entry_ids if entry_id in self._ids]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve a local mirror or dump files as a stand-in database API')
+    parser.add_argument('source', help='database key with an ingested mirror, or a dump file')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='share of requests answered 503')
+    args = parser.parse_args(argv)
+    records = open_mirror(args.source) or list(iter_dump(args.source))
+    server = StandInServer(records, args.host, args.port, args.latency, args.failure_rate)
+    print(f'Serving {len(server)} records at {server.url}/records')
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == '__main__':
+    main()
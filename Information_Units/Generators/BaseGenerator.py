@@ -1,12 +1,62 @@
+import asyncio
+import os
 from pathlib import Path
 
+from Information_Units.UnitContext import cancelled, current_logger
+from Information_Units.Metrics import instrument_unit_call
+
+
+# Candidates per chunk yielded by generate_chunks() when the generator does not set chunk_size
+GENERATE_CHUNK_SIZE = int(os.environ.get('EMOS_GENERATE_CHUNK_SIZE', 16))
+
 
 # Base class for all generators
 class BaseGenerator:
+    # Seconds a single call may take before the feature gives up (None: feature default)
+    timeout = None
+
+    # Long-lived worker processes to run this unit in (0: inside the web worker);
+    # EMOS_PROCESS_UNITS overrides it, see Information_Units/ProcessPool.py
+    process_workers = 0
+
+    # Estimated memory of a loaded instance in MB, used by the unit pool's budget
+    # (None: measured as the growth of resident memory during load())
+    memory_mb = None
+
+    # Candidates per chunk in generate_chunks() (None: EMOS_GENERATE_CHUNK_SIZE)
+    chunk_size = None
+
     def __init__(self, generator_name='', logger=None):
         self.generator_name = generator_name
         self.logger=logger
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Count and time every generate() call for the /metrics endpoint
+        if 'generate' in cls.__dict__:
+            cls.generate = instrument_unit_call('generator', 'generate', 'generator_name', cls.__dict__['generate'])
+
+    @property
+    def logger(self):
+        # Shared (registry) instances log to the logger of the request using them
+        return current_logger.get() or self._logger
+
+    @logger.setter
+    def logger(self, logger):
+        self._logger = logger
+
+    def load(self):
+        """Load models, weights or connections - called once per process before first use"""
+        pass
+
+    def warmup(self):
+        """Optional cheap call after load() so the first real request is fast"""
+        pass
+
+    def close(self):
+        """Release resources acquired in load()"""
+        pass
+
     def info(self):
         return f'Information about generator {self.generator_name}'
 
@@ -20,4 +70,58 @@ class BaseGenerator:
         """
         raise NotImplementedError("Subclasses must implement generate()")
 
+    def generate_stream(self, inputs: dict):
+        """
+        Yield generated candidates one at a time.
+        Args:
+            inputs (dict): Parsed input values from frontend
+        Override in generators that produce candidates incrementally; the default
+        yields the items returned by generate(). The consumer pulls, so a slow
+        consumer naturally holds the generator back.
+        """
+        result = self.generate(inputs)
+        if result is None:
+            return
+        if isinstance(result, (list, tuple)):
+            yield from result
+        else:
+            yield result
+
+    def generate_chunks(self, inputs: dict, chunk_size=None, max_items=None, until=None):
+        """
+        Yield lists of candidates from generate_stream(), stopping early when
+        max_items candidates were produced, until(candidate) returns True (e.g. a
+        quality threshold is reached) or the caller cancelled the call.
+        """
+        chunk_size = chunk_size or self.chunk_size or GENERATE_CHUNK_SIZE
+        stream = self.generate_stream(inputs)
+        chunk = []
+        produced = 0
+        try:
+            for candidate in stream:
+                chunk.append(candidate)
+                produced += 1
+                done = (max_items is not None and produced >= max_items) or (until is not None and until(candidate))
+                if done or cancelled():
+                    break
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+        finally:
+            # Stop the underlying stream (runs its cleanup) when stopping early
+            if hasattr(stream, 'close'):
+                stream.close()
 
+    async def generate_chunks_async(self, inputs: dict, **kwargs):
+        """Async iterator over generate_chunks(); each chunk is produced in a worker thread"""
+        chunks = self.generate_chunks(inputs, **kwargs)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            chunks.close()
\ No newline at end of file
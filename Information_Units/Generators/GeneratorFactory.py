@@ -1,22 +1,29 @@
-from Information_Units.Generators.Mattergen.MattergenGenerator import MattergenGenerator
-from Information_Units.Generators.Gnome.GnomeGenerator import GnomeGenerator
-from Information_Units.Generators.Imatgen.ImatgenGenerator import ImatgenGenerator
-from Information_Units.Generators.Matgan.MatganGenerator import MatganGenerator
-from Information_Units.Generators.Molgan.MolganGenerator import MolganGenerator
-from Information_Units.Generators.Conddfcvae.ConddfcvaeGenerator import ConddfcvaeGenerator
-from Information_Units.Generators.Mygen1.Mygen1Generator import Mygen1Generator
-from Information_Units.Generators.Mygen2.Mygen2Generator import Mygen2Generator
-
-generator_factory = {
-    "mattergen": MattergenGenerator,
-    "gnome": GnomeGenerator,
-    "imatgen": ImatgenGenerator,
-    "matgan": MatganGenerator,
-    "molgan": MolganGenerator,
-    "conddfcvae": ConddfcvaeGenerator,
-    "mygen1": Mygen1Generator,
-    "mygen2": Mygen2Generator
-}
-
-generator_registry = {}
+from Information_Units.LazyFactory import unit_factory_from_metadata
+from Information_Units.ProcessPool import create_unit
+from Information_Units.UnitPool import unit_pool
 
+# Generator classes are imported on first use (see metadata/metadata.json)
+generator_factory = unit_factory_from_metadata("generators")
+
+# Loaded instances, shared by all requests; the unit pool evicts and reloads them
+# to stay within EMOS_UNIT_MEMORY_BUDGET_MB
+generator_registry = unit_pool.registry('generator')
+
+
+def _load_generator(generator_key):
+    instance = create_unit('generator', generator_factory, generator_key)
+    instance.load()
+    return instance
+
+
+def get_generator(generator_key):
+    """Return the warm generator_registry instance for generator_key, creating and loading it on first use.
+
+    Registry instances are shared by all requests and log through UnitContext.use_logger.
+    """
+    return unit_pool.get('generator', generator_key, _load_generator, generator_factory[generator_key].memory_mb)
+
+
+def release_generator(generator_key):
+    """Deactivate generator_key: remove it from generator_registry and close it"""
+    unit_pool.release('generator', generator_key)
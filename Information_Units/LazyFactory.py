@@ -0,0 +1,105 @@
+import importlib
+import json
+import os
+import pathlib
+import threading
+from collections.abc import Mapping
+
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+METADATA_PATH = PROJECT_ROOT / 'metadata' / 'metadata.json'
+
+# Keys to import eagerly: 'all', or a comma-separated list such as '1,11,mattersim'
+PRELOAD = os.environ.get('EMOS_PRELOAD', '')
+
+
+class LazyFactory(Mapping):
+    """Factory dict whose classes are imported on first use.
+
+    Entries come from metadata/metadata.json (folder_path, file_name, class_name),
+    so listing keys or checking `key in factory` never imports a module.
+    """
+
+    def __init__(self, entries):
+        # entries: {key: {'module': dotted module path, 'class_name': ..., 'description': ...}}
+        self._entries = dict(entries)
+        self._classes = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        cls = self._classes.get(key)
+        if cls is not None:
+            return cls
+        entry = self._entries[key]  # KeyError for unknown keys, like a dict
+        with self._lock:
+            cls = self._classes.get(key)
+            if cls is None:
+                module = importlib.import_module(entry['module'])
+                cls = getattr(module, entry['class_name'])
+                self._classes[key] = cls
+        return cls
+
+    def __setitem__(self, key, cls):
+        # Manual registration, e.g. database_factory["newdb"] = NewDatabase
+        with self._lock:
+            self._entries[key] = {'module': cls.__module__, 'class_name': cls.__name__, 'description': ''}
+            self._classes[key] = cls
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def is_loaded(self, key):
+        return key in self._classes
+
+    def description(self, key):
+        """Metadata description - available without importing the class"""
+        return self._entries[key].get('description', '')
+
+    def preload(self, keys=None):
+        """Import the given keys (default: all) now, e.g. in the master process before fork"""
+        for key in (self._entries if keys is None else keys):
+            if key in self._entries:
+                self[key]
+
+    def preload_from_env(self, preload=None):
+        preload = PRELOAD if preload is None else preload
+        if preload.strip() == 'all':
+            self.preload()
+        elif preload.strip():
+            self.preload([key.strip() for key in preload.split(',')])
+
+
+def _load_metadata():
+    with open(METADATA_PATH) as f:
+        return json.load(f)
+
+
+def _entry(item):
+    module = item['folder_path'].replace('/', '.') + '.' + item['file_name'][:-len('.py')]
+    return {'module': module, 'class_name': item['class_name'], 'description': item.get('description', '')}
+
+
+def unit_factory_from_metadata(unit_type):
+    """LazyFactory for 'databases', 'generators' or 'predictors', keyed like the frontend values (e.g. 'icsd')"""
+    units = _load_metadata()['information_units'][unit_type]
+    factory = LazyFactory({item['name'].lower(): _entry(item) for item in units})
+    factory.preload_from_env()
+    return factory
+
+
+def feature_factory_from_metadata():
+    """LazyFactory for all features, keyed by feature id as a string (e.g. '1')"""
+    features = _load_metadata()['features']
+    entries = {}
+    for category_features in features.values():
+        for item in category_features:
+            entries[str(item['id'])] = _entry(item)
+    factory = LazyFactory(dict(sorted(entries.items(), key=lambda kv: int(kv[0]))))
+    factory.preload_from_env()
+    return factory
@@ -0,0 +1,163 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Seconds - Prometheus defaults extended to cover multi-minute feature runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_metrics = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_names, label_values, extra=()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _Metric:
+    metric_type = ''
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.extend(self._render_sample(label_values, value))
+        return lines
+
+    def _render_sample(self, label_values, value):
+        return [f'{self.name}{_format_labels(self.label_names, label_values)} {value}']
+
+
+class Counter(_Metric):
+    metric_type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    metric_type = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_sample(self, label_values, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(list(self.buckets) + ['+Inf'], counts):
+            cumulative += count
+            labels = _format_labels(self.label_names, label_values, [('le', bound)])
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.label_names, label_values)
+        lines.append(f'{self.name}_sum{labels} {total}')
+        lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# Feature requests (recorded by the backend for each run)
+feature_requests = Counter('emos_feature_requests_total', 'Feature runs started', ['feature_id'])
+feature_errors = Counter('emos_feature_errors_total', 'Feature runs that raised an error', ['feature_id'])
+feature_duration = Histogram('emos_feature_duration_seconds', 'Feature run latency', ['feature_id'])
+feature_in_flight = Gauge('emos_feature_in_flight', 'Feature runs in progress', ['feature_id'])
+
+# BaseFeature.process stages
+feature_stage_duration = Histogram('emos_feature_stage_duration_seconds',
+                                   'Latency of BaseFeature.process stages', ['feature_id', 'stage'])
+
+# Information unit calls (retrieve / generate / predict)
+unit_calls = Counter('emos_unit_calls_total', 'Information unit calls', ['unit_type', 'unit', 'method'])
+unit_errors = Counter('emos_unit_errors_total', 'Information unit calls that raised an error',
+                      ['unit_type', 'unit', 'method'])
+unit_duration = Histogram('emos_unit_call_duration_seconds', 'Information unit call latency',
+                          ['unit_type', 'unit', 'method'])
+unit_in_flight = Gauge('emos_unit_calls_in_flight', 'Information unit calls in progress', ['unit_type', 'unit'])
+
+
+def instrument_unit_call(unit_type, method_name, name_attr, method):
+    """Wrap an information unit method so every call is counted and timed"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        labels = {'unit_type': unit_type, 'unit': getattr(self, name_attr, ''), 'method': method_name}
+        unit_calls.inc(**labels)
+        start = time.perf_counter()
+        try:
+            with unit_in_flight.track_inprogress(unit_type=unit_type, unit=labels['unit']):
+                return method(self, *args, **kwargs)
+        except Exception:
+            unit_errors.inc(**labels)
+            raise
+        finally:
+            unit_duration.observe(time.perf_counter() - start, **labels)
+
+    return wrapper
@@ -1,12 +1,71 @@
 from pathlib import Path
 
+from Information_Units.UnitContext import current_logger
+from Information_Units.Metrics import instrument_unit_call
+from Information_Units.Predictors.PredictionCache import memoize_predict, memoize_predict_batch
+
 
 # Base class for all generators
 class BasePredictor:
+    # Seconds a single call may take before the feature gives up (None: feature default)
+    timeout = None
+
+    # Long-lived worker processes to run this unit in (0: inside the web worker);
+    # EMOS_PROCESS_UNITS overrides it, see Information_Units/ProcessPool.py
+    process_workers = 0
+
+    # Estimated memory of a loaded instance in MB, used by the unit pool's budget
+    # (None: measured as the growth of resident memory during load())
+    memory_mb = None
+
+    # Micro-batching of concurrent predict_batch() calls (only used when a subclass
+    # overrides predict_batch); None uses EMOS_PREDICT_BATCH_SIZE / EMOS_PREDICT_BATCH_WAIT_MS
+    max_batch_size = None
+    max_batch_wait = None  # seconds
+
+    # Memoization of predictions (see PredictionCache.py): bump version when the
+    # model changes, list the input keys that affect the result in cache_parameters
+    # (None: all inputs), and set memoize = False for stochastic predictors
+    version = None
+    cache_parameters = None
+    memoize = True
+
     def __init__(self, predictor_name='', logger=None):
         self.predictor_name = predictor_name
         self.logger=logger
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Count and time every predict() call for the /metrics endpoint; memoized
+        # predictions are answered before reaching the (instrumented) model call
+        if 'predict' in cls.__dict__:
+            cls.predict = memoize_predict(
+                instrument_unit_call('predictor', 'predict', 'predictor_name', cls.__dict__['predict']))
+        if 'predict_batch' in cls.__dict__:
+            cls.predict_batch = memoize_predict_batch(
+                instrument_unit_call('predictor', 'predict_batch', 'predictor_name', cls.__dict__['predict_batch']))
+
+    @property
+    def logger(self):
+        # Shared (registry) instances log to the logger of the request using them
+        return current_logger.get() or self._logger
+
+    @logger.setter
+    def logger(self, logger):
+        self._logger = logger
+
+    def load(self):
+        """Load models, weights or connections - called once per process before first use"""
+        pass
+
+    def warmup(self):
+        """Optional cheap call after load() so the first real request is fast"""
+        pass
+
+    def close(self):
+        """Release resources acquired in load()"""
+        pass
+
     def info(self):
         return f'Information about predictor {self.predictor_name}'
 
@@ -20,4 +79,20 @@ class BasePredictor:
         """
         raise NotImplementedError("Subclasses must implement predict()")
 
+    def predict_batch(self, inputs_list: list) -> list:
+        """
+        Predict properties for many inputs at once.
+        Args:
+            inputs_list (list): Input dicts, as passed to predict()
+        Returns:
+            list: One prediction per input, in the same order
+        Override in predictors that are faster on batches; the default loops over predict().
+        """
+        return [self.predict(inputs) for inputs in inputs_list]
+
+    @classmethod
+    def supports_batching(cls):
+        """True if the subclass implements its own predict_batch()"""
+        return cls.predict_batch is not BasePredictor.predict_batch
+
 
@@ -0,0 +1,164 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from Information_Units.UnitContext import current_logger, use_logger
+
+
+# Defaults for predictors that do not set max_batch_size / max_batch_wait
+PREDICT_BATCH_SIZE = int(os.environ.get('EMOS_PREDICT_BATCH_SIZE', 32))
+PREDICT_BATCH_WAIT = float(os.environ.get('EMOS_PREDICT_BATCH_WAIT_MS', 5)) / 1000.0
+
+_batchers_lock = threading.Lock()
+
+
+class _FanOutLogger:
+    """Logger for a merged batch - every entry goes to the logger of each request in it"""
+
+    def __init__(self, loggers):
+        self.loggers = loggers
+
+    def log(self, message, level='info'):
+        for logger in self.loggers:
+            logger.log(message, level)
+
+
+class BatcherStopped(RuntimeError):
+    """Raised for predictions submitted to, or still queued in, a stopped MicroBatcher"""
+
+
+class MicroBatcher:
+    """Collects concurrent predictions for one predictor into predict_batch() calls.
+
+    A batch is sent as soon as it holds max_batch_size inputs, or max_batch_wait
+    seconds after its first input arrived, whichever comes first. After stop(),
+    submit() raises and inputs still queued fail with BatcherStopped.
+    """
+
+    def __init__(self, predictor, max_batch_size=None, max_batch_wait=None):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size or predictor.max_batch_size or PREDICT_BATCH_SIZE
+        wait = max_batch_wait if max_batch_wait is not None else predictor.max_batch_wait
+        self.max_batch_wait = PREDICT_BATCH_WAIT if wait is None else wait
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, daemon=True,
+                                        name=f'emos-batch-{predictor.predictor_name}')
+        self._thread.start()
+
+    def submit(self, inputs):
+        """Queue one input; returns a Future resolving to its prediction"""
+        future = Future()
+        with self._lock:
+            # Checked under the lock so nothing is queued behind the stop marker
+            if self._stopped:
+                raise BatcherStopped(f'{self.predictor.predictor_name} is no longer loaded')
+            self._queue.put((inputs, future, current_logger.get()))
+        return future
+
+    def predict_many(self, inputs_list):
+        """Predict a list of inputs, merged with whatever other requests submit meanwhile"""
+        futures = [self.submit(inputs) for inputs in inputs_list]
+        return [future.result() for future in futures]
+
+    def stop(self):
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._queue.put(None)
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_batch_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if self._stopped:
+                self._fail(batch)
+            elif batch:
+                self._run(batch)
+        # Stopped: inputs still queued will never be predicted
+        pending = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item[1].set_running_or_notify_cancel():
+                pending.append(item)
+        self._fail(pending)
+
+    def _fail(self, batch):
+        if batch:
+            error = BatcherStopped(f'{self.predictor.predictor_name} was unloaded before predicting')
+            for _, future, _ in batch:
+                future.set_exception(error)
+
+    def _run(self, batch):
+        loggers = []
+        for _, _, logger in batch:
+            if logger is not None and all(logger is not seen for seen in loggers):
+                loggers.append(logger)
+        try:
+            with use_logger(_FanOutLogger(loggers) if loggers else None):
+                results = self.predictor.predict_batch([inputs for inputs, _, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f'predict_batch() returned {len(results)} results for {len(batch)} inputs')
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.items += len(batch)
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+
+def get_micro_batcher(predictor):
+    """Return the MicroBatcher of a (shared) predictor instance, creating it on first use"""
+    batcher = getattr(predictor, '_micro_batcher', None)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = getattr(predictor, '_micro_batcher', None)
+            if batcher is None:
+                batcher = MicroBatcher(predictor)
+                predictor._micro_batcher = batcher
+    return batcher
+
+
+def stop_micro_batcher(predictor):
+    batcher = getattr(predictor, '_micro_batcher', None)
+    if batcher is not None:
+        batcher.stop()
+        predictor._micro_batcher = None
+
+
+def predict_many(predictor, inputs_list):
+    """Predict a list of inputs - micro-batched across requests if the predictor supports batching"""
+    if predictor.supports_batching():
+        return get_micro_batcher(predictor).predict_many(inputs_list)
+    return predictor.predict_batch(inputs_list)
@@ -0,0 +1,222 @@
+import copy
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from Information_Units.Metrics import Counter
+from Information_Units.Databases.Composition import parse_formula, reduced_formula
+from Information_Units.Databases.LocalMirror import ID_FIELDS
+from Information_Units.Databases.RecordMerge import record_fingerprint
+
+
+# Memoized predictions kept in memory per process (0 disables memoization)
+PREDICTION_CACHE_SIZE = int(os.environ.get('EMOS_PREDICTION_CACHE_SIZE', 10000))
+# Optional directory for the on-disk tier (SQLite, shared by all processes using it)
+PREDICTION_CACHE_DIR = os.environ.get('EMOS_PREDICTION_CACHE_DIR')
+# Decimals kept when comparing coordinates, lattices and other floats
+PREDICTION_CACHE_DECIMALS = int(os.environ.get('EMOS_PREDICTION_CACHE_DECIMALS', 6))
+
+# Input keys that hold the structure / composition to predict, in order of preference
+STRUCTURE_KEYS = ('candidate', 'structure', 'material', 'composition', 'formula')
+# Record fields that say where a record came from, not what it is
+SOURCE_FIELDS = ID_FIELDS + ('provenance', 'database', 'source')
+
+prediction_cache_hits = Counter('emos_prediction_cache_hits_total', 'Predictions served from the memoization cache',
+                                ['predictor', 'tier'])
+prediction_cache_misses = Counter('emos_prediction_cache_misses_total', 'Predictions computed by the model',
+                                  ['predictor'])
+
+def _canonical_value(value):
+    # JSON-ready value with sorted keys and rounded floats
+    if isinstance(value, float):
+        return round(value, PREDICTION_CACHE_DECIMALS)
+    if isinstance(value, dict):
+        return {str(k): _canonical_value(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_canonical_value(v) for v in value]
+    if isinstance(value, (str, int, bool)) or value is None:
+        return value
+    raise TypeError(f'cannot fingerprint {type(value).__name__}')
+
+
+def _canonical_formula(formula):
+    # 'Fe2O3', 'O3Fe2' and 'Fe4O6' -> 'Fe2O3'; None if formula is not a formula
+    amounts = parse_formula(formula)
+    return reduced_formula(amounts) if amounts else None
+
+
+def structure_fingerprint(structure):
+    """Canonical form of a structure or composition, independent of site and element order"""
+    if isinstance(structure, str):
+        return _canonical_formula(structure) or structure.strip()
+    if isinstance(structure, dict) and 'sites' not in structure:
+        # Database record: the same material from any database (or under any id) has one fingerprint
+        fingerprint = record_fingerprint(structure)
+        if fingerprint is not None:
+            return _canonical_value(list(fingerprint))
+        return _canonical_value({k: v for k, v in structure.items() if k not in SOURCE_FIELDS})
+    if isinstance(structure, dict) and 'sites' in structure and 'lattice' in structure:
+        # pymatgen-style dict: compare the lattice and the sorted sites only
+        lattice = structure['lattice']
+        sites = []
+        for site in structure['sites']:
+            species = site.get('label') or json.dumps(_canonical_value(site.get('species')), sort_keys=True)
+            sites.append([species, _canonical_value(site.get('abc', site.get('xyz')))])
+        return {'lattice': _canonical_value(lattice.get('matrix', lattice) if isinstance(lattice, dict) else lattice),
+                'sites': sorted(sites, key=json.dumps)}
+    return _canonical_value(structure)
+
+
+def prediction_key(predictor, inputs):
+    """Memoization key: predictor name and version, structure fingerprint and relevant parameters.
+
+    Returns None if the inputs cannot be fingerprinted (the call is then not memoized).
+    """
+    try:
+        structure_key = next((key for key in STRUCTURE_KEYS if key in inputs), None)
+        structure = structure_fingerprint(inputs[structure_key]) if structure_key else None
+        if predictor.cache_parameters is None:
+            parameters = {k: v for k, v in inputs.items() if k != structure_key}
+        else:
+            parameters = {k: inputs.get(k) for k in predictor.cache_parameters}
+        payload = json.dumps([predictor.predictor_name, predictor.version, structure, _canonical_value(parameters)],
+                             sort_keys=True, separators=(',', ':'))
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SQLitePredictionStore:
+    """On-disk tier - survives restarts and is shared by every worker using the same directory"""
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, 'predictions.sqlite')
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, value TEXT)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute('SELECT value FROM predictions WHERE key = ?', (key,)).fetchone()
+        return (True, json.loads(row[0])) if row else (False, None)
+
+    def put(self, key, value):
+        try:
+            data = json.dumps(value)
+        except (TypeError, ValueError):
+            return  # only JSON results are written to disk
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO predictions VALUES (?, ?)', (key, data))
+
+
+class PredictionCache:
+    """Two-tier memo of predictions: an in-memory LRU and an optional SQLite store"""
+
+    def __init__(self, max_entries=None, directory=None):
+        self.max_entries = PREDICTION_CACHE_SIZE if max_entries is None else max_entries
+        directory = directory or PREDICTION_CACHE_DIR
+        self.store = SQLitePredictionStore(directory) if directory and self.max_entries else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key, predictor=''):
+        """Return (hit, prediction)"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                prediction_cache_hits.inc(predictor=predictor, tier='memory')
+                return True, copy.deepcopy(self._entries[key])
+        if self.store is not None:
+            try:
+                hit, value = self.store.get(key)
+            except sqlite3.Error:
+                hit, value = False, None
+            if hit:
+                prediction_cache_hits.inc(predictor=predictor, tier='disk')
+                self._remember(key, value)
+                return True, copy.deepcopy(value)
+        prediction_cache_misses.inc(predictor=predictor)
+        return False, None
+
+    def put(self, key, prediction):
+        self._remember(key, copy.deepcopy(prediction))
+        if self.store is not None:
+            try:
+                self.store.put(key, prediction)
+            except sqlite3.Error:
+                pass
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+prediction_cache = PredictionCache()
+
+
+def _memoizing(predictor):
+    return predictor.memoize and prediction_cache.enabled
+
+
+def memoize_predict(method):
+    """Wrap predict() so a repeated prediction is a cache lookup instead of a model call"""
+    @functools.wraps(method)
+    def wrapper(self, inputs):
+        key = prediction_key(self, inputs) if _memoizing(self) else None
+        if key is None:
+            return method(self, inputs)
+        hit, prediction = prediction_cache.get(key, self.predictor_name)
+        if hit:
+            return prediction
+        prediction = method(self, inputs)
+        if prediction is not None:
+            prediction_cache.put(key, prediction)
+        return prediction
+
+    return wrapper
+
+
+def memoize_predict_batch(method):
+    """Wrap predict_batch() so only inputs without a memoized prediction reach the model"""
+    @functools.wraps(method)
+    def wrapper(self, inputs_list):
+        if not _memoizing(self):
+            return method(self, inputs_list)
+        results = [None] * len(inputs_list)
+        missing = []
+        for index, inputs in enumerate(inputs_list):
+            key = prediction_key(self, inputs)
+            hit, prediction = prediction_cache.get(key, self.predictor_name) if key else (False, None)
+            if hit:
+                results[index] = prediction
+            else:
+                missing.append((index, key))
+        if missing:
+            predictions = method(self, [inputs_list[index] for index, _ in missing])
+            if len(predictions) != len(missing):
+                raise ValueError(f'predict_batch() returned {len(predictions)} results for {len(missing)} inputs')
+            for (index, key), prediction in zip(missing, predictions):
+                results[index] = prediction
+                if key and prediction is not None:
+                    prediction_cache.put(key, prediction)
+        return results
+
+    return wrapper
@@ -1,21 +1,36 @@
-from Information_Units.Predictors.Mattersim.MattersimPredictor import MattersimPredictor
-from Information_Units.Predictors.M3gnet.M3gnetPredictor import M3gnetPredictor
-from Information_Units.Predictors.Pfp.PfpPredictor import PfpPredictor
-from Information_Units.Predictors.Deepmd.DeepmdPredictor import DeepmdPredictor
-from Information_Units.Predictors.Synthnn.SynthnnPredictor import SynthnnPredictor
-from Information_Units.Predictors.Esen.EsenPredictor import EsenPredictor
-from Information_Units.Predictors.Mypred1.Mypred1Predictor import Mypred1Predictor
-from Information_Units.Predictors.Mypred2.Mypred2Predictor import Mypred2Predictor
-
-predictor_factory = {
-    "mattersim": MattersimPredictor,
-    "m3gnet": M3gnetPredictor,
-    "pfp": PfpPredictor,
-    "deepmd": DeepmdPredictor,
-    "synthnn": SynthnnPredictor,
-    "esen": EsenPredictor,
-    "mypred1": Mypred1Predictor,
-    "mypred2": Mypred2Predictor
-}
-
-predictor_registry = {}
\ No newline at end of file
+from Information_Units.LazyFactory import unit_factory_from_metadata
+from Information_Units.ProcessPool import create_unit
+from Information_Units.UnitPool import unit_pool
+from Information_Units.Predictors.MicroBatcher import stop_micro_batcher
+
+# Predictor classes are imported on first use (see metadata/metadata.json)
+predictor_factory = unit_factory_from_metadata("predictors")
+
+
+def _close_predictor(instance):
+    stop_micro_batcher(instance)
+    instance.close()
+
+
+# Loaded instances, shared by all requests; the unit pool evicts and reloads them
+# to stay within EMOS_UNIT_MEMORY_BUDGET_MB
+predictor_registry = unit_pool.registry('predictor', close=_close_predictor)
+
+
+def _load_predictor(predictor_key):
+    instance = create_unit('predictor', predictor_factory, predictor_key)
+    instance.load()
+    return instance
+
+
+def get_predictor(predictor_key):
+    """Return the warm predictor_registry instance for predictor_key, creating and loading it on first use.
+
+    Registry instances are shared by all requests and log through UnitContext.use_logger.
+    """
+    return unit_pool.get('predictor', predictor_key, _load_predictor, predictor_factory[predictor_key].memory_mb)
+
+
+def release_predictor(predictor_key):
+    """Deactivate predictor_key: remove it from predictor_registry and close it"""
+    unit_pool.release('predictor', predictor_key)
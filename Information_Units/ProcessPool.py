@@ -0,0 +1,503 @@
+import multiprocessing
+import os
+import pickle
+import queue
+import sys
+import threading
+import time
+import traceback
+from multiprocessing import shared_memory
+
+from Information_Units.UnitContext import cancelled, current_logger, use_cancel_event
+from Information_Units.Metrics import Counter
+from Information_Units.UnitPool import resident_bytes
+from Information_Units.Databases.BaseDatabase import BaseDatabase
+from Information_Units.Generators.BaseGenerator import BaseGenerator
+from Information_Units.Predictors.BasePredictor import BasePredictor
+
+try:
+    import numpy as np
+except ImportError:  # shared-memory transfer of arrays needs numpy
+    np = None
+
+
+def _parse_process_units(value):
+    # 'mattergen=2,gnome,mattersim' -> {'mattergen': 2, 'gnome': 1, 'mattersim': 1}
+    units = {}
+    for item in value.split(','):
+        key, _, size = item.strip().partition('=')
+        if key:
+            units[key.strip().lower()] = int(size) if size.strip() else 1
+    return units
+
+
+# Units that run in long-lived worker processes instead of the web worker, with their pool size
+PROCESS_UNITS = _parse_process_units(os.environ.get('EMOS_PROCESS_UNITS', ''))
+# 'spawn' keeps the (multi-threaded) web worker from being forked
+PROCESS_START_METHOD = os.environ.get('EMOS_PROCESS_START_METHOD', 'spawn')
+# Arrays at least this large are passed through shared memory instead of the pipe
+SHARED_MEMORY_MIN_BYTES = int(os.environ.get('EMOS_SHARED_MEMORY_MIN_BYTES', 64 * 1024))
+# Seconds a cancelled call may take to stop before its worker process is restarted
+PROCESS_CANCEL_GRACE = float(os.environ.get('EMOS_PROCESS_CANCEL_GRACE', 5))
+
+unit_process_restarts = Counter('emos_unit_process_restarts_total',
+                                'Unit worker processes restarted after a crash or an unfinished cancelled call',
+                                ['unit_type', 'unit'])
+
+# unit_type -> (factory module, factory name, name attribute)
+UNIT_TYPES = {
+    'database': ('Information_Units.Databases.DatabaseFactory', 'database_factory', 'database_name'),
+    'generator': ('Information_Units.Generators.GeneratorFactory', 'generator_factory', 'generator_name'),
+    'predictor': ('Information_Units.Predictors.PredictorFactory', 'predictor_factory', 'predictor_name'),
+}
+
+# Methods that yield their results, sent to the caller one 'item' at a time
+STREAM_METHODS = ('generate_stream', 'iter_records')
+# No-argument methods answered by the proxy from the values a worker reports when it starts
+SNAPSHOT_METHODS = {'database': ('cache_version', 'export_schema')}
+
+
+class UnitProcessError(Exception):
+    """Raised in the web worker when a unit call fails inside its worker process"""
+    pass
+
+
+# Python 3.13+ can keep blocks away from the resource tracker: they are always unlinked by
+# their reader, or by the web worker when a call is abandoned. Before that, worker processes
+# share the web worker's tracker, which only unlinks blocks still left when it exits.
+_UNTRACKED = {'track': False} if sys.version_info >= (3, 13) else {}
+
+
+def _unlink(name):
+    # Remove a block that may already be gone
+    try:
+        shm = shared_memory.SharedMemory(name=name, **_UNTRACKED)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+class _SharedArray:
+    """Placeholder for a numpy array sent through shared memory"""
+
+    def __init__(self, array, names=None):
+        self.shape = array.shape
+        self.dtype = array.dtype.str
+        shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes), **_UNTRACKED)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+        self.name = shm.name
+        shm.close()
+        if names is not None:
+            names.append(self.name)
+
+    def load(self):
+        # The receiving process unlinks the block once it has copied it
+        shm = shared_memory.SharedMemory(name=self.name, **_UNTRACKED)
+        try:
+            return np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+def _pack(value, names=None):
+    """value with large arrays moved to shared memory; their block names are added to names"""
+    if np is not None and isinstance(value, np.ndarray) and value.dtype != object \
+            and value.nbytes >= SHARED_MEMORY_MIN_BYTES:
+        return _SharedArray(value, names)
+    if isinstance(value, dict):
+        return {k: _pack(v, names) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_pack(v, names) for v in value)
+    return value
+
+
+def _unpack(value):
+    if isinstance(value, _SharedArray):
+        return value.load()
+    if isinstance(value, dict):
+        return {k: _unpack(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unpack(v) for v in value)
+    return value
+
+
+def _release(value):
+    """Unlink the shared memory of a packed value that will not be unpacked"""
+    if isinstance(value, _SharedArray):
+        _unlink(value.name)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _release(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            _release(v)
+
+
+def _send(conn, message):
+    conn.send_bytes(pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _recv(conn):
+    return pickle.loads(conn.recv_bytes())
+
+
+# --- worker process side ---
+
+class _PipeLogger:
+    """Logger inside a worker process - entries are sent to the calling request"""
+
+    def __init__(self, conn, lock):
+        self.conn = conn
+        self.lock = lock
+
+    def log(self, message, level='info'):
+        with self.lock:
+            _send(self.conn, ('log', str(message), level))
+
+
+def _worker_main(unit_type, unit_key, conn):
+    module_name, factory_name, _ = UNIT_TYPES[unit_type]
+    send_lock = threading.Lock()
+
+    def reply(*message):
+        with send_lock:
+            try:
+                _send(conn, message)
+            except OSError:
+                _release(message)  # nobody will read the blocks of an unsent answer
+                raise
+
+    try:
+        module = __import__(module_name, fromlist=[factory_name])
+        unit = getattr(module, factory_name)[unit_key](unit_key, logger=_PipeLogger(conn, send_lock))
+        # Predictions are memoized by the proxy in the web worker
+        unit.memoize = False
+        unit.load()
+        unit.warmup()
+        reply('ready', unit.info(), {name: getattr(unit, name)() for name in SNAPSHOT_METHODS.get(unit_type, ())})
+    except Exception as e:
+        reply('error', type(e).__name__, str(e), traceback.format_exc())
+        return
+
+    # A reader thread takes requests off the pipe so 'cancel' arrives while a call runs
+    requests = queue.Queue()
+    cancel_event = threading.Event()
+
+    def read():
+        while True:
+            try:
+                message = _recv(conn)
+            except (EOFError, OSError):
+                requests.put(None)
+                return
+            if message[0] == 'cancel':
+                cancel_event.set()
+            else:
+                requests.put(message)
+
+    threading.Thread(target=read, daemon=True).start()
+    while True:
+        message = requests.get()
+        if message is None or message[0] == 'close':
+            break
+        method, args = message
+        cancel_event.clear()
+        try:
+            with use_cancel_event(cancel_event):
+                if method in STREAM_METHODS:
+                    for item in getattr(unit, method)(*_unpack(args)):
+                        reply('item', _pack(item))
+                        if cancel_event.is_set():
+                            break
+                    result = None
+                else:
+                    result = getattr(unit, method)(*_unpack(args))
+            reply('ok', _pack(result))
+        except Exception as e:
+            reply('error', type(e).__name__, str(e), traceback.format_exc())
+    unit.close()
+
+
+# --- web worker side ---
+
+class _WorkerProcess:
+    def __init__(self, pool, index):
+        self.pool = pool
+        self.index = index
+        self.process = None
+        self.conn = None
+
+    def start(self):
+        context = multiprocessing.get_context(PROCESS_START_METHOD)
+        parent_conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(self.pool.unit_type, self.pool.unit_key, child_conn),
+                                       name=f'emos-{self.pool.unit_key}-{self.index}', daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        message = self.receive(wait_cancelled=False)
+        if message[0] != 'ready':
+            self.stop()
+            raise UnitProcessError(f'{self.pool.unit_key} worker failed to start - {message[1]}: {message[2]}')
+        self.pool.info, self.pool.snapshot = message[1], message[2]
+
+    def receive(self, wait_cancelled=True, timeout=None):
+        """Next message; the wait is interrupted by a crash, cancellation or timeout (returns None)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                if self.conn.poll(0.1):
+                    return _recv(self.conn)
+            except (EOFError, OSError):
+                self.process.join(1)
+            if not self.process.is_alive():
+                raise UnitProcessError(f'{self.pool.unit_key} worker process exited (code {self.process.exitcode})')
+            if (wait_cancelled and cancelled()) or (deadline is not None and time.monotonic() > deadline):
+                return None
+
+    def stop(self, timeout=5):
+        if self.process is None:
+            return
+        try:
+            _send(self.conn, ('close',))
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        # Answers the worker sent after the caller gave up: free their shared memory
+        try:
+            while self.conn.poll(0):
+                message = _recv(self.conn)
+                if message[0] in ('item', 'ok'):
+                    _release(message[1])
+        except (EOFError, OSError, pickle.UnpicklingError):
+            pass
+        self.conn.close()
+
+
+class UnitProcessPool:
+    """Long-lived worker processes running one information unit with its model preloaded.
+
+    Each call takes an idle worker, so a pool of size n serves n calls at once. A
+    worker that crashes, or does not stop after a cancelled call, is restarted in
+    the background.
+    """
+
+    def __init__(self, unit_type, unit_key, size=1):
+        self.unit_type = unit_type
+        self.unit_key = unit_key
+        self.size = size
+        self.info = ''
+        self.snapshot = {}  # SNAPSHOT_METHODS results of the last worker started
+        self._idle = queue.Queue()
+        self._workers = []
+        self._closed = False
+
+    def start(self):
+        for index in range(self.size):
+            worker = _WorkerProcess(self, index)
+            worker.start()
+            self._workers.append(worker)
+            self._idle.put(worker)
+
+    def close(self):
+        self._closed = True
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
+
+    def call(self, method, *args):
+        exchange = self._exchange(method, args)
+        while True:
+            try:
+                next(exchange)
+            except StopIteration as stop:
+                return stop.value
+
+    def stream(self, method, *args):
+        """Yield the items a streaming method (STREAM_METHODS) produces in the worker"""
+        return self._exchange(method, args)
+
+    def _acquire(self):
+        while True:
+            try:
+                return self._idle.get(timeout=0.1)
+            except queue.Empty:
+                if cancelled():
+                    raise UnitProcessError(f'{self.unit_key} call cancelled while waiting for a worker')
+                if self._closed:
+                    raise UnitProcessError(f'{self.unit_key} worker pool is closed')
+
+    def _exchange(self, method, args):
+        worker = self._acquire()
+        healthy = False
+        segments = []
+        try:
+            try:
+                _send(worker.conn, (method, _pack(args, segments)))
+            except OSError:
+                raise UnitProcessError(f'{self.unit_key} worker process exited (code {worker.process.exitcode})')
+            while True:
+                message = worker.receive()
+                if message is None:
+                    # Caller gave up - ask the worker to stop and wait briefly for it
+                    healthy = self._cancel(worker)
+                    raise UnitProcessError(f'{self.unit_key} {method}() cancelled')
+                kind = message[0]
+                if kind == 'log':
+                    logger = current_logger.get()
+                    if logger:
+                        logger.log(message[1], message[2])
+                elif kind == 'item':
+                    try:
+                        yield _unpack(message[1])
+                    except GeneratorExit:
+                        healthy = self._cancel(worker)
+                        raise
+                elif kind == 'ok':
+                    healthy = True
+                    return _unpack(message[1])
+                else:
+                    healthy = True
+                    raise UnitProcessError(f'{message[1]}: {message[2]}')
+        finally:
+            # Argument blocks a crashed or cancelled worker did not get to read (already gone otherwise)
+            for name in segments:
+                _unlink(name)
+            if healthy:
+                self._idle.put(worker)
+            else:
+                self._restart(worker)
+
+    def _cancel(self, worker):
+        # True if the worker finished the cancelled call and can be reused
+        try:
+            _send(worker.conn, ('cancel',))
+            deadline = time.monotonic() + PROCESS_CANCEL_GRACE
+            while True:
+                message = worker.receive(wait_cancelled=False, timeout=max(0, deadline - time.monotonic()))
+                if message is None:
+                    return False
+                if message[0] in ('item', 'ok'):
+                    _release(message[1])
+                if message[0] in ('ok', 'error'):
+                    return True
+        except (UnitProcessError, OSError):
+            return False
+
+    def _restart(self, worker):
+        if self._closed:
+            return
+        unit_process_restarts.inc(unit_type=self.unit_type, unit=self.unit_key)
+
+        def restart():
+            worker.stop(timeout=0)
+            while not self._closed:
+                try:
+                    worker.start()
+                    self._idle.put(worker)
+                    return
+                except Exception:
+                    time.sleep(1)
+
+        threading.Thread(target=restart, daemon=True, name=f'emos-restart-{self.unit_key}').start()
+
+
+# --- unit proxies used by the factories ---
+
+class _ProcessUnit:
+    """Mixin for registry instances whose calls run in a UnitProcessPool"""
+
+    def _init_process_unit(self, unit_type, unit_class, unit_key, size):
+        self.unit_class = unit_class
+        self.pool = UnitProcessPool(unit_type, unit_key, size)
+        # Class-level settings of the real unit (timeout, chunk_size, max_batch_size, ...)
+        for name in ('timeout', 'chunk_size', 'max_batch_size', 'max_batch_wait', 'version', 'cache_parameters', 'memoize'):
+            if hasattr(unit_class, name):
+                setattr(self, name, getattr(unit_class, name))
+
+    def load(self):
+        self.pool.start()
+        if self.unit_class.memory_mb:
+            self.memory_mb = self.unit_class.memory_mb * self.pool.size
+        else:
+            # The memory lives in the worker processes, not in this one
+            rss = [resident_bytes(worker.process.pid) for worker in self.pool._workers]
+            self.memory_mb = sum(r for r in rss if r) / (1024 * 1024) or None
+
+    def close(self):
+        self.pool.close()
+
+    def info(self):
+        return self.pool.info
+
+
+class ProcessDatabase(_ProcessUnit, BaseDatabase):
+    def __init__(self, unit_class, database_name, size=1):
+        super().__init__(database_name)
+        self._init_process_unit('database', unit_class, database_name, size)
+
+    def retrieve(self, inputs: dict):
+        return self.pool.call('retrieve', inputs)
+
+    def iter_records(self, inputs: dict, limit=None, chunk_size=1000):
+        # The mirror is open in the worker processes, so chunks are read there
+        return self.pool.stream('iter_records', inputs, limit, chunk_size)
+
+    def cache_version(self):
+        return self.pool.snapshot.get('cache_version', self.version)
+
+    def export_schema(self):
+        return self.pool.snapshot.get('export_schema')
+
+
+class ProcessGenerator(_ProcessUnit, BaseGenerator):
+    def __init__(self, unit_class, generator_name, size=1):
+        super().__init__(generator_name)
+        self._init_process_unit('generator', unit_class, generator_name, size)
+
+    def generate(self, inputs: dict):
+        return self.pool.call('generate', inputs)
+
+    def generate_stream(self, inputs: dict):
+        return self.pool.stream('generate_stream', inputs)
+
+
+class ProcessPredictor(_ProcessUnit, BasePredictor):
+    def __init__(self, unit_class, predictor_name, size=1):
+        super().__init__(predictor_name)
+        self._init_process_unit('predictor', unit_class, predictor_name, size)
+
+    def predict(self, inputs: dict):
+        return self.pool.call('predict', inputs)
+
+    def predict_batch(self, inputs_list: list) -> list:
+        if not self.supports_batching():
+            return super().predict_batch(inputs_list)
+        return self.pool.call('predict_batch', inputs_list)
+
+    def supports_batching(self):
+        return self.unit_class.supports_batching()
+
+
+PROCESS_UNIT_CLASSES = {'database': ProcessDatabase, 'generator': ProcessGenerator, 'predictor': ProcessPredictor}
+
+
+def process_pool_size(unit_key, unit_class):
+    """Worker processes for a unit - EMOS_PROCESS_UNITS, else the class's process_workers (0: in-process)"""
+    if unit_key in PROCESS_UNITS:
+        return PROCESS_UNITS[unit_key]
+    return getattr(unit_class, 'process_workers', 0) or 0
+
+
+def create_unit(unit_type, factory, unit_key):
+    """New registry instance for unit_key - a process-pool proxy when the unit runs in worker processes"""
+    unit_class = factory[unit_key]
+    size = process_pool_size(unit_key, unit_class)
+    if size > 0:
+        return PROCESS_UNIT_CLASSES[unit_type](unit_class, unit_key, size)
+    return unit_class(unit_key)
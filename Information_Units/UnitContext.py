@@ -0,0 +1,38 @@
+import contextvars
+from contextlib import contextmanager
+
+
+# Logger of the request currently using an information unit. Units are shared
+# between requests (see the *_registry dicts), so their logger is looked up here
+# first and falls back to the logger given to the constructor.
+current_logger = contextvars.ContextVar('emos_current_logger', default=None)
+
+
+@contextmanager
+def use_logger(logger):
+    """Route log calls of every information unit used in this context to logger"""
+    token = current_logger.set(logger)
+    try:
+        yield
+    finally:
+        current_logger.reset(token)
+
+
+# Set when the feature no longer waits for the current unit call (timeout or
+# cancellation). Long-running units should poll cancelled() and stop early.
+current_cancel_event = contextvars.ContextVar('emos_cancel_event', default=None)
+
+
+@contextmanager
+def use_cancel_event(event):
+    token = current_cancel_event.set(event)
+    try:
+        yield
+    finally:
+        current_cancel_event.reset(token)
+
+
+def cancelled():
+    """True if the caller has given up on the current unit call"""
+    event = current_cancel_event.get()
+    return event is not None and event.is_set()
@@ -0,0 +1,193 @@
+import contextvars
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from Information_Units.Metrics import Counter, Gauge
+
+
+# Global memory budget for loaded information units (0: unlimited)
+UNIT_MEMORY_BUDGET_MB = float(os.environ.get('EMOS_UNIT_MEMORY_BUDGET_MB', 0))
+
+unit_loads = Counter('emos_unit_loads_total', 'Information unit instances created and loaded', ['unit_type', 'unit'])
+unit_evictions = Counter('emos_unit_evictions_total', 'Information unit instances evicted to stay within the memory budget',
+                         ['unit_type', 'unit'])
+unit_pool_memory = Gauge('emos_unit_pool_memory_bytes', 'Estimated memory held by loaded information units')
+
+# Units handed out while a feature runs - they are never evicted before it finishes
+current_leases = contextvars.ContextVar('emos_unit_leases', default=None)
+
+
+def resident_bytes(pid='self'):
+    # Linux: resident set size of a process; None elsewhere
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _PoolEntry:
+    def __init__(self, unit_type, unit_key, instance, footprint):
+        self.unit_type = unit_type
+        self.unit_key = unit_key
+        self.instance = instance
+        self.footprint = footprint
+        self.leases = 0
+        self.released = False  # closed when the last lease ends
+
+
+class UnitPool:
+    """Loaded information units of all types, kept within a global memory budget.
+
+    Each instance's footprint is its memory_mb attribute, or else the growth of
+    the process's resident memory while it was loaded. When the loaded units
+    exceed the budget, the least recently used ones that no running feature
+    holds are closed; they stay active and are loaded again on their next use.
+    """
+
+    def __init__(self, budget_mb=None):
+        budget_mb = UNIT_MEMORY_BUDGET_MB if budget_mb is None else budget_mb
+        self.budget = int(budget_mb * 1024 * 1024)
+        self._entries = OrderedDict()  # (unit_type, unit_key) -> _PoolEntry, least recently used first
+        self._registries = {}          # unit_type -> {unit_key: instance} (the *_registry dicts)
+        self._closers = {}
+        self._active = {}              # unit_type -> keys in use and not released, loaded or not
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def registry(self, unit_type, close=None):
+        """The {unit_key: loaded instance} dict for unit_type; close(instance) releases an instance"""
+        self._closers[unit_type] = close or (lambda instance: instance.close())
+        self._active.setdefault(unit_type, set())
+        return self._registries.setdefault(unit_type, {})
+
+    def active(self, unit_type):
+        """Keys of unit_type that are in use, including evicted ones that will be reloaded"""
+        with self._lock:
+            return sorted(self._active.get(unit_type, ()))
+
+    @property
+    def memory(self):
+        with self._lock:
+            return sum(entry.footprint for entry in self._entries.values())
+
+    def get(self, unit_type, unit_key, create, memory_mb=None):
+        """Return the loaded instance for unit_key, calling create(unit_key) to load it if needed.
+
+        memory_mb (the unit class's estimate, if any) makes room in the budget before loading.
+        """
+        key = (unit_type, unit_key)
+        with self._lock:
+            self._active[unit_type].add(unit_key)
+            entry = self._entries.get(key)
+            if entry is not None:
+                return self._lease(key, entry)
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        # One load per key at a time, without blocking other keys
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    return self._lease(key, entry)
+            if memory_mb:
+                self._evict(int(memory_mb * 1024 * 1024))
+            before = resident_bytes()
+            instance = create(unit_key)
+            footprint = self._footprint(instance, before)
+            unit_loads.inc(unit_type=unit_type, unit=unit_key)
+            with self._lock:
+                entry = _PoolEntry(unit_type, unit_key, instance, footprint)
+                self._entries[key] = entry
+                self._registries[unit_type][unit_key] = instance
+                instance = self._lease(key, entry)
+        self._evict()
+        return instance
+
+    def release(self, unit_type, unit_key):
+        """Deactivate unit_key and close its instance (once no running feature holds it)"""
+        with self._lock:
+            self._active[unit_type].discard(unit_key)
+            entry = self._entries.pop((unit_type, unit_key), None)
+            self._registries[unit_type].pop(unit_key, None)
+            if entry is not None and entry.leases > 0:
+                entry.released = True
+                entry = None
+        if entry is not None:
+            self._close(entry)
+
+    @contextmanager
+    def leases(self):
+        """Keep every unit handed out in this context loaded until the context exits"""
+        leased = []
+        token = current_leases.set(leased)
+        try:
+            yield
+        finally:
+            current_leases.reset(token)
+            closing = []
+            with self._lock:
+                for entry in leased:
+                    entry.leases -= 1
+                    if entry.released and entry.leases == 0:
+                        closing.append(entry)
+            for entry in closing:
+                self._close(entry)
+            if leased:
+                self._evict()
+
+    def _lease(self, key, entry):
+        # Caller holds self._lock
+        self._entries.move_to_end(key)
+        leased = current_leases.get()
+        if leased is not None:
+            entry.leases += 1
+            leased.append(entry)
+        return entry.instance
+
+    @staticmethod
+    def _footprint(instance, before):
+        declared = getattr(instance, 'memory_mb', None)
+        if declared:
+            return int(declared * 1024 * 1024)
+        after = resident_bytes()
+        if before is None or after is None:
+            return 0
+        return max(0, after - before)
+
+    def _evict(self, incoming=0):
+        """Close least recently used, unleased instances until incoming bytes fit in the budget"""
+        if not self.budget:
+            self._update_gauge()
+            return
+        evicted = []
+        with self._lock:
+            total = sum(entry.footprint for entry in self._entries.values()) + incoming
+            for key, entry in list(self._entries.items()):
+                if total <= self.budget:
+                    break
+                # Never evict the most recently used unit or one a running feature holds
+                if entry.leases > 0 or key == next(reversed(self._entries)):
+                    continue
+                del self._entries[key]
+                self._registries[entry.unit_type].pop(entry.unit_key, None)
+                total -= entry.footprint
+                evicted.append(entry)
+        for entry in evicted:
+            unit_evictions.inc(unit_type=entry.unit_type, unit=entry.unit_key)
+            self._close(entry)
+        self._update_gauge()
+
+    def _close(self, entry):
+        try:
+            self._closers[entry.unit_type](entry.instance)
+        finally:
+            self._update_gauge()
+
+    def _update_gauge(self):
+        unit_pool_memory.set(self.memory)
+
+
+# Shared by the database, generator and predictor factories
+unit_pool = UnitPool()
@@ -1,20 +1,34 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
+import json
 import os
+import queue
 import sys
+import time
 import pathlib
 
 # Get absolute paths regardless of where the script is run from
 BACKEND_DIR = pathlib.Path(__file__).parent.resolve()  # /home/soe/EMOS/backend
 PROJECT_ROOT = BACKEND_DIR.parent.resolve()  # /home/soe/EMOS
 
-# Add the project root to Python path
+# Add the project root and backend folder to Python path
 sys.path.append(str(PROJECT_ROOT))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from request_logger import SimpleLogger
+from jobs import JobManager, JobQueueFull
+from response_cache import ResponseCache
+from precomputed import PrecomputedJSON
+from batch import BatchRunner
 
 #information units creators & destroyers
-from Information_Units.Generators.GeneratorFactory import generator_factory, generator_registry
-from Information_Units.Databases.DatabaseFactory import database_factory, database_registry
-from Information_Units.Predictors.PredictorFactory import predictor_factory, predictor_registry
+from Information_Units.Generators.GeneratorFactory import generator_factory, get_generator, release_generator
+from Information_Units.Databases.DatabaseFactory import database_factory, get_database, release_database
+from Information_Units.Predictors.PredictorFactory import predictor_factory, get_predictor, release_predictor
+from Information_Units.UnitContext import use_logger
+from Information_Units.UnitPool import unit_pool
+from Information_Units.Metrics import render_metrics, feature_requests, feature_errors, feature_duration, feature_in_flight
 
 # New Feature architecture - try to import, fallback if not available
 try:
@@ -36,56 +50,80 @@ def add_cors_headers(response):
     return response
 
 
-# Simple logger class
-class SimpleLogger:
-    def __init__(self):
-        self.logs = []
+def build_features_info():
+    """Build the /api/features/info payload - features plus information units"""
+    feature_info = {}
     
-    def log(self, message, level='info'):
-        self.logs.append({
-            'level': level,
-            'message': message
-        })
+    if NEW_FEATURE_ARCHITECTURE:
+        available_features = get_available_features()
+        feature_info['new_architecture'] = {
+            'available': True,
+            'feature_count': len(available_features),
+            'feature_ids': available_features,
+            'feature_details': {}
+        }
+        
+        # Get info for each feature
+        for feature_id in available_features:
+            try:
+                info = get_feature_info(feature_id)
+                feature_info['new_architecture']['feature_details'][feature_id] = info
+            except Exception as e:
+                feature_info['new_architecture']['feature_details'][feature_id] = f"Error: {str(e)}"
+    else:
+        feature_info['new_architecture'] = {
+            'available': False,
+            'error': 'Feature factory import failed'
+        }
     
-    def get_logs(self):
-        return self.logs
+    # Get info for each information unit, and which ones are currently instantiated
+    feature_info['information_units'] = {}
+    feature_info['active_information_units'] = {}
+    unit_factories = {
+        'databases': (database_factory, 'database'),
+        'generators': (generator_factory, 'generator'),
+        'predictors': (predictor_factory, 'predictor')
+    }
+    for unit_type, (factory, pool_type) in unit_factories.items():
+        details = {}
+        for unit_key in factory:
+            # Units are imported lazily - use the metadata description until one is loaded
+            if not factory.is_loaded(unit_key):
+                details[unit_key] = factory.description(unit_key)
+                continue
+            try:
+                details[unit_key] = factory[unit_key](unit_key).info()
+            except Exception as e:
+                details[unit_key] = f"Error: {str(e)}"
+        feature_info['information_units'][unit_type] = details
+        # Active units include ones the unit pool evicted (they reload on next use)
+        feature_info['active_information_units'][unit_type] = unit_pool.active(pool_type)
     
-    def clear_logs(self):
-        self.logs = []
+    return feature_info
+
 
-# Create universal logger
-logger = SimpleLogger()
+# Built once (at startup and after toggle_IU), served with ETag and gzip
+features_info = PrecomputedJSON(build_features_info)
 
 
 @app.route('/api/features/info', methods=['GET'])
 def get_features_info():
     """Get information about available features and their architectures"""
     try:
-        feature_info = {}
+        body, gzip_body, etag = features_info.get()
         
-        if NEW_FEATURE_ARCHITECTURE:
-            available_features = get_available_features()
-            feature_info['new_architecture'] = {
-                'available': True,
-                'feature_count': len(available_features),
-                'feature_ids': available_features,
-                'feature_details': {}
-            }
-            
-            # Get info for each feature
-            for feature_id in available_features:
-                try:
-                    info = get_feature_info(feature_id)
-                    feature_info['new_architecture']['feature_details'][feature_id] = info
-                except Exception as e:
-                    feature_info['new_architecture']['feature_details'][feature_id] = f"Error: {str(e)}"
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        elif 'gzip' in request.accept_encodings:
+            response = Response(gzip_body, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
         else:
-            feature_info['new_architecture'] = {
-                'available': False,
-                'error': 'Feature factory import failed'
-            }
+            response = Response(body, mimetype='application/json')
         
-        return jsonify(feature_info)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -112,34 +150,36 @@ def toggle_IU():
         if (class_name not in generator_factory) and (class_name not in database_factory) and (class_name not in predictor_factory):
             return jsonify({"message": f"Class {class_name} not found in any factory"}), 404
 
+        logger = SimpleLogger()
+
         if active:
-            # Instantiate and store
+            # Instantiate, load and warm up once per process; reuse if already warm
             if ui_type=="generator":
-                cls = generator_factory[class_name]
-                instance = cls(class_name, logger)  # will raise if factory mapped to an instance
-                generator_registry[class_name] = instance
+                get_unit = get_generator
             elif ui_type=="database":
-                cls = database_factory[class_name]
-                instance = cls(class_name, logger)  # will raise if factory mapped to an instance
-                database_registry[class_name] = instance
+                get_unit = get_database
             elif ui_type=="predictor":
-                cls = predictor_factory[class_name]
-                instance = cls(class_name, logger)  # will raise if factory mapped to an instance
-                predictor_registry[class_name] = instance
+                get_unit = get_predictor
             else:
                 return jsonify({"message": "Unknown type"}), 400
+            
+            with use_logger(logger):
+                instance = get_unit(class_name)  # will raise if factory mapped to an instance
+                instance.warmup()
  
+            features_info.invalidate()
             return jsonify({"message": f"{class_name} instantiated"})
         else:
             if ui_type=="generator":
-                generator_registry.pop(class_name, None)
+                release_generator(class_name)
             elif ui_type=="database":
-                database_registry.pop(class_name, None)
+                release_database(class_name)
             elif ui_type=="predictor":
-                predictor_registry.pop(class_name, None)
+                release_predictor(class_name)
             else:
                 return jsonify({"message": "Unknown type"}), 400
             
+            features_info.invalidate()
             return jsonify({"message": f"{class_name} removed"})
     except TypeError as e:
         # Most common: factory mapped to an instance, not a class
@@ -151,8 +191,8 @@ def toggle_IU():
 @app.route('/api/process/<int:feature_id>', methods=['POST'])
 def process_feature(feature_id):
     try:
-        # Clear previous logs at the start of each request
-        logger.clear_logs()
+        # Each request gets its own log buffer so concurrent requests never mix logs
+        logger = SimpleLogger()
         
         # Get input data
         input_data = request.json or {}
@@ -160,8 +200,7 @@ def process_feature(feature_id):
         # Use new Feature architecture (processor.py files have been removed)
         if NEW_FEATURE_ARCHITECTURE:
             print(f"Using Feature architecture for feature {feature_id}")
-            feature = create_feature(str(feature_id), logger)
-            results = feature.process(input_data)
+            results = run_feature(str(feature_id), input_data, logger)
             
             return jsonify({
                 'results': results,
@@ -178,6 +217,240 @@ def process_feature(feature_id):
         print(f"Error in process_feature: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+
+@app.route('/api/export/<int:feature_id>', methods=['POST'])
+def export_feature(feature_id):
+    """Stream a full extract (Database Extractor) as JSON, JSON Lines, CSV or Parquet.
+
+    The body holds the feature's inputs (dataFormat, maxEntries, queryParameters,
+    active_databases); records are written to the response chunk by chunk.
+    """
+    if not NEW_FEATURE_ARCHITECTURE:
+        return jsonify({'error': 'Feature architecture not available'}), 500
+    if str(feature_id) not in get_available_features():
+        return jsonify({'error': f'Feature {feature_id} not found'}), 404
+    feature = create_feature(str(feature_id), SimpleLogger())
+    if not hasattr(feature, 'iter_export'):
+        return jsonify({'error': f'Feature {feature_id} does not support exports'}), 400
+    try:
+        chunks, writer = feature.iter_export(request.json or {})
+    except (ValueError, ImportError) as e:
+        return jsonify({'error': str(e)}), 400
+    return Response(chunks, mimetype=writer.mimetype, headers={
+        'Content-Disposition': f'attachment; filename=extract.{writer.extension}',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+# Shared cache of feature outputs keyed on canonical extracted inputs
+response_cache = ResponseCache()
+
+
+def run_feature(feature_id, input_data, logger):
+    """Run the BaseFeature.process pipeline for one feature - shared by all endpoints"""
+    feature_requests.inc(feature_id=feature_id)
+    try:
+        with feature_in_flight.track_inprogress(feature_id=feature_id), feature_duration.time(feature_id=feature_id):
+            feature = create_feature(feature_id, logger)
+            return feature.process(input_data, cache=response_cache.for_feature(feature_id))
+    except Exception:
+        feature_errors.inc(feature_id=feature_id)
+        raise
+
+
+@app.route('/metrics', methods=['GET'])
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Request counts, latency histograms and in-flight gauges in Prometheus text format"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(response_cache.stats())
+
+
+@app.route('/api/cache/clear', methods=['POST'])
+def clear_cache():
+    response_cache.clear()
+    return jsonify({'message': 'Response cache cleared'})
+
+
+# Background job runner for long-running features
+job_manager = JobManager(run_feature)
+
+
+@app.route('/api/jobs/<int:feature_id>', methods=['POST'])
+def submit_job(feature_id):
+    if not NEW_FEATURE_ARCHITECTURE:
+        return jsonify({'error': 'Feature architecture not available'}), 500
+    if str(feature_id) not in get_available_features():
+        return jsonify({'error': f'Feature {feature_id} not found'}), 404
+    try:
+        job = job_manager.submit(str(feature_id), request.json or {})
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    return jsonify({
+        'job_id': job.job_id,
+        'status': job.status,
+        'status_url': f'/api/jobs/{job.job_id}'
+    }), 202
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Job {job_id} not found'}), 404
+    return jsonify(job)
+
+
+@app.route('/api/jobs/<job_id>/logs', methods=['GET'])
+def get_job_logs(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Job {job_id} not found'}), 404
+    return jsonify({'job_id': job_id, 'status': job['status'], 'logs': job['logs']})
+
+
+# Shared worker pool for batch requests
+batch_runner = BatchRunner(run_feature)
+
+
+@app.route('/api/batch/<int:feature_id>', methods=['POST'])
+def process_batch(feature_id):
+    """Run many input payloads through one feature.
+
+    Body: {"inputs": [{...}, ...]}. Returns results in input order, or streams
+    them as NDJSON in completion order with ?format=ndjson.
+    """
+    if not NEW_FEATURE_ARCHITECTURE:
+        return jsonify({'error': 'Feature architecture not available'}), 500
+    if str(feature_id) not in get_available_features():
+        return jsonify({'error': f'Feature {feature_id} not found'}), 404
+    
+    data = request.json or {}
+    items = data.get('inputs')
+    if not isinstance(items, list):
+        return jsonify({'error': 'inputs must be a list of input payloads'}), 400
+    if len(items) > batch_runner.max_items:
+        return jsonify({'error': f'Batch too large ({len(items)} items, max {batch_runner.max_items})'}), 413
+    
+    if request.args.get('format') == 'ndjson':
+        def generate():
+            for item in batch_runner.iter_completed(str(feature_id), items):
+                yield json.dumps(item) + '\n'
+        return Response(generate(), mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+    
+    results = batch_runner.run(str(feature_id), items)
+    return jsonify({
+        'feature_id': str(feature_id),
+        'count': len(results),
+        'errors': sum(1 for item in results if item['status'] == 'error'),
+        'results': results
+    })
+
+
+# Seconds between SSE keep-alive comments while a run is quiet
+SSE_HEARTBEAT = float(os.environ.get('EMOS_SSE_HEARTBEAT', 15))
+# Seconds between job store reads while following a job run by another worker
+JOB_STORE_POLL = float(os.environ.get('EMOS_JOB_STORE_POLL', 1))
+
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _follow_stored_job(job_id):
+    """Yield SSE events for a job only known to the on-disk store, polling it until the job is done"""
+    sent = 0
+    status = None
+    quiet_since = time.time()
+    while True:
+        state = job_manager.get(job_id)
+        if state is None:
+            yield _sse_event('error', {'job_id': job_id, 'error': f'Job {job_id} not found'})
+            return None
+        if state['status'] != status:
+            status = state['status']
+            yield _sse_event('status', {'job_id': job_id, 'status': status})
+            quiet_since = time.time()
+        for entry in state['logs'][sent:]:
+            yield _sse_event('log', entry)
+            quiet_since = time.time()
+        sent = max(sent, len(state['logs']))
+        if status in ('succeeded', 'failed'):
+            return state
+        # Another worker runs the job - wait for it to persist more progress
+        if time.time() - quiet_since >= SSE_HEARTBEAT:
+            yield ': keep-alive\n\n'
+            quiet_since = time.time()
+        time.sleep(JOB_STORE_POLL)
+
+
+def _stream_job_events(job_id):
+    """Yield each log entry of a job as an SSE event, then its result"""
+    job = job_manager.get_job(job_id)
+    if job is None:
+        # Job held by another worker (or finished before a restart) - follow it through the store
+        state = yield from _follow_stored_job(job_id)
+        if state is None:
+            return
+    else:
+        yield _sse_event('status', {'job_id': job_id, 'status': job.status})
+        subscriber = job.logger.subscribe()
+        try:
+            while True:
+                try:
+                    entry = subscriber.get(timeout=SSE_HEARTBEAT)
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                if entry is None:
+                    break
+                yield _sse_event('log', entry)
+        finally:
+            job.logger.unsubscribe(subscriber)
+        state = job.to_dict(include_logs=False)
+
+    if state['status'] == 'succeeded':
+        yield _sse_event('result', {'job_id': job_id, 'results': state['results']})
+    else:
+        yield _sse_event('error', {'job_id': job_id, 'error': state['error']})
+
+
+def _sse_response(job_id):
+    return Response(_stream_job_events(job_id), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@app.route('/api/stream/<int:feature_id>', methods=['POST'])
+def stream_feature(feature_id):
+    """Run a feature and stream its logs as Server-Sent Events while it runs"""
+    if not NEW_FEATURE_ARCHITECTURE:
+        return jsonify({'error': 'Feature architecture not available'}), 500
+    if str(feature_id) not in get_available_features():
+        return jsonify({'error': f'Feature {feature_id} not found'}), 404
+    try:
+        job = job_manager.submit(str(feature_id), request.json or {})
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    return _sse_response(job.job_id)
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def get_job_events(job_id):
+    """SSE stream for an already submitted job (usable with EventSource)"""
+    if job_manager.get(job_id) is None:
+        return jsonify({'error': f'Job {job_id} not found'}), 404
+    return _sse_response(job_id)
+
+
+# Precompute the features info payload at startup (before fork under gunicorn)
+features_info.get()
+
 if __name__ == '__main__':
     print("Starting Flask server for all EMOS features...")
     print(f"Project root: {PROJECT_ROOT}")
@@ -195,4 +468,4 @@ if __name__ == '__main__':
     
     # Get port from environment variable for deployment
     port = int(os.environ.get('PORT', 5001))
-    app.run(debug=False, host='0.0.0.0', port=port)
\ No newline at end of file
+    app.run(debug=False, host='0.0.0.0', port=port, threaded=True)
\ No newline at end of file
@@ -0,0 +1,53 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from request_logger import SimpleLogger
+
+
+# Batch processing configuration (environment variables)
+BATCH_WORKERS = int(os.environ.get('EMOS_BATCH_WORKERS', os.cpu_count() or 4))
+BATCH_MAX_ITEMS = int(os.environ.get('EMOS_BATCH_MAX_ITEMS', 1000))
+
+
+class BatchRunner:
+    """Runs many input sets for one feature on a shared worker pool"""
+
+    def __init__(self, runner, max_workers=None, max_items=None):
+        # runner(feature_id, input_data, logger) -> results
+        self.runner = runner
+        self.max_items = max_items or BATCH_MAX_ITEMS
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or BATCH_WORKERS,
+                                           thread_name_prefix='emos-batch')
+
+    def _run_item(self, feature_id, index, input_data):
+        # Per-item errors are reported in the item, never raised
+        logger = SimpleLogger()
+        if not isinstance(input_data, dict):
+            return {'index': index, 'status': 'error', 'error': 'Batch item must be a JSON object', 'logs': []}
+        try:
+            results = self.runner(feature_id, input_data, logger)
+            return {'index': index, 'status': 'ok', 'results': results, 'logs': logger.get_logs()}
+        except Exception as e:
+            return {'index': index, 'status': 'error', 'error': str(e), 'logs': logger.get_logs()}
+
+    def _submit_all(self, feature_id, items):
+        return [self.executor.submit(self._run_item, feature_id, index, input_data)
+                for index, input_data in enumerate(items)]
+
+    def run(self, feature_id, items):
+        """Run all items and return their results in input order"""
+        return [future.result() for future in self._submit_all(feature_id, items)]
+
+    def iter_completed(self, feature_id, items):
+        """Yield item results as soon as each one finishes (each carries its index)"""
+        futures = self._submit_all(feature_id, items)
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # Client went away - drop the items that have not started yet
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,43 @@
+# Gunicorn configuration for the EMOS backend (production serving)
+#
+# The app (and with it every feature and information-unit factory) is imported
+# once in the master process before forking, so workers share those pages
+# copy-on-write. All settings can be overridden with environment variables.
+import gc
+import multiprocessing
+import os
+import pathlib
+
+BACKEND_DIR = pathlib.Path(__file__).parent.resolve()
+PROJECT_ROOT = BACKEND_DIR.parent.resolve()
+
+pythonpath = f"{BACKEND_DIR},{PROJECT_ROOT}"
+wsgi_app = 'wsgi:app'
+bind = f"0.0.0.0:{os.environ.get('PORT', 5001)}"
+
+# Import the app in the master so factories are loaded before fork
+preload_app = True
+
+# Worker model: processes for parallelism across cores, threads per process for I/O
+workers = int(os.environ.get('EMOS_WORKERS', os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count())))
+threads = int(os.environ.get('EMOS_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Timeouts and graceful restart (send HUP to the master to reload workers gracefully)
+timeout = int(os.environ.get('EMOS_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('EMOS_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('EMOS_KEEPALIVE', 5))
+
+# Recycle workers after this many requests (0 disables) to bound memory growth
+max_requests = int(os.environ.get('EMOS_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('EMOS_MAX_REQUESTS_JITTER', 50))
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('EMOS_LOG_LEVEL', 'info')
+
+
+def pre_fork(server, worker):
+    # Move everything imported so far out of the GC's reach, so collections in
+    # the workers do not touch (and copy) the shared pages
+    gc.freeze()
@@ -0,0 +1,197 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from request_logger import SimpleLogger
+
+
+# Job runner configuration (environment variables, like PORT)
+JOB_WORKERS = int(os.environ.get('EMOS_JOB_WORKERS', 4))
+JOB_QUEUE_SIZE = int(os.environ.get('EMOS_JOB_QUEUE_SIZE', 64))
+JOB_HISTORY_SIZE = int(os.environ.get('EMOS_JOB_HISTORY_SIZE', 500))
+JOB_STORE_PATH = os.environ.get('EMOS_JOB_STORE')  # optional SQLite file
+JOB_STORE_FLUSH = float(os.environ.get('EMOS_JOB_STORE_FLUSH', 2))  # seconds between log writes of running jobs
+
+
+class JobQueueFull(Exception):
+    """Raised when the job runner already holds JOB_QUEUE_SIZE unfinished jobs"""
+    pass
+
+
+class Job:
+    def __init__(self, feature_id, input_data):
+        self.job_id = uuid.uuid4().hex
+        self.feature_id = feature_id
+        self.input_data = input_data
+        self.status = 'queued'
+        self.logger = SimpleLogger()
+        self.results = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.persisted_logs = 0
+
+    @property
+    def log_count(self):
+        # Entries logged so far, including ones pushed out of the buffer
+        return len(self.logger.logs) + self.logger.dropped
+
+    @property
+    def done(self):
+        return self.status in ('succeeded', 'failed')
+
+    def to_dict(self, include_logs=True):
+        data = {
+            'job_id': self.job_id,
+            'feature_id': self.feature_id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'results': self.results,
+            'error': self.error
+        }
+        if include_logs:
+            data['logs'] = self.logger.get_logs()
+        return data
+
+
+class SQLiteJobStore:
+    """Optional on-disk job store so finished jobs survive restarts and are visible to every worker"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'job_id TEXT PRIMARY KEY, feature_id TEXT, status TEXT, '
+                'created_at REAL, started_at REAL, finished_at REAL, '
+                'results TEXT, error TEXT, logs TEXT)'
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def save(self, job):
+        with self._lock, self._connect() as conn:
+            # Snapshot under the lock so a later write never stores an older state
+            data = job.to_dict()
+            conn.execute(
+                'INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (data['job_id'], data['feature_id'], data['status'],
+                 data['created_at'], data['started_at'], data['finished_at'],
+                 json.dumps(data['results']), data['error'], json.dumps(data['logs']))
+            )
+
+    def load(self, job_id):
+        with self._lock, self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        keys = ['job_id', 'feature_id', 'status', 'created_at', 'started_at',
+                'finished_at', 'results', 'error', 'logs']
+        data = dict(zip(keys, row))
+        data['results'] = json.loads(data['results']) if data['results'] else None
+        data['logs'] = json.loads(data['logs']) if data['logs'] else []
+        return data
+
+
+class JobManager:
+    """Runs feature jobs on a bounded thread pool and keeps their state in memory"""
+
+    def __init__(self, runner, max_workers=None, max_queued=None, history_size=None, store_path=None,
+                 flush_interval=None):
+        # runner(feature_id, input_data, logger) -> results
+        self.runner = runner
+        self.max_queued = max_queued or JOB_QUEUE_SIZE
+        self.history_size = history_size or JOB_HISTORY_SIZE
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or JOB_WORKERS,
+                                           thread_name_prefix='emos-job')
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+        store_path = store_path or JOB_STORE_PATH
+        self.store = SQLiteJobStore(store_path) if store_path else None
+        self.flush_interval = flush_interval or JOB_STORE_FLUSH
+        self._stopped = threading.Event()
+        if self.store:
+            # Other workers only see a running job through the store - keep its logs current there
+            threading.Thread(target=self._flush_logs, name='emos-job-flush', daemon=True).start()
+
+    def submit(self, feature_id, input_data):
+        job = Job(feature_id, input_data)
+        with self._lock:
+            pending = sum(1 for j in self.jobs.values() if not j.done)
+            if pending >= self.max_queued:
+                raise JobQueueFull(f'Job queue is full ({pending} unfinished jobs)')
+            self.jobs[job.job_id] = job
+            self._trim_history()
+        self._persist(job)
+        self.executor.submit(self._run, job)
+        return job
+
+    def get_job(self, job_id):
+        """Return the live Job object if it is still held in memory"""
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def get(self, job_id):
+        """Return job state as a dict, falling back to the on-disk store"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if self.store:
+            return self.store.load(job_id)
+        return None
+
+    def _run(self, job):
+        job.status = 'running'
+        job.started_at = time.time()
+        self._persist(job)
+        try:
+            job.results = self.runner(job.feature_id, job.input_data, job.logger)
+            job.status = 'succeeded'
+        except Exception as e:
+            job.logger.log(f'Job failed: {str(e)}', 'error')
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            job.input_data = None
+            self._persist(job)
+            job.logger.close()
+
+    def _trim_history(self):
+        # Drop the oldest finished jobs once the history limit is reached
+        excess = len(self.jobs) - self.history_size
+        if excess <= 0:
+            return
+        for job_id in [jid for jid, j in self.jobs.items() if j.done][:excess]:
+            del self.jobs[job_id]
+
+    def _flush_logs(self):
+        while not self._stopped.wait(self.flush_interval):
+            with self._lock:
+                running = [j for j in self.jobs.values() if j.status == 'running']
+            for job in running:
+                if job.log_count != job.persisted_logs:
+                    self._persist(job)
+
+    def _persist(self, job):
+        if self.store:
+            job.persisted_logs = job.log_count
+            try:
+                self.store.save(job)
+            except sqlite3.Error as e:
+                job.logger.log(f'Job store write failed: {str(e)}', 'warning')
+
+    def shutdown(self, wait=True):
+        self._stopped.set()
+        self.executor.shutdown(wait=wait)
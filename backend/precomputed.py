@@ -0,0 +1,31 @@
+import gzip
+import hashlib
+import json
+import threading
+
+
+class PrecomputedJSON:
+    """JSON payload built once, stored with its gzip body and ETag, rebuilt after invalidate()"""
+
+    def __init__(self, builder):
+        self.builder = builder
+        self.body = None
+        self.gzip_body = None
+        self.etag = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return (body, gzip_body, etag), building the payload if needed"""
+        with self._lock:
+            if self.body is None:
+                body = json.dumps(self.builder(), sort_keys=True, separators=(',', ':')).encode('utf-8')
+                self.body = body
+                self.gzip_body = gzip.compress(body, compresslevel=9)
+                self.etag = hashlib.sha256(body).hexdigest()[:32]
+            return self.body, self.gzip_body, self.etag
+
+    def invalidate(self):
+        with self._lock:
+            self.body = None
+            self.gzip_body = None
+            self.etag = None
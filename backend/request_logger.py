@@ -0,0 +1,82 @@
+import os
+import queue
+import threading
+from collections import deque
+
+
+# Maximum number of log entries kept per request (oldest entries are dropped first)
+LOG_BUFFER_SIZE = int(os.environ.get('EMOS_LOG_BUFFER_SIZE', 1000))
+
+
+# Request-scoped logger - one instance per request, safe to share between threads
+class SimpleLogger:
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or LOG_BUFFER_SIZE
+        self.logs = deque(maxlen=self.max_entries)
+        self.dropped = 0
+        self.closed = False
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def log(self, message, level='info'):
+        entry = {
+            'level': level,
+            'message': message
+        }
+        with self._lock:
+            if len(self.logs) == self.max_entries:
+                self.dropped += 1
+            self.logs.append(entry)
+            for subscriber in self._subscribers:
+                self._offer(subscriber, entry)
+
+    def subscribe(self):
+        """Return a queue that receives every entry logged so far and from now on.
+
+        ``None`` is put on the queue once the logger is closed. Slow subscribers
+        lose entries rather than growing the queue past max_entries.
+        """
+        subscriber = queue.Queue(maxsize=self.max_entries + 1)
+        with self._lock:
+            for entry in self.logs:
+                self._offer(subscriber, entry)
+            if self.closed:
+                subscriber.put(None)
+            else:
+                self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def close(self):
+        """Mark the run as finished and release all subscribers"""
+        with self._lock:
+            self.closed = True
+            for subscriber in self._subscribers:
+                subscriber.put_nowait(None)
+            self._subscribers = []
+
+    @staticmethod
+    def _offer(subscriber, entry):
+        # Keep one slot free for the end marker put by close()
+        if subscriber.qsize() < subscriber.maxsize - 1:
+            subscriber.put_nowait(entry)
+
+    def get_logs(self):
+        with self._lock:
+            logs = list(self.logs)
+            dropped = self.dropped
+        if dropped:
+            logs.insert(0, {
+                'level': 'warning',
+                'message': f'{dropped} earlier log entries dropped (buffer size {self.max_entries})'
+            })
+        return logs
+
+    def clear_logs(self):
+        with self._lock:
+            self.logs.clear()
+            self.dropped = 0
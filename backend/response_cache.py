@@ -0,0 +1,107 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+# Response cache configuration (environment variables)
+CACHE_SIZE = int(os.environ.get('EMOS_CACHE_SIZE', 256))  # 0 disables the cache
+CACHE_TTL = float(os.environ.get('EMOS_CACHE_TTL', 300))  # seconds
+CACHE_DISABLED_FEATURES = [
+    f.strip() for f in os.environ.get('EMOS_CACHE_DISABLED_FEATURES', '').split(',') if f.strip()
+]
+
+
+class ResponseCache:
+    """LRU + TTL cache of feature outputs keyed on the canonical extracted inputs"""
+
+    def __init__(self, max_entries=None, ttl=None, disabled_features=None):
+        self.max_entries = CACHE_SIZE if max_entries is None else max_entries
+        self.ttl = CACHE_TTL if ttl is None else ttl
+        self.disabled_features = set(CACHE_DISABLED_FEATURES if disabled_features is None else disabled_features)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+
+    def enabled_for(self, feature_id):
+        return self.max_entries > 0 and str(feature_id) not in self.disabled_features
+
+    def for_feature(self, feature_id):
+        """Return a cache view bound to one feature, or None if caching is off for it"""
+        if not self.enabled_for(feature_id):
+            return None
+        return FeatureCache(self, str(feature_id))
+
+    @staticmethod
+    def make_key(feature_id, inputs):
+        canonical = json.dumps(inputs, sort_keys=True, separators=(',', ':'), default=str)
+        digest = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+        return f'{feature_id}:{digest}'
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self.entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(value))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'disabled_features': sorted(self.disabled_features)
+            }
+
+
+class FeatureCache:
+    """ResponseCache view for a single feature - what BaseFeature.process receives"""
+
+    def __init__(self, cache, feature_id):
+        self.cache = cache
+        self.feature_id = feature_id
+
+    def key(self, inputs):
+        return self.cache.make_key(self.feature_id, inputs)
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def put(self, key, value):
+        self.cache.put(key, value)
@@ -0,0 +1,4 @@
+# WSGI entry point for production servers, e.g.
+#   gunicorn --config backend/gunicorn.conf.py
+# Importing app loads the feature and information-unit factories once.
+from app import app  # noqa: F401
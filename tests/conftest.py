@@ -0,0 +1,33 @@
+import json
+import pathlib
+import sys
+
+import pytest
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+
+# Modules are imported the way the backend imports them: from the project root and backend/
+for path in (PROJECT_ROOT, PROJECT_ROOT / 'backend'):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+
+@pytest.fixture
+def make_mirror(tmp_path):
+    """Ingest records into a temporary mirror and open it"""
+    pytest.importorskip('numpy')
+    from Information_Units.Databases.LocalMirror import LocalMirror, ingest
+
+    mirrors = []
+
+    def make(records, name='test'):
+        source = tmp_path / f'{name}.jsonl'
+        source.write_text('\n'.join(json.dumps(record) for record in records))
+        ingest([source], tmp_path / name, name)
+        mirror = LocalMirror(tmp_path / name)
+        mirrors.append(mirror)
+        return mirror
+
+    yield make
+    for mirror in mirrors:
+        mirror.close()
@@ -0,0 +1,66 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from Information_Units.Databases.ElementIndex import ElementIndex, parse_elements
+from Information_Units.Databases.SearchQuery import compile_query
+
+
+RECORDS = [
+    {'material_id': 'mp-1', 'formula': 'GaAs'},
+    {'material_id': 'mp-2', 'formula': 'Ga'},
+    {'material_id': 'mp-3', 'formula': 'GaAsN'},
+    {'material_id': 'mp-4', 'formula': 'SiO2'},
+    {'material_id': 'mp-5', 'formula': 'Fe2O3'},
+    {'material_id': 'mp-6', 'name': 'no formula'},
+]
+
+
+def _ids(mirror, indices):
+    return [str(mirror.ids[i]) for i in indices]
+
+
+def test_superset_and_subset_queries(make_mirror):
+    mirror = make_mirror(RECORDS)
+    index = mirror.element_index
+    assert _ids(mirror, index.containing(['Ga', 'As'])) == ['mp-1', 'mp-3']
+    assert _ids(mirror, index.within(['Ga', 'As'])) == ['mp-1', 'mp-2']
+    assert _ids(mirror, index.in_system(['Ga', 'As'])) == ['mp-1']
+    assert _ids(mirror, index.containing(['O'])) == ['mp-4', 'mp-5']
+
+
+def test_masks_match_index_lookups(make_mirror):
+    mirror = make_mirror(RECORDS)
+    index = mirror.element_index
+    for elements in (['Ga', 'As'], ['O'], ['Fe', 'O'], ['N']):
+        assert list(np.flatnonzero(index.containing_mask(elements))) == list(index.containing(elements))
+        assert list(np.flatnonzero(index.within_mask(elements))) == list(index.within(elements))
+
+
+def test_trailing_entries_without_formula_keep_previous_bits(make_mirror):
+    # mp-6 has no formula: Fe2O3 before it must still contain O
+    mirror = make_mirror(RECORDS)
+    assert _ids(mirror, np.flatnonzero(compile_query('contains(O)')(mirror))) == ['mp-4', 'mp-5']
+    assert 'mp-5' not in _ids(mirror, np.flatnonzero(compile_query('not contains(O)')(mirror)))
+    assert _ids(mirror, mirror.element_index.in_system(['Fe', 'O'])) == ['mp-5']
+
+
+def test_build_without_any_composition():
+    index = ElementIndex.build(np.zeros(4, dtype=np.int64), np.zeros(0, dtype=np.uint8))
+    assert len(index) == 3
+    assert not index.bits.any()
+    assert list(index.within(['Fe'])) == []
+
+
+def test_stored_index_matches_rebuilt(make_mirror):
+    mirror = make_mirror(RECORDS)
+    rebuilt = ElementIndex.build(mirror.composition_ptr, mirror.composition_z)
+    assert (np.asarray(ElementIndex.load(mirror.directory).bits) == rebuilt.bits).all()
+
+
+def test_parse_elements():
+    assert parse_elements('Ga-As') == ['As', 'Ga']
+    assert parse_elements('Si, O') == ['O', 'Si']
+    assert parse_elements('SiO2') == ['O', 'Si']
+    assert parse_elements(['Fe', 'metals']) == ['Fe']
+    assert parse_elements('metals') == []
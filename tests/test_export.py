@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+
+import pytest
+
+from Information_Units.Databases.Export import (SchemaError, export_file, export_writer, iter_export,
+                                                record_schema)
+
+CHUNKS = [[{'id': 'a', 'gap': 1.5, 'stable': True}],
+          [{'id': 'b', 'gap': 2, 'stable': False, 'sites': [1, 2]}]]
+
+
+def _export(chunks, data_format, schema=None):
+    return b''.join(iter_export(chunks, data_format, schema))
+
+
+def test_json_formats_round_trip():
+    records = [record for chunk in CHUNKS for record in chunk]
+    assert json.loads(_export(CHUNKS, 'json')) == records
+    assert [json.loads(line) for line in _export(CHUNKS, 'jsonl').splitlines()] == records
+    assert json.loads(_export([], 'json')) == []
+
+
+def test_csv_with_schema_keeps_late_fields():
+    schema = record_schema(record for chunk in CHUNKS for record in chunk)
+    rows = list(csv.reader(io.StringIO(_export(CHUNKS, 'csv', schema).decode())))
+    assert rows[0] == ['id', 'gap', 'stable', 'sites']
+    assert rows[2] == ['b', '2', 'False', '[1,2]']
+
+
+def test_csv_without_schema_rejects_late_fields():
+    with pytest.raises(SchemaError, match='sites'):
+        _export(CHUNKS, 'csv')
+
+
+def test_parquet_schema_and_type_checks():
+    pq = pytest.importorskip('pyarrow.parquet')
+    schema = record_schema(record for chunk in CHUNKS for record in chunk)
+    table = pq.read_table(io.BytesIO(_export(CHUNKS, 'parquet', schema)))
+    assert table.column_names == ['id', 'gap', 'stable', 'sites']
+    assert table.column('gap').to_pylist() == [1.5, 2.0]
+    assert table.column('sites').to_pylist() == [None, '[1,2]']
+    with pytest.raises(SchemaError, match='gap'):
+        _export([[{'gap': 1.0}], [{'gap': 'n/a'}]], 'parquet')
+    assert pq.read_table(io.BytesIO(_export([], 'parquet', {'gap': 'number'}))).num_rows == 0
+
+
+def test_record_schema_merges_kinds():
+    schema = record_schema([{'x': 1, 'y': None}, {'x': 'one', 'y': True}])
+    assert schema == {'x': 'string', 'y': 'bool'}
+
+
+def test_failed_export_leaves_no_file(tmp_path):
+    def chunks():
+        yield [{'id': 'a'}]
+        raise RuntimeError('database went away')
+
+    with pytest.raises(RuntimeError):
+        export_file(chunks(), 'jsonl', tmp_path / 'out.jsonl')
+    assert list(tmp_path.iterdir()) == []
+    assert export_file(CHUNKS, 'jsonl', tmp_path / 'out.jsonl')['records'] == 2
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        export_writer('xlsx')
+
+
+def test_mirror_records_fields(make_mirror):
+    mirror = make_mirror([{'material_id': 'mp-1', 'formula': 'Si', 'band_gap': 1.1},
+                          {'material_id': 'mp-2', 'formula': 'GaAs', 'band_gap': 'n/a', 'magnetic': True}])
+    assert mirror.fields == {'material_id': 'string', 'formula': 'string', 'band_gap': 'string',
+                             'magnetic': 'bool'}
+
+
+def test_extractor_fails_export_on_database_error(tmp_path):
+    from Features.Materials_Exploration.DatabaseExtractor.DatabaseExtractorFeature import DatabaseExtractorFeature
+
+    class Database:
+        def iter_records(self, query, limit, chunk_size):
+            yield [{'id': 'a'}]
+            raise ConnectionError('backend went away')
+
+    feature = DatabaseExtractorFeature()
+    inputs = {'max_entries': 'all', 'query_parameters': 'all'}
+    with pytest.raises(ConnectionError):
+        export_file(feature.iter_chunks(inputs, [('stub', Database())]), 'csv', tmp_path / 'out.csv')
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_repeated_file_export_is_written_again(tmp_path, monkeypatch):
+    from response_cache import ResponseCache
+    from Features.Materials_Exploration.DatabaseExtractor import DatabaseExtractorFeature as module
+
+    class Database:
+        def export_schema(self):
+            return None
+
+        def iter_records(self, query, limit, chunk_size):
+            yield [{'id': 'a', 'gap': 1.0}, {'id': 'b', 'gap': 2.0}]
+
+    monkeypatch.setattr(module, 'EXPORT_DIR', tmp_path)
+    monkeypatch.setattr(module.DatabaseExtractorFeature, '_resolve_information_units',
+                        lambda self, unit_type, active_units: [('stub', Database())])
+    cache = ResponseCache(max_entries=16, ttl=60).for_feature('3')
+    request = {'dataFormat': 'CSV', 'maxEntries': 'all', 'outputFile': 'extract'}
+    for _ in range(2):
+        outputs = module.DatabaseExtractorFeature().process(request, cache=cache)
+        assert outputs['recordsExtracted'] == '2 records'
+        assert (tmp_path / 'extract.csv').read_text().splitlines()[0] == 'id,gap'
+        (tmp_path / 'extract.csv').unlink()
@@ -0,0 +1,59 @@
+import pytest
+
+from Information_Units.Databases.HttpClient import HttpClient, HttpError
+from Information_Units.Databases.StandInServer import StandInServer
+
+RECORDS = [{'material_id': f'mp-{i}', 'formula': 'Si', 'n': i} for i in range(1050)]
+
+
+@pytest.fixture
+def client():
+    client = HttpClient(retries=3, backoff=0.01)
+    yield client
+    client.close()
+
+
+@pytest.mark.parametrize('total', [None, 'meta.total'])
+def test_pages_in_order(client, total):
+    with StandInServer(RECORDS) as server:
+        records = list(client.pages(server.url + '/records', page_size=100, total=total))
+    assert [record['n'] for record in records] == list(range(1050))
+
+
+@pytest.mark.parametrize('total', [None, 'meta.total'])
+def test_pages_follow_server_page_cap(client, total):
+    with StandInServer(RECORDS, max_page_size=100) as server:
+        records = list(client.pages(server.url + '/records', page_size=500, total=total))
+    assert [record['n'] for record in records] == list(range(1050))
+
+
+def test_pages_max_items(client):
+    with StandInServer(RECORDS) as server:
+        records = list(client.pages(server.url + '/records', page_size=100, max_items=250))
+    assert len(records) == 250
+
+
+def test_retries_and_keep_alive(client):
+    patient = HttpClient(retries=12, backoff=0.001)
+    with StandInServer(RECORDS[:10], failure_rate=0.3) as server:
+        for _ in range(20):
+            assert len(patient.get_json(server.url + '/records')['data']) == 10
+    patient.close()
+    with StandInServer(RECORDS[:10]) as server:
+        for _ in range(10):
+            client.get_json(server.url + '/records')
+        assert server.connections == 1
+
+
+def test_fetch_ids_keeps_order(client):
+    ids = [f'mp-{i}' for i in (5, 700, 3, 1049)]
+    with StandInServer(RECORDS) as server:
+        records = client.fetch_ids(server.url + '/records', ids, batch_size=2)
+    assert [record['material_id'] for record in records] == ids
+
+
+def test_client_errors_are_not_retried(client):
+    with StandInServer(RECORDS) as server:
+        with pytest.raises(HttpError) as error:
+            client.get_json(server.url + '/missing')
+        assert error.value.status == 404 and server.requests == 1
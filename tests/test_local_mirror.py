@@ -0,0 +1,45 @@
+import math
+
+RECORDS = [
+    {'material_id': 'mp-149', 'formula': 'Si', 'band_gap': 1.1, 'spacegroup': 227},
+    {'material_id': 'mp-2534', 'formula': 'GaAs', 'band_gap': 1.4, 'density': 5.3},
+    {'material_id': 'mp-1143', 'formula': 'Al2O3', 'band_gap': 'unknown'},
+    {'material_id': 'mp-13', 'formula': 'Fe', 'magnetic_moment': 2.2},
+    {'material_id': 'mp-7', 'formula': 'SiO2', 'band_gap': 5.6},
+]
+
+
+def _values(mirror, name):
+    return [None if math.isnan(value) else value for value in mirror.column(name)]
+
+
+def test_sparse_columns_are_padded(make_mirror):
+    mirror = make_mirror(RECORDS)
+    assert len(mirror) == 5
+    assert mirror.column_names == ['band_gap', 'density', 'magnetic_moment', 'spacegroup']
+    assert _values(mirror, 'band_gap') == [1.1, 1.4, None, None, 5.6]
+    assert _values(mirror, 'density') == [None, 5.3, None, None, None]
+    assert _values(mirror, 'magnetic_moment') == [None, None, None, 2.2, None]
+
+
+def test_lookups(make_mirror):
+    mirror = make_mirror(RECORDS)
+    assert mirror.records(mirror.find_ids(['mp-13', 'mp-149'])) == [RECORDS[3], RECORDS[0]]
+    assert mirror.records(mirror.find_formula('O2Si')) == [RECORDS[4]]
+    assert list(mirror.query({'elements': 'Si'})) == [0, 4]
+    assert list(mirror.query({'chemsys': 'Ga-As-Si'})) == [0, 1]
+    assert list(mirror.query({'search_criteria': 'band_gap > 1.2'})) == [1, 4]
+    assert mirror.query({}) is None
+
+
+def test_iter_records_in_chunks(make_mirror):
+    mirror = make_mirror(RECORDS)
+    assert [len(chunk) for chunk in mirror.iter_records({}, chunk_size=2)] == [2, 2, 1]
+    assert [record['material_id'] for chunk in mirror.iter_records({}, limit=3) for record in chunk] == \
+        ['mp-149', 'mp-2534', 'mp-1143']
+
+
+def test_reingest_replaces_mirror(make_mirror):
+    make_mirror(RECORDS)
+    mirror = make_mirror(RECORDS[:2])
+    assert len(mirror) == 2 and _values(mirror, 'band_gap') == [1.1, 1.4]
@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from Information_Units.Predictors.MicroBatcher import BatcherStopped, MicroBatcher
+from Information_Units.UnitPool import UnitPool
+
+
+class _Predictor:
+    predictor_name = 'doubler'
+    max_batch_size = 4
+    max_batch_wait = 0.01
+
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.started = threading.Event()
+        self.batches = []
+
+    def predict_batch(self, inputs_list):
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.batches.append(len(inputs_list))
+        return [inputs * 2 for inputs in inputs_list]
+
+
+def test_batches_concurrent_inputs():
+    predictor = _Predictor()
+    batcher = MicroBatcher(predictor)
+    try:
+        assert batcher.predict_many(list(range(10))) == [i * 2 for i in range(10)]
+        assert max(predictor.batches) <= 4 and sum(predictor.batches) == 10
+    finally:
+        batcher.stop()
+
+
+def test_stop_fails_queued_inputs():
+    gate = threading.Event()
+    predictor = _Predictor(gate)
+    batcher = MicroBatcher(predictor, max_batch_size=1)
+    running = batcher.submit(1)
+    assert predictor.started.wait(5)
+    queued = [batcher.submit(i) for i in range(5)]
+    batcher.stop()
+    gate.set()
+    assert running.result(5) == 2
+    for future in queued:
+        with pytest.raises(BatcherStopped):
+            future.result(5)
+    batcher._thread.join(5)
+    assert not batcher._thread.is_alive()
+
+
+def test_submit_after_stop_raises():
+    batcher = MicroBatcher(_Predictor())
+    batcher.stop()
+    batcher.stop()
+    with pytest.raises(BatcherStopped):
+        batcher.submit(1)
+
+
+def test_release_waits_for_leases():
+    pool = UnitPool(budget_mb=0)
+    closed = []
+    registry = pool.registry('predictor', close=closed.append)
+    with pool.leases():
+        instance = pool.get('predictor', 'doubler', lambda key: object())
+        pool.release('predictor', 'doubler')
+        assert closed == [] and 'doubler' not in registry
+    assert closed == [instance]
+    pool.get('predictor', 'other', lambda key: object())
+    pool.release('predictor', 'other')
+    assert len(closed) == 2
@@ -0,0 +1,174 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from Features import UnitExecutor
+from Features.Pipeline import UnitPipeline
+from Information_Units.UnitContext import cancelled
+
+
+@pytest.fixture
+def four_workers(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=4)
+    monkeypatch.setattr(UnitExecutor, '_executor', executor)
+    yield executor
+    executor.shutdown(wait=True, cancel_futures=True)
+
+
+class _Feature:
+    feature_id = 0
+    retrieval_policy = 'all'
+    retrieval_hedge_delay = None
+    merge_duplicate_records = False
+    max_candidates = None
+    unit_timeout = 5
+    logger = None
+
+    def __init__(self):
+        self.errors = []
+
+    def retrieval_is_good(self, key, items):
+        return bool(items)
+
+    def candidate_reaches_target(self, candidate):
+        return False
+
+    def _log_unit_error(self, unit_type, key, error):
+        self.errors.append((unit_type, key, error))
+
+
+class _Database:
+    timeout = None
+
+    def __init__(self, name, delay):
+        self.name = name
+        self.delay = delay
+        self.started = None
+        self.cancelled = threading.Event()
+
+    def retrieve(self, inputs):
+        self.started = time.monotonic()
+        while time.monotonic() < self.started + self.delay:
+            if cancelled():
+                self.cancelled.set()
+                return None
+            time.sleep(0.005)
+        return [{'id': self.name}]
+
+
+def _retrieve(feature, databases):
+    # (record ids, seconds) of a retrieval-only pipeline run
+    start = time.monotonic()
+    output = UnitPipeline(feature, [(database.name, database) for database in databases], [], []).run({}, {}, {})
+    return [record['id'] for record in output['records']], time.monotonic() - start
+
+
+class _Generator:
+    timeout = None
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def generate_chunks(self, inputs, until=None):
+        for i in range(self.chunks):
+            yield [f'c{i}-{j}' for j in range(4)]
+
+
+class _Predictor:
+    timeout = None
+
+    def __init__(self, fail_batching=False):
+        self.fail_batching = fail_batching
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def supports_batching(self):
+        if self.fail_batching:
+            raise RuntimeError('broken predictor')
+        return False
+
+    def predict(self, inputs):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.005)
+        with self._lock:
+            self.running -= 1
+        return len(inputs['candidate'])
+
+
+def test_predictor_calls_are_bounded():
+    predictor = _Predictor()
+    pipeline = UnitPipeline(_Feature(), [], [('gen', _Generator(3))], [('p', predictor)], predict_calls=2)
+    output = pipeline.run({}, {}, {})
+    assert len(output['predictions']) == 12
+    assert predictor.peak <= 2
+
+
+def test_failed_predictor_stage_does_not_block_generators():
+    feature = _Feature()
+    pipeline = UnitPipeline(feature, [], [('gen', _Generator(50))], [('p', _Predictor(fail_batching=True))],
+                            queue_size=1)
+    thread = threading.Thread(target=pipeline.run, args=({}, {}, {}), daemon=True)
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive()
+    assert [error[:2] for error in feature.errors] == [('predictor', 'stage')]
+
+
+def test_concurrent_pipelines_with_tiny_queues(four_workers):
+    # Generators blocked on a full queue must not hold the workers the predictors need
+    features = [_Feature() for _ in range(4)]
+    outputs = [None] * 4
+
+    def run(index):
+        pipeline = UnitPipeline(features[index], [], [('gen', _Generator(10)), ('gen2', _Generator(10))],
+                                [('p', _Predictor())], queue_size=1)
+        outputs[index] = pipeline.run({}, {}, {})
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+    assert [len(output['predictions']) for output in outputs] == [80] * 4
+    assert all(feature.errors == [] for feature in features)
+    assert time.monotonic() - start < 3
+
+
+def test_first_policy_returns_after_the_fastest_database(four_workers):
+    feature = _Feature()
+    feature.retrieval_policy = 'first'
+    slow, fast = _Database('slow', 3), _Database('fast', 0.01)
+    ids, seconds = _retrieve(feature, [slow, fast])
+    assert ids == ['fast'] and seconds < 1
+    assert slow.cancelled.wait(1)
+
+
+def test_quorum_policy_waits_for_that_many_answers(four_workers):
+    feature = _Feature()
+    feature.retrieval_policy = 'quorum:2'
+    slow, medium, fast = _Database('slow', 3), _Database('medium', 0.2), _Database('fast', 0.01)
+    ids, seconds = _retrieve(feature, [slow, medium, fast])
+    assert ids == ['fast', 'medium'] and 0.2 <= seconds < 1
+    assert slow.cancelled.wait(1)
+
+
+def test_hedged_query_asks_the_others_only_after_the_delay(four_workers):
+    feature = _Feature()
+    feature.retrieval_policy = 'first'
+    feature.retrieval_hedge_delay = 0.2
+    # A fast first database answers alone
+    first, backup = _Database('first', 0.01), _Database('backup', 0.01)
+    assert _retrieve(feature, [first, backup])[0] == ['first']
+    assert backup.started is None
+    # A slow one is hedged after the delay and cancelled once the backup has answered
+    first, backup = _Database('first', 3), _Database('backup', 0.01)
+    ids, seconds = _retrieve(feature, [first, backup])
+    assert ids == ['backup'] and seconds < 1
+    assert backup.started - first.started >= 0.2
+    assert first.cancelled.wait(1)
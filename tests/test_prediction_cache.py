@@ -0,0 +1,29 @@
+from Information_Units.Predictors.PredictionCache import prediction_key, structure_fingerprint
+
+SI_CELL = [[0, 2.73, 2.73], [2.73, 0, 2.73], [2.73, 2.73, 0]]
+
+
+class _Predictor:
+    predictor_name = 'test'
+    version = '1'
+    cache_parameters = ('temperature',)
+
+
+def test_formulas_are_reduced():
+    assert structure_fingerprint('Fe2O3') == structure_fingerprint('Fe4O6') == structure_fingerprint('O3 Fe2')
+    assert structure_fingerprint('Fe2O3') != structure_fingerprint('Fe3O4')
+    assert structure_fingerprint('not a formula') == 'not a formula'
+
+
+def test_records_ignore_ids_and_provenance():
+    mp = {'material_id': 'mp-149', 'formula': 'Si2', 'spacegroup': 227, 'lattice': SI_CELL,
+          'provenance': [{'database': 'mp', 'id': 'mp-149'}]}
+    oqmd = {'entry_id': 'oqmd-1', 'formula': 'Si', 'spacegroup': '227', 'lattice': SI_CELL[::-1],
+            'provenance': [{'database': 'oqmd', 'id': 'oqmd-1'}, {'database': 'mp', 'id': 'mp-149'}]}
+    assert prediction_key(_Predictor(), {'candidate': mp, 'temperature': 300}) == \
+        prediction_key(_Predictor(), {'candidate': oqmd, 'temperature': 300})
+    assert prediction_key(_Predictor(), {'candidate': mp, 'temperature': 300}) != \
+        prediction_key(_Predictor(), {'candidate': dict(mp, spacegroup=141), 'temperature': 300})
+    # Records that cannot be fingerprinted are compared without their source fields
+    assert structure_fingerprint({'id': 1, 'formula': 'TiO2', 'band_gap': 3.0}) == \
+        structure_fingerprint({'id': 2, 'formula': 'TiO2', 'band_gap': 3.0, 'provenance': []})
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from Information_Units.ProcessPool import _pack, _release, _unpack
+
+
+def _exists(name):
+    return os.path.exists('/dev/shm/' + name.lstrip('/'))
+
+
+@pytest.mark.skipif(not os.path.isdir('/dev/shm'), reason='needs /dev/shm')
+def test_shared_arrays_are_unlinked_once_read():
+    names = []
+    packed = _pack({'energies': np.arange(50000.0), 'small': np.arange(3), 'label': 'x'}, names)
+    assert len(names) == 1 and _exists(names[0])
+    value = _unpack(packed)
+    assert value['energies'].sum() == np.arange(50000.0).sum() and value['label'] == 'x'
+    assert not _exists(names[0])
+
+
+@pytest.mark.skipif(not os.path.isdir('/dev/shm'), reason='needs /dev/shm')
+def test_abandoned_arrays_are_released():
+    names = []
+    packed = _pack(('ok', [np.ones(20000), np.zeros(20000)]), names)
+    _release(packed)
+    _release(packed)  # already gone
+    assert len(names) == 2 and not any(_exists(name) for name in names)
+
+
+def test_process_database_reads_the_mirror_in_its_worker(make_mirror, tmp_path, monkeypatch):
+    from Information_Units.Databases.DatabaseFactory import database_factory
+    from Information_Units.ProcessPool import ProcessDatabase
+
+    mirror = make_mirror([{'id': f'cod-{i}', 'formula': 'SiO2', 'band_gap': float(i)} for i in range(25)], 'cod')
+    # The spawned worker opens the mirror from EMOS_MIRROR_DIR
+    monkeypatch.setenv('EMOS_MIRROR_DIR', str(tmp_path))
+    database = ProcessDatabase(database_factory['cod'], 'cod')
+    database.load()
+    try:
+        assert database.cache_version() == [database.version, mirror.manifest['created_at']]
+        assert database.export_schema() == dict(mirror.fields)
+        chunks = list(database.iter_records({}, limit=20, chunk_size=8))
+        assert [len(chunk) for chunk in chunks] == [8, 8, 4]
+    finally:
+        database.close()
@@ -0,0 +1,58 @@
+from Information_Units.Databases.RecordMerge import RecordMerger, lattice_key, record_fingerprint
+
+SI_CELL = [[0, 2.73, 2.73], [2.73, 0, 2.73], [2.73, 2.73, 0]]
+
+
+def test_same_material_across_databases():
+    merger = RecordMerger()
+    first = merger.add('mp', [{'material_id': 'mp-149', 'formula': 'Si2', 'spacegroup': 227, 'lattice': SI_CELL}])
+    # Same cell in another setting and units of formula, space group given as a symbol string
+    scaled = [[x * 1.01 for x in row] for row in SI_CELL[::-1]]
+    second = merger.add('oqmd', [{'entry_id': 'oqmd-1', 'formula': 'Si', 'spacegroup': '227', 'lattice': scaled}])
+    assert len(first) == 1 and second == []
+    assert first[0]['provenance'] == [{'database': 'mp', 'id': 'mp-149'}, {'database': 'oqmd', 'id': 'oqmd-1'}]
+    assert merger.duplicates == 1
+
+
+def test_record_without_cell_merges_with_one_that_has_it():
+    merger = RecordMerger()
+    kept = merger.add('mp', [{'material_id': 'mp-149', 'formula': 'Si', 'spacegroup': 227, 'lattice': SI_CELL}])
+    assert merger.add('aflow', [{'id': 'a-1', 'formula': 'Si', 'spacegroup': 227}]) == []
+    assert [source['database'] for source in kept[0]['provenance']] == ['mp', 'aflow']
+
+    merger = RecordMerger()
+    kept = merger.add('aflow', [{'id': 'a-1', 'formula': 'Si', 'spacegroup': 227}])
+    assert merger.add('mp', [{'material_id': 'mp-149', 'formula': 'Si', 'spacegroup': 227,
+                              'lattice': SI_CELL}]) == []
+    # The kept record now has that cell: another cell of the same space group is another material
+    other = [[0, 3, 3], [3, 0, 3], [3, 3, 5]]
+    assert len(merger.add('oqmd', [{'id': 'o-1', 'formula': 'Si', 'spacegroup': 227, 'lattice': other}])) == 1
+    assert len(kept[0]['provenance']) == 2
+
+
+def test_polymorphs_are_kept_apart():
+    merger = RecordMerger()
+    records = [{'id': 1, 'formula': 'TiO2', 'spacegroup': 136}, {'id': 2, 'formula': 'TiO2', 'spacegroup': 141},
+               {'id': 3, 'formula': 'TiO2'}, {'id': 4, 'formula': 'TiO2'}, {'id': 5, 'spacegroup': 136}]
+    assert [record['id'] for record in merger.add('db', records)] == [1, 2, 3, 4, 5]
+
+
+def test_fingerprint_and_lattice_key():
+    assert record_fingerprint({'formula': 'SiO2'}) is None
+    assert record_fingerprint({'formula': 'O2Si', 'spacegroup_number': 154.0}) == \
+        record_fingerprint({'formula': 'Si2O4', 'symmetry': {'number': 154}})
+    assert record_fingerprint({'formula': 'SiO2', 'spacegroup': 'P 32 2 1'})[1:] == ('P3221', None)
+    cubic = lattice_key((4, 4, 4, 90, 90, 90))
+    assert cubic == lattice_key((5, 5, 5, 90, 90, 90)) != lattice_key((4, 4, 6, 90, 90, 90))
+    assert lattice_key((3, 4, 5, 80, 90, 100)) == lattice_key((5, 3, 4, 100, 80, 90))
+
+
+def test_duplicates_within_and_across_databases():
+    merger = RecordMerger()
+    kept = merger.add('mp', [{'id': 1, 'formula': 'Si', 'spacegroup': 227},
+                             {'id': 2, 'formula': 'Si', 'spacegroup': 227}])
+    provenance = kept[0]['provenance']
+    merger.add('oqmd', [{'id': 3, 'formula': 'Si', 'spacegroup': 227}])
+    assert (merger.duplicates, merger.cross_database) == (2, 1)
+    # Provenance is replaced, not appended to, so an earlier reader's list stays as it was
+    assert len(provenance) == 2 and len(kept[0]['provenance']) == 3
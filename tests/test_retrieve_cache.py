@@ -0,0 +1,70 @@
+import time
+
+from Information_Units.Databases.RetrieveCache import RetrieveCache, retrieve_cache_errors
+
+
+def test_round_trip_creates_directory(tmp_path):
+    cache = RetrieveCache(tmp_path / 'not' / 'yet' / 'there', max_mb=1, ttl=60)
+    assert cache.get('key', 'db') == (None, None)
+    cache.put('key', [{'formula': 'SiO2'}], 'db')
+    assert cache.get('key', 'db') == ('fresh', [{'formula': 'SiO2'}])
+    # A second instance (another worker) sees the same file
+    assert RetrieveCache(cache.directory, max_mb=1).get('key', 'db')[1] == [{'formula': 'SiO2'}]
+
+
+def test_stale_and_expired(tmp_path):
+    cache = RetrieveCache(tmp_path, max_mb=1, ttl=0.05, max_age=0.2)
+    cache.put('key', {'n': 1})
+    time.sleep(0.1)
+    assert cache.get('key')[0] == 'stale'
+    time.sleep(0.15)
+    assert cache.get('key') == (None, None)
+
+
+def test_eviction_keeps_cap(tmp_path):
+    cache = RetrieveCache(tmp_path, max_mb=0.05)
+    for i in range(20):
+        # Incompressible enough that a handful of results fill the cap
+        cache.put(f'key{i}', [str(hash((i, j))) for j in range(300)])
+    connection = cache._connect()
+    try:
+        total = connection.execute('SELECT SUM(size) FROM results').fetchone()[0]
+    finally:
+        connection.close()
+    assert total <= cache.max_bytes
+    assert cache.get('key19')[0] == 'fresh'
+    assert cache.get('key0') == (None, None)
+
+
+def test_errors_are_counted(tmp_path):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    cache = RetrieveCache(blocker / 'cache', max_mb=1)
+    before = retrieve_cache_errors._values.get(('write',), 0)
+    cache.put('key', [1])
+    assert cache.get('key') == (None, None)
+    assert retrieve_cache_errors._values.get(('write',), 0) == before + 1
+
+
+def test_uncached_retrieve_skips_cache(tmp_path, monkeypatch):
+    from Information_Units.Databases import RetrieveCache as module
+    from Information_Units.Databases.BaseDatabase import BaseDatabase
+
+    monkeypatch.setattr(module, 'retrieve_cache', RetrieveCache(tmp_path, max_mb=1))
+
+    class Database(BaseDatabase):
+        calls = 0
+
+        def retrieve(self, inputs):
+            Database.calls += 1
+            return [{'formula': 'Si', 'n': i} for i in range(5)]
+
+    database = Database('stub')
+    database.retrieve({'query': 'Si'})
+    database.retrieve({'query': 'Si'})
+    assert Database.calls == 1
+    # Exports read around the cache: neither served from it nor stored in it
+    assert [len(chunk) for chunk in database.iter_records({'query': 'Si'}, chunk_size=2)] == [2, 2, 1]
+    assert [len(chunk) for chunk in database.iter_records({'query': 'Ge'}, chunk_size=5)] == [5]
+    assert Database.calls == 3
+    assert module.retrieve_cache.get(module.retrieve_key(database, {'query': 'Ge'})) == (None, None)
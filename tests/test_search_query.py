@@ -0,0 +1,69 @@
+import pytest
+
+from Information_Units.Databases.SearchQuery import QueryError, compile_query, parse_query
+
+RECORDS = [
+    {'material_id': 'mp-149', 'formula': 'Si', 'band_gap': 1.1, 'density': 2.3},
+    {'material_id': 'mp-2534', 'formula': 'GaAs', 'band_gap': 1.4, 'density': 5.3},
+    {'material_id': 'mp-1143', 'formula': 'Al2O3', 'band_gap': 6.0, 'density': 4.0},
+    {'material_id': 'mp-13', 'formula': 'Fe', 'band_gap': 0.0, 'density': 7.9},
+    {'material_id': 'mp-7', 'formula': 'SiO2', 'band_gap': 5.6},
+    {'material_id': 'mp-19', 'formula': 'Fe2O3', 'band_gap': 2.2, 'density': 5.2},
+]
+
+
+@pytest.fixture
+def mirror(make_mirror):
+    return make_mirror(RECORDS)
+
+
+def _ids(mirror, criteria, property_range=''):
+    mask = compile_query(criteria, property_range)(mirror)
+    return [RECORDS[index]['material_id'] for index in mask.nonzero()[0]]
+
+
+def test_precedence_and_grouping():
+    assert parse_query('a > 1 or b < 2 and c = 3') == \
+        ('or', ('compare', 'a', '>', 1.0), ('and', ('compare', 'b', '<', 2.0), ('compare', 'c', '=', 3.0)))
+    assert parse_query('(a > 1 || b < 2) && !c >= 3')[0] == 'and'
+    # number op property is flipped, a chained comparison is a range
+    assert parse_query('2 < bandgap') == ('compare', 'bandgap', '>', 2.0)
+    assert parse_query('1 <= density <= 5')[0] in ('and', 'between')
+
+
+@pytest.mark.parametrize('criteria', ['bandgap >', 'bandgap > two', '(bandgap > 1', 'contains(Xx)',
+                                      'frac(Si, O) > 1', 'formula > SiO2', 'bandgap > 1 $'])
+def test_invalid_queries(criteria):
+    with pytest.raises(QueryError):
+        parse_query(criteria)
+
+
+def test_comparisons_and_aliases(mirror):
+    assert _ids(mirror, 'bandgap > 2') == ['mp-1143', 'mp-7', 'mp-19']
+    assert _ids(mirror, 'egap >= 1.4 and density < 5') == ['mp-1143']
+    assert _ids(mirror, 'band_gap between 1 and 1.5') == ['mp-149', 'mp-2534']
+    # Missing values never match a comparison
+    assert _ids(mirror, 'density != 4') == ['mp-149', 'mp-2534', 'mp-13', 'mp-19']
+    with pytest.raises(QueryError):
+        _ids(mirror, 'hardness > 1')
+
+
+def test_property_range_applies_to_first_property(mirror):
+    assert _ids(mirror, 'bandgap > 0', '1-2') == ['mp-149', 'mp-2534']
+
+
+def test_elements_and_stoichiometry(mirror):
+    assert _ids(mirror, 'contains(O)') == ['mp-1143', 'mp-7', 'mp-19']
+    assert _ids(mirror, 'contains(O) and excludes(Fe)') == ['mp-1143', 'mp-7']
+    assert _ids(mirror, 'only(Si, O)') == ['mp-149', 'mp-7']
+    assert _ids(mirror, 'chemsys = O-Si') == ['mp-7']
+    assert _ids(mirror, 'formula = O3Al2') == ['mp-1143']
+    assert _ids(mirror, 'frac(O) > 0.6') == ['mp-7']
+    assert _ids(mirror, 'count(O) = 3') == ['mp-1143', 'mp-19']
+    assert _ids(mirror, 'ratio(O, Fe) >= 1.5') == ['mp-19']
+    assert _ids(mirror, 'nelements = 1 and not contains(Fe)') == ['mp-149']
+
+
+def test_compiled_queries_are_cached():
+    assert compile_query('bandgap > 2') is compile_query('bandgap > 2')
+    assert parse_query('bandgap > 2') is parse_query('bandgap > 2')
@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pytest
+
+from Features import UnitExecutor
+from Features.UnitExecutor import UnitCall, UnitTimeout, completed_unit_calls
+from Information_Units.UnitContext import cancelled
+
+
+@pytest.fixture
+def one_worker(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(UnitExecutor, '_executor', executor)
+    yield executor
+    executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _sleep(seconds):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end and not cancelled():
+        time.sleep(0.01)
+    return seconds
+
+
+def test_timeout_starts_when_call_runs(one_worker):
+    first = UnitCall(_sleep, (0.3,), timeout=1)
+    queued = UnitCall(_sleep, (0.1,), timeout=0.25)
+    # queued waits 0.3 s for the worker, longer than its timeout, but runs within it
+    assert first.result() == 0.3
+    assert queued.result() == 0.1
+
+
+def test_running_call_times_out(one_worker):
+    call = UnitCall(_sleep, (5,), timeout=0.1)
+    with pytest.raises(UnitTimeout):
+        call.result()
+    assert call.cancel_event.is_set()
+
+
+def test_pending_calls_cancelled_when_caller_stops(one_worker):
+    started = []
+    gates = {key: threading.Event() for key in 'abc'}
+
+    def work(key):
+        started.append(key)
+        gates[key].wait(5)
+        return key
+
+    calls = {key: UnitCall(work, (key,), timeout=5) for key in 'abc'}
+    results = completed_unit_calls(calls)
+    gates['a'].set()
+    assert next(results) == ('a', 'a', None)
+    results.close()
+    # b is running (and told to stop), c never starts
+    assert calls['b'].cancel_event.is_set()
+    assert calls['c'].future.cancelled()
+    gates['b'].set()
+    one_worker.shutdown(wait=True)
+    assert 'c' not in started